@@ -0,0 +1,162 @@
+"""
+In-memory ElevenLabs agent catalogue behind GET /api/agents.
+
+The agent list changes rarely but was fetched from ElevenLabs on every
+dashboard load. It is now held in memory: fresh for AGENTS_CACHE_TTL_SECS,
+then served as-is while a single background refresh runs
+(stale-while-revalidate), for up to AGENTS_CACHE_MAX_STALE_SECS beyond the
+TTL. Past that, requests wait for a fetch, and still get the last good list if
+ElevenLabs is down, so an outage means slightly old data rather than errors. Each
+version of the list carries an ETag so browsers can revalidate with
+If-None-Match and get a 304.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from elevenlabs_client import ElevenLabsError, get_elevenlabs_client
+from instrumentation import create_background_task
+from metrics import Histogram
+
+
+AGENTS_CACHE_TTL_SECS = float(os.getenv("AGENTS_CACHE_TTL_SECS", "60"))
+AGENTS_CACHE_MAX_STALE_SECS = float(os.getenv("AGENTS_CACHE_MAX_STALE_SECS", "3600"))
+
+logger = logging.getLogger(__name__)
+
+
+class AgentCatalogueUnavailable(Exception):
+    """ElevenLabs could not be reached and there is no usable cached list."""
+
+
+async def fetch_elevenlabs_agents() -> List[Dict[str, Any]]:
+    """GET /v1/convai/agents via the shared client; raises AgentCatalogueUnavailable on failure."""
+    try:
+        return await get_elevenlabs_client().list_agents()
+    except ElevenLabsError as e:
+        status = f"ElevenLabs returned {e.status_code}" if e.status_code else "ElevenLabs request failed"
+        raise AgentCatalogueUnavailable(f"{status}: {e}")
+
+
+def compute_etag(agents: List[Dict[str, Any]]) -> str:
+    digest = hashlib.sha1(json.dumps(agents, sort_keys=True, default=str).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value covers `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+class AgentCatalogue:
+    """Agent list cached with a TTL and refreshed in the background once stale."""
+
+    def __init__(self, fetch: Callable[[], Awaitable[List[Dict[str, Any]]]] = fetch_elevenlabs_agents,
+                 ttl_seconds: float = AGENTS_CACHE_TTL_SECS,
+                 max_stale_seconds: float = AGENTS_CACHE_MAX_STALE_SECS):
+        self.fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.agents: Optional[List[Dict[str, Any]]] = None
+        self.etag: Optional[str] = None
+        self.fetched_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_serves = 0
+        self.not_modified = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.upstream_latency = Histogram("agents_upstream_latency_seconds",
+                                          "ElevenLabs agent list fetch latency")
+
+    def age(self) -> Optional[float]:
+        return time.monotonic() - self.fetched_at if self.fetched_at is not None else None
+
+    async def get(self) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        The agent list and its ETag.
+
+        Fresh: returned from memory. Stale (within max_stale_seconds): returned
+        from memory while a background refresh runs. Cold or too stale: waits
+        for the refresh, falling back to the stale list if that fails. Raises
+        AgentCatalogueUnavailable when there is nothing to serve.
+        """
+        age = self.age()
+        if age is not None and age < self.ttl_seconds:
+            self.hits += 1
+            return self.agents, self.etag
+        if age is not None and age < self.ttl_seconds + self.max_stale_seconds:
+            self.stale_serves += 1
+            self.refresh_in_background()
+            return self.agents, self.etag
+
+        self.misses += 1
+        try:
+            await asyncio.shield(self.refresh_in_background())
+        except AgentCatalogueUnavailable:
+            if self.agents is None:
+                raise
+            self.stale_serves += 1
+        return self.agents, self.etag
+
+    def refresh_in_background(self) -> asyncio.Task:
+        """Start a refresh unless one is already running; returns its task."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = create_background_task(self._refresh())
+            # Failures are counted and logged in _refresh; don't warn about unretrieved errors
+            self._refresh_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return self._refresh_task
+
+    async def _refresh(self):
+        started = time.perf_counter()
+        try:
+            agents = await self.fetch()
+        except Exception as e:
+            self.refresh_failures += 1
+            self.last_error = str(e)
+            logger.warning("⚠️  Agent catalogue refresh failed: %s", e)
+            if not isinstance(e, AgentCatalogueUnavailable):
+                raise AgentCatalogueUnavailable(str(e)) from e
+            raise
+        finally:
+            self.upstream_latency.observe(time.perf_counter() - started)
+
+        self.refreshes += 1
+        self.last_error = None
+        self.agents = agents
+        self.etag = compute_etag(agents)
+        self.fetched_at = time.monotonic()
+        logger.info("🤖 Agent catalogue refreshed: %s agents", len(agents))
+
+    def stats(self) -> Dict[str, Any]:
+        age = self.age()
+        return {
+            "agents": len(self.agents) if self.agents is not None else None,
+            "etag": self.etag,
+            "age_secs": round(age, 3) if age is not None else None,
+            "ttl_seconds": self.ttl_seconds,
+            "max_stale_seconds": self.max_stale_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_serves": self.stale_serves,
+            "not_modified": self.not_modified,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": self._refresh_task is not None and not self._refresh_task.done(),
+            "last_error": self.last_error,
+            "upstream_latency": self.upstream_latency.snapshot(),
+        }
+
+
+# Shared by the API process
+agent_catalogue = AgentCatalogue()
@@ -0,0 +1,111 @@
+"""
+Campaign dispatch throughput benchmark.
+
+Starts fake_postgrest.py (customers) and fake_elevenlabs.py (outbound-call API
+with latency, a live-call limit and optional 503s), then runs the same
+campaign at several concurrency ceilings and reports dispatch throughput,
+retries and dispatch latency. `--max-concurrent 1` is the old one-call-at-a-time
+behaviour of make_call.py.
+
+Usage:
+    python bench_campaign.py --calls 200 --latency-ms 300 --concurrency 1,5,10,20 --rate 0
+"""
+
+import argparse
+import asyncio
+import os
+from typing import Any, Dict, List
+
+from fake_elevenlabs import start_fake_elevenlabs
+from fake_postgrest import start_fake_postgrest
+
+
+async def load_campaign_customers(repo, campaign_filter,
+                                  page_size: int = 500) -> List[Dict[str, Any]]:
+    """Page through every customer matching the filter (keyset, due date ascending)."""
+    customers: List[Dict[str, Any]] = []
+    cursor = None
+    while True:
+        limit = page_size
+        if campaign_filter.limit is not None:
+            limit = min(page_size, campaign_filter.limit - len(customers))
+            if limit <= 0:
+                break
+        rows, cursor = await repo.list_page(
+            limit=limit,
+            cursor=cursor,
+            sort="due_date",
+            descending=False,
+            statuses=campaign_filter.statuses,
+            risk_levels=campaign_filter.risk_levels,
+            due_from=campaign_filter.due_from,
+            due_to=campaign_filter.due_to,
+        )
+        customers.extend(rows)
+        if cursor is None:
+            break
+    return customers
+
+
+async def run_campaign(customers, settings, base_url):
+    from campaign import Campaign, OutboundCallClient
+
+    client = OutboundCallClient(api_key="bench", agent_id="agent_bench", base_url=base_url,
+                                max_connections=settings.max_concurrent)
+    campaign = Campaign(customers, client, settings)
+    try:
+        await campaign.run()
+    finally:
+        await client.aclose()
+    return campaign
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outbound campaign throughput benchmark")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Outbound-call API latency")
+    parser.add_argument("--concurrency", default="1,5,10,20", help="Comma-separated max_concurrent values")
+    parser.add_argument("--rate", type=float, default=0.0, help="Dispatches per second (0 = unlimited)")
+    parser.add_argument("--max-live-calls", type=int, default=None, help="Fake concurrent-call limit (429s)")
+    parser.add_argument("--call-duration", type=float, default=2.0, help="Seconds each fake call stays live")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of dispatches failing with 503")
+    args = parser.parse_args()
+
+    db = start_fake_postgrest(customers=args.calls * 2, latency_ms=10)
+    os.environ["SUPABASE_URL"] = db.url
+    os.environ["SUPABASE_KEY"] = "bench"
+
+    from campaign import CampaignFilter, CampaignSettings
+    from repository import CustomerRepository
+
+    # Every status, so the queue is exactly --calls long
+    campaign_filter = CampaignFilter(
+        statuses=["active", "promised_to_pay", "callback_requested", "refused", "voicemail"],
+        limit=args.calls,
+    )
+    customers = asyncio.run(load_campaign_customers(CustomerRepository(), campaign_filter))
+
+    print("=" * 60)
+    print(f"📊 {len(customers)} calls, {args.latency_ms}ms dispatch latency, "
+          f"rate={args.rate or 'unlimited'}/s, live-call limit={args.max_live_calls}")
+    print("=" * 60)
+    for max_concurrent in (int(c) for c in args.concurrency.split(",")):
+        api = start_fake_elevenlabs(args.latency_ms, args.max_live_calls, args.call_duration, args.error_rate)
+        settings = CampaignSettings(max_concurrent=max_concurrent, calls_per_second=args.rate,
+                                    max_retries=5, backoff_base_secs=0.2)
+        campaign = asyncio.run(run_campaign(customers, settings, api.url))
+        snapshot = campaign.snapshot()
+        latency = snapshot["dispatch_latency"]
+        print(
+            f"concurrency={max_concurrent:>3}: {snapshot['dispatched']:>4} ok {snapshot['failed']:>3} failed "
+            f"in {snapshot['elapsed_secs']:7.2f}s  throughput={snapshot['dispatch_rate_per_sec']:7.2f} calls/s  "
+            f"retries={snapshot['retries']:>3} (429s={api.counts['rate_limited']}, 503s={api.counts['errors']})  "
+            f"p95={latency['p95'] * 1000:6.0f}ms"
+        )
+        api.shutdown()
+
+    db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
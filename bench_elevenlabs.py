@@ -0,0 +1,100 @@
+"""
+ElevenLabs dispatch latency benchmark: pooled client vs. a connection per call.
+
+Starts fake_elevenlabs.py with a per-request latency and a per-connection
+handshake delay (standing in for TCP+TLS setup), then places the same calls
+three ways:
+
+  requests     - requests.post in a thread, new connection per call (old main.py / make_call.py)
+  per-call     - a new httpx.AsyncClient per call
+  pooled       - the shared ElevenLabsClient (keep-alive pool, bounded in flight)
+
+and reports per-call latency, throughput and how many connections were opened.
+
+Usage:
+    python bench_elevenlabs.py --calls 200 --concurrency 10 --latency-ms 150 --handshake-ms 100
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+import requests
+
+from elevenlabs_client import OUTBOUND_CALL_PATH, ElevenLabsClient
+from fake_elevenlabs import start_fake_elevenlabs
+from metrics import Histogram
+
+
+def call_payload(i: int):
+    return {"agent_id": "agent_bench", "to_number": f"+1555{i:07d}"}
+
+
+async def place_with_requests(base_url: str, i: int):
+    response = await asyncio.to_thread(
+        requests.post, f"{base_url}{OUTBOUND_CALL_PATH}", json=call_payload(i),
+        headers={"xi-api-key": "bench"}, timeout=30,
+    )
+    response.raise_for_status()
+
+
+async def place_with_new_client(base_url: str, i: int):
+    async with httpx.AsyncClient(base_url=base_url, headers={"xi-api-key": "bench"}, timeout=30) as client:
+        response = await client.post(OUTBOUND_CALL_PATH, json=call_payload(i))
+        response.raise_for_status()
+
+
+async def run_mode(mode: str, base_url: str, calls: int, concurrency: int) -> Histogram:
+    latency = Histogram(f"dispatch_{mode}")
+    slots = asyncio.Semaphore(concurrency)
+    pooled = ElevenLabsClient(api_key="bench", base_url=base_url, max_connections=concurrency,
+                              max_in_flight=concurrency) if mode == "pooled" else None
+
+    async def one(i):
+        async with slots:
+            started = time.perf_counter()
+            if pooled:
+                await pooled.place_call("agent_bench", f"+1555{i:07d}")
+            elif mode == "requests":
+                await place_with_requests(base_url, i)
+            else:
+                await place_with_new_client(base_url, i)
+            latency.observe(time.perf_counter() - started)
+
+    try:
+        await asyncio.gather(*(one(i) for i in range(calls)))
+    finally:
+        if pooled:
+            await pooled.aclose()
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ElevenLabs client pooling benchmark")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Per-request API latency")
+    parser.add_argument("--handshake-ms", type=float, default=100.0, help="Per-connection setup delay")
+    parser.add_argument("--modes", default="requests,per-call,pooled")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"📊 {args.calls} dispatches, concurrency {args.concurrency}, "
+          f"{args.latency_ms}ms latency, {args.handshake_ms}ms handshake")
+    print("=" * 60)
+    for mode in args.modes.split(","):
+        # call_duration=0: no live-call limit interplay, this measures the client only
+        api = start_fake_elevenlabs(args.latency_ms, None, 0.0, 0.0, handshake_ms=args.handshake_ms)
+        started = time.perf_counter()
+        latency = asyncio.run(run_mode(mode, api.url, args.calls, args.concurrency))
+        elapsed = time.perf_counter() - started
+        print(
+            f"{mode:>9}: p50={latency.percentile(50) * 1000:6.0f}ms  p95={latency.percentile(95) * 1000:6.0f}ms  "
+            f"throughput={args.calls / elapsed:6.1f} calls/s  connections={api.counts['connections']}"
+        )
+        api.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Portfolio analytics benchmark: per-row Python vs. vectorised NumPy.
+
+Builds N synthetic customer rows (same shape as fake_postgrest.py's) and
+computes, for every row, days overdue, overdue bucket, expected recovery, the
+dialing order and the dashboard aggregates two ways:
+
+  per-row     - the code this replaced: strptime + datetime.now() per row
+                (calculate_days_overdue), Python bucket/aggregate loops and
+                sorted(key=call_priority)
+  vectorised  - portfolio.Portfolio: columnar load, then one array pass
+
+The vectorised time is split into the columnar load (from_rows) and the
+analysis itself; a snapshot pays the load once and reuses it.
+
+Usage:
+    python bench_portfolio.py --rows 100000,1000000
+"""
+
+import argparse
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from portfolio import (
+    PORTFOLIO_RECOVERY_HALF_LIFE_DAYS, RECOVERY_BASE_RATE, Portfolio, call_priority,
+)
+
+
+def make_rows(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    today = date.today()
+    statuses = ["active"] * 6 + ["promised_to_pay", "callback_requested", "refused", "voicemail"]
+    return [
+        {
+            "id": f"{i:08d}",
+            "debt_amount": round(rng.uniform(50, 5000), 2),
+            "due_date": (today - timedelta(days=rng.randint(-30, 365))).isoformat(),
+            "status": rng.choice(statuses),
+            "risk_level": rng.choice(["low", "medium", "high"]),
+            "last_call_at": None if rng.random() < 0.5 else f"2026-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T10:00:00+00:00",
+        }
+        for i in range(count)
+    ]
+
+
+# ============================================================================
+# PER-ROW PATH (as main.calculate_days_overdue / repository.call_priority did it)
+# ============================================================================
+
+def calculate_days_overdue(due_date_str: str) -> int:
+    due_date = datetime.strptime(due_date_str, "%Y-%m-%d")
+    return max(0, (datetime.now() - due_date).days)
+
+
+def bucket(days: int) -> str:
+    if days <= 0:
+        return "current"
+    if days <= 30:
+        return "1-30"
+    if days <= 60:
+        return "31-60"
+    if days <= 90:
+        return "61-90"
+    return "90+"
+
+
+def per_row(rows):
+    stats = {"total_customers": 0, "total_debt": 0.0, "by_status": {}, "by_risk_level": {}, "overdue_buckets": {}}
+    expected = []
+    for row in rows:
+        days = calculate_days_overdue(row["due_date"])
+        debt = float(row["debt_amount"])
+        probability = RECOVERY_BASE_RATE[row["risk_level"]] * math.pow(2, -days / PORTFOLIO_RECOVERY_HALF_LIFE_DAYS)
+        expected.append(debt * probability)
+        stats["total_customers"] += 1
+        stats["total_debt"] += debt
+        for group, key in (("by_status", row["status"]), ("by_risk_level", row["risk_level"]),
+                           ("overdue_buckets", bucket(days))):
+            entry = stats[group].setdefault(key, {"count": 0, "debt": 0.0})
+            entry["count"] += 1
+            entry["debt"] += debt
+    order = sorted(rows, key=call_priority)
+    ranking = sorted(range(len(rows)), key=lambda i: -expected[i])[:50]
+    return stats, order, ranking
+
+
+def vectorised(rows):
+    started = time.perf_counter()
+    portfolio = Portfolio.from_rows(rows)
+    loaded = time.perf_counter()
+    analysis = portfolio.analyze()
+    stats = portfolio.stats(analysis)
+    ranking = portfolio.ranking(analysis, limit=50)
+    return stats, analysis.call_order, ranking, loaded - started, time.perf_counter() - loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfolio analytics benchmark")
+    parser.add_argument("--rows", default="100000,1000000", help="Comma-separated row counts")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📊 Portfolio analytics: per-row Python vs. vectorised NumPy")
+    print("=" * 60)
+    for count in (int(n) for n in args.rows.split(",")):
+        rows = make_rows(count)
+
+        started = time.perf_counter()
+        row_stats, row_order, _ = per_row(rows)
+        row_secs = time.perf_counter() - started
+
+        vec_stats, vec_order, _, load_secs, analysis_secs = vectorised(rows)
+        assert row_stats["by_status"].keys() == vec_stats["by_status"].keys()
+        assert row_stats["overdue_buckets"]["90+"]["count"] == vec_stats["overdue_buckets"]["90+"]["count"]
+        assert [r["id"] for r in row_order[:100]] == [rows[i]["id"] for i in vec_order[:100]]
+
+        total = load_secs + analysis_secs
+        print(f"{count:>9,} rows: per-row={row_secs * 1000:8.0f}ms  vectorised={total * 1000:7.0f}ms "
+              f"(load {load_secs * 1000:.0f}ms + analysis {analysis_secs * 1000:.0f}ms)  "
+              f"speedup x{row_secs / total:.1f} (x{row_secs / analysis_secs:.0f} on a loaded snapshot)")
+
+
+if __name__ == "__main__":
+    main()
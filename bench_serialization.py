@@ -0,0 +1,125 @@
+"""
+Bulk JSON responses: serialisation time and bytes on the wire.
+
+Builds N customer rows (fake_postgrest.py's synthetic data) and serves them
+as one customer-list payload through a FastAPI app three ways, timing the
+whole ASGI call (formatting, validation, serialisation) without a network:
+
+  models        - the code this replaced: a CustomerListItem per row, returned
+                  as CustomerPage from a response_model=CustomerPage route, so
+                  FastAPI validates the models again before dumping them
+  fast (orjson) - main.to_list_items() dicts returned as FastJSONResponse
+  fast (json)   - the same with the standard-library fallback (no orjson)
+
+Then the fast payload through CompressionMiddleware, per Accept-Encoding:
+bytes sent and time including compression.
+
+Usage:
+    python bench_serialization.py --customers 10000,100000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Callable, List, Tuple
+
+from fastapi import FastAPI
+
+import fast_json
+from compression import COMPRESS_BROTLI_QUALITY, COMPRESS_GZIP_LEVEL, CompressionMiddleware, brotli
+from fake_postgrest import FakePostgrest
+from fast_json import FastJSONResponse
+from main import to_list_items
+from models import CustomerListItem, CustomerPage
+
+
+def make_app(rows) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/models", response_model=CustomerPage)
+    async def as_models():
+        return CustomerPage(items=[CustomerListItem(**item) for item in to_list_items(rows)], next_cursor=None)
+
+    @app.get("/fast", response_model=CustomerPage)
+    async def as_dicts():
+        return FastJSONResponse({"items": to_list_items(rows), "next_cursor": None})
+
+    return app
+
+
+async def asgi_get(app, path: str, accept_encoding: str = "identity") -> Tuple[bytes, dict]:
+    """One GET straight through the ASGI app; returns the body and response headers."""
+    body: List[bytes] = []
+    headers = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            headers.update((k.decode(), v.decode()) for k, v in message["headers"])
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return b"".join(body), headers
+
+
+def best_of(repeat: int, call: Callable[[], Tuple[bytes, dict]]) -> Tuple[float, bytes, dict]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body, headers = call()
+        timings.append(time.perf_counter() - started)
+    return min(timings), body, headers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk JSON serialisation and compression benchmark")
+    parser.add_argument("--customers", default="10000,100000", help="Comma-separated payload sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    print("=" * 60)
+    print(f"📊 Customer list payloads: serialisation and bytes on the wire "
+          f"(gzip level {COMPRESS_GZIP_LEVEL}, brotli quality {COMPRESS_BROTLI_QUALITY if brotli else 'n/a'})")
+    print("=" * 60)
+    for count in (int(n) for n in args.customers.split(",")):
+        rows = FakePostgrest().seed_customers(count)
+        app = make_app(rows)
+
+        def run(path: str, accept_encoding: str = "identity"):
+            return lambda: asyncio.run(asgi_get(app, path, accept_encoding))
+
+        model_secs, model_body, _ = best_of(args.repeat, run("/models"))
+        fast_secs, fast_body, _ = best_of(args.repeat, run("/fast"))
+        orjson, fast_json.orjson = fast_json.orjson, None
+        try:
+            json_secs, json_body, _ = best_of(args.repeat, run("/fast"))
+        finally:
+            fast_json.orjson = orjson
+        assert json.loads(model_body) == json.loads(fast_body) == json.loads(json_body)
+
+        print(f"\n{count:,} customers")
+        print(f"   models + response_model  {model_secs * 1000:8.1f}ms  {len(model_body):>12,} bytes")
+        for name, secs, body in (("fast (orjson)", fast_secs, fast_body), ("fast (json)", json_secs, json_body)):
+            print(f"   {name:<24} {secs * 1000:8.1f}ms  {len(body):>12,} bytes  "
+                  f"x{model_secs / secs:.1f} faster")
+        for encoding in encodings:
+            secs, body, headers = best_of(args.repeat, run("/fast", encoding))
+            assert headers.get("content-encoding", "identity") == encoding
+            print(f"   on the wire, {encoding:<10}  {secs * 1000:8.1f}ms  {len(body):>12,} bytes  "
+                  f"{len(body) / len(fast_body):6.1%} of identity")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Cold-start time of the API, checked against a budget.
+
+Measures, over --runs fresh processes:
+  - import: `import main` in a new interpreter (no credentials in the environment)
+  - ready: launching uvicorn until GET /health first answers 200
+  - first tool call: the first get-customer-name after /health, against
+    fake_postgrest.py (includes creating the Supabase client if the
+    background warm-up has not finished yet)
+
+Exits 1 if the median time to ready exceeds --budget-ms, so it can gate CI
+or a deploy.
+
+    python bench_startup.py --runs 5 --budget-ms 2000
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from bench_workers import free_port, stop_server
+from fake_postgrest import start_fake_postgrest
+
+
+def time_import(env: Dict[str, str]) -> float:
+    code = "import time; t = time.perf_counter(); import main; print((time.perf_counter() - t) * 1000)"
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def time_ready(env: Dict[str, str], phone: str, timeout: float = 30.0) -> Dict[str, float]:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--no-access-log"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    try:
+        with httpx.Client(timeout=5.0) as client:
+            while True:
+                if time.perf_counter() - started > timeout:
+                    raise SystemExit(f"❌ Server at {url} did not become healthy within {timeout}s")
+                try:
+                    if client.get(f"{url}/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            ready = time.perf_counter()
+            response = client.post(f"{url}/tools/get-customer-name", json={"phone": phone})
+            response.raise_for_status()
+            first_call = time.perf_counter()
+    finally:
+        stop_server(server)
+    return {"ready": (ready - started) * 1000, "first_call": (first_call - ready) * 1000}
+
+
+def describe(name: str, samples: List[float]) -> str:
+    return (f"{name:>16}: median={statistics.median(samples):7.1f}ms  "
+            f"min={min(samples):7.1f}ms  max={max(samples):7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API cold-start time vs. a budget")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=2000.0, help="Max median time to /health")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="PostgREST stand-in latency")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    base_env = {
+        **os.environ,
+        "LOG_LEVEL": "WARNING",
+        "LOG_DIR": os.path.join(workdir, "logs"),
+        "WRITE_BEHIND_JOURNAL": os.path.join(workdir, "write_behind.jsonl"),
+    }
+    import_env = {k: v for k, v in base_env.items() if k not in ("SUPABASE_URL", "SUPABASE_KEY")}
+
+    fake = start_fake_postgrest(customers=100, latency_ms=args.latency_ms)
+    server_env = {**base_env, "SUPABASE_URL": fake.url, "SUPABASE_KEY": "bench"}
+    try:
+        imports = [time_import(import_env) for _ in range(args.runs)]
+        starts = [time_ready(server_env, "+15550000001") for _ in range(args.runs)]
+    finally:
+        fake.shutdown()
+
+    ready = [s["ready"] for s in starts]
+    print("=" * 60)
+    print(f"📊 Cold start over {args.runs} runs (budget {args.budget_ms:.0f}ms to ready)")
+    print("=" * 60)
+    print(describe("import main", imports))
+    print(describe("ready (/health)", ready))
+    print(describe("first tool call", [s["first_call"] for s in starts]))
+
+    if statistics.median(ready) > args.budget_ms:
+        print(f"\n❌ Median time to ready {statistics.median(ready):.0f}ms exceeds {args.budget_ms:.0f}ms")
+        sys.exit(1)
+    print("\n✅ Within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Tool-call latency benchmark under concurrent conversations.
+
+Starts a local PostgREST stand-in (fake_postgrest.py) with artificial latency,
+points the API at it and drives N concurrent conversations through the tool
+webhooks in-process. Runs twice:
+
+  blocking  - Supabase queries executed directly on the event loop
+              (the behaviour before the async repository layer)
+  offload   - queries dispatched through repository.run_query
+
+Usage:
+    python bench_tools.py --conversations 60 --latency-ms 40 --think-ms 500
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from fake_postgrest import start_fake_postgrest
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_conversation(client, phone, latencies, think_secs, rng):
+    """One call: name -> details -> plan -> status, with think time between tools.
+
+    Latency is measured from when the tool call was *due* (previous response
+    plus think time), so time spent waiting for a blocked event loop counts.
+    """
+    steps = [
+        ("/tools/get-customer-name", {"phone": phone}),
+        ("/tools/get-case-details", {"phone": phone}),
+        ("/tools/propose-payment-plan", {"phone": phone, "installments": 3}),
+        ("/tools/update-status", {"phone": phone, "new_status": "promised_to_pay"}),
+    ]
+    due = time.perf_counter() + rng.uniform(0, think_secs)
+    for path, body in steps:
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        response = await client.post(path, json=body)
+        finished = time.perf_counter()
+        latencies.append((finished - due) * 1000)
+        response.raise_for_status()
+        due = finished + rng.uniform(0.5, 1.5) * think_secs
+
+
+async def run_mode(app, phones, think_secs):
+    import httpx
+
+    latencies = []
+    rng = random.Random(7)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_conversation(client, p, latencies, think_secs, rng) for p in phones))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool webhook concurrency benchmark")
+    parser.add_argument("--conversations", type=int, default=60)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--think-ms", type=float, default=500.0, help="Mean pause between tool calls")
+    args = parser.parse_args()
+
+    fake = start_fake_postgrest(customers=args.conversations * 2, latency_ms=args.latency_ms)
+    os.environ["SUPABASE_URL"] = fake.url
+    os.environ["SUPABASE_KEY"] = "bench"
+
+    import logging
+    import repository
+    import main as api
+
+    logging.disable(logging.CRITICAL)
+    phones = [f"+1555{i:07d}" for i in range(args.conversations * 2)]
+
+    async def run_inline(fn, *fn_args, **fn_kwargs):
+        return fn(*fn_args, **fn_kwargs)
+
+    offload = repository.run_query
+    results = {}
+    for mode, batch in (("blocking", phones[:args.conversations]), ("offload", phones[args.conversations:])):
+        repository.run_query = run_inline if mode == "blocking" else offload
+        latencies, elapsed = asyncio.run(run_mode(api.app, batch, args.think_ms / 1000))
+        results[mode] = (latencies, elapsed)
+
+    print("=" * 60)
+    print(f"📊 {args.conversations} concurrent conversations, {args.latency_ms}ms PostgREST latency")
+    print("=" * 60)
+    for mode, (latencies, elapsed) in results.items():
+        print(
+            f"{mode:>9}: p50={statistics.median(latencies):8.1f}ms "
+            f"p95={percentile(latencies, 95):8.1f}ms p99={percentile(latencies, 99):8.1f}ms "
+            f"throughput={len(latencies) / elapsed:7.1f} req/s"
+        )
+
+    fake.shutdown()
+
+
+if __name__ == "__main__":
+    main()
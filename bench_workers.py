@@ -0,0 +1,180 @@
+"""
+Tool-call throughput vs. number of API worker processes.
+
+Starts fake_postgrest.py, then for each worker count serves main:app with
+gunicorn + uvicorn workers (gunicorn.conf.py; plain `uvicorn --workers` if
+gunicorn is not installed) and replays tool-call conversations against it
+with loadtest.py's generator. Think time defaults to 0 so the API, not the
+callers, is the bottleneck.
+
+    python bench_workers.py --workers 1,2,4 --conversations 200
+    python bench_workers.py --workers 1,2,4 --state-backend redis --redis-url redis://localhost:6379/0
+
+The load generator is a single process too; past a few thousand req/s it can
+become the limit (--clients N runs N generator processes).
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from bench_tools import percentile
+from fake_postgrest import start_fake_postgrest
+from loadtest import FLOWS, Results, fetch_phones, load_tools, make_client, run_level
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    if importlib.util.find_spec("gunicorn"):
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app",
+                   "--workers", str(workers), "--bind", f"127.0.0.1:{port}"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--workers", str(workers),
+                   "--host", "127.0.0.1", "--port", str(port), "--no-access-log"]
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+
+
+def wait_healthy(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"❌ Server at {url} did not become healthy")
+
+
+def stop_server(process: subprocess.Popen):
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+async def generate(args, client_index: int) -> Dict[str, Any]:
+    """One load-generator process: its share of the conversations."""
+    tools = load_tools(FLOWS[args.flow])
+    conversations = args.conversations // args.clients
+    async with make_client(args) as client:
+        phones = await fetch_phones(client, args.conversations * args.rounds)
+        # Disjoint phones per generator
+        phones = phones[client_index::args.clients]
+        results = await run_level(client, tools, phones, conversations, args, seed=client_index)
+    return {"latencies": results.latencies, "errors": results.errors,
+            "error_samples": results.error_samples, "elapsed": results.elapsed}
+
+
+def _generate_in_process(args, client_index: int, queue):
+    queue.put(asyncio.run(generate(args, client_index)))
+
+
+def run_load(args) -> Dict[str, Any]:
+    """Run --clients generators at once and merge their samples."""
+    if args.clients == 1:
+        parts = [asyncio.run(generate(args, 0))]
+    else:
+        queue = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=_generate_in_process, args=(args, i, queue))
+                 for i in range(args.clients)]
+        for proc in procs:
+            proc.start()
+        parts = [queue.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+
+    merged = Results(FLOWS[args.flow])
+    for part in parts:
+        for name, samples in part["latencies"].items():
+            merged.latencies[name].extend(samples)
+            merged.errors[name] += part["errors"][name]
+        merged.error_samples.extend(part["error_samples"][:5 - len(merged.error_samples)])
+    merged.elapsed = max(part["elapsed"] for part in parts)
+    summary = merged.summary()
+    summary["error_samples"] = merged.error_samples
+    all_samples: List[float] = [s for samples in merged.latencies.values() for s in samples]
+    summary["p50"] = round(percentile(all_samples, 50), 2)
+    summary["p95"] = round(percentile(all_samples, 95), 2)
+    summary["p99"] = round(percentile(all_samples, 99), 2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool-call throughput by API worker count")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--conversations", type=int, default=200, help="Concurrent conversations")
+    parser.add_argument("--rounds", type=int, default=3, help="Conversations per caller")
+    parser.add_argument("--flow", choices=sorted(FLOWS), default="split")
+    parser.add_argument("--plans-min", type=int, default=1)
+    parser.add_argument("--plans-max", type=int, default=3)
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause between tool calls")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="PostgREST stand-in latency")
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=1, help="Load-generator processes")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--state-backend", choices=("memory", "redis"), default="memory")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    args = parser.parse_args()
+
+    fake = start_fake_postgrest(customers=args.customers, latency_ms=args.latency_ms)
+    journal_dir = tempfile.mkdtemp(prefix="bench_workers_")
+    env = {
+        **os.environ,
+        "SUPABASE_URL": fake.url,
+        "SUPABASE_KEY": "bench",
+        "LOG_LEVEL": "WARNING",
+        "LOG_DIR": os.path.join(journal_dir, "logs"),
+        "WRITE_BEHIND_JOURNAL": os.path.join(journal_dir, "write_behind.jsonl"),
+        "STATE_BACKEND": args.state_backend,
+        "REDIS_URL": args.redis_url,
+    }
+
+    print("=" * 60)
+    print(f"📊 {args.conversations} concurrent conversations x {args.rounds} rounds ({args.flow} flow), "
+          f"{args.think_ms}ms think time, {args.latency_ms}ms PostgREST latency, "
+          f"state={args.state_backend}, {os.cpu_count()} CPUs")
+    print("=" * 60)
+
+    baseline = None
+    try:
+        for workers in (int(w) for w in args.workers.split(",")):
+            port = free_port()
+            args.url = f"http://127.0.0.1:{port}"
+            server = start_server(workers, port, env)
+            try:
+                wait_healthy(args.url)
+                summary = run_load(args)
+            finally:
+                stop_server(server)
+            baseline = baseline or summary["throughput"]
+            print(f"workers={workers:>2}: {summary['requests']:>6} requests in {summary['elapsed_secs']:6.2f}s  "
+                  f"{summary['throughput']:8.1f} req/s  x{summary['throughput'] / baseline:4.2f}  "
+                  f"p50={summary['p50']:7.1f}ms  p95={summary['p95']:7.1f}ms  p99={summary['p99']:7.1f}ms  "
+                  f"errors={summary['errors']}")
+            for sample in summary["error_samples"]:
+                print(f"   ⚠️  {sample}")
+    finally:
+        fake.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Static asset build: fingerprinted file names and pre-compressed copies.
+
+Copies static/ into STATIC_BUILD_DIR (default static_build/) so that nginx
+(or the app, without nginx) can serve it straight from disk:
+
+  - every asset except the HTML pages also gets a content-hashed name
+    (css/styles.css -> css/styles.3f2a9c1b07.css). Those names never change
+    meaning, so they are served with `Cache-Control: public, max-age=31536000,
+    immutable`; an edit produces a new name instead of a stale cache
+  - absolute /static/... references in HTML, CSS and JS are rewritten to the
+    hashed names (any ?v= cache-busting query is dropped)
+  - text files of COMPRESS_MIN_BYTES or more get .gz (and .br, when the brotli
+    package is installed) next to them, compressed once at the highest level
+    instead of per request
+  - manifest.json maps each source path to its hashed name
+
+HTML pages keep their URLs (they are linked and bookmarked) and are served
+with `Cache-Control: no-cache`, so a deploy shows up on the next page load.
+Original names are kept for every asset as well, for links from outside.
+
+The build is deterministic (same sources, same names and bytes) and writes
+into the existing directory, so a bind mount of it stays valid across builds.
+
+    python build_static.py                 # static/ -> static_build/
+    python build_static.py --check         # exit 1 if static_build/ is out of date
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_SOURCE_DIR = os.path.join(ROOT_DIR, "static")
+STATIC_BUILD_DIR = os.path.join(ROOT_DIR, os.getenv("STATIC_BUILD_DIR", "static_build"))
+MANIFEST_NAME = "manifest.json"
+
+# Smaller files gain less from compression than the extra header costs
+COMPRESS_MIN_BYTES = int(os.getenv("STATIC_COMPRESS_MIN_BYTES", "1024"))
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".md", ".svg", ".txt", ".xml"}
+# Files whose /static/ references are rewritten to hashed names
+REWRITABLE = {".html", ".css", ".js"}
+HASH_LENGTH = 10
+
+# /static/<path> up to a quote, whitespace or closing paren, with an optional ?query
+STATIC_REF = re.compile(r"/static/([A-Za-z0-9_./-]+)(\?[^\"'\s)]*)?")
+
+
+def fingerprint(path: str, content: bytes) -> str:
+    """css/styles.css -> css/styles.<hash>.css"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def rewrite_refs(text: str, assets: Dict[str, str]) -> str:
+    def replace(match: re.Match) -> str:
+        hashed = assets.get(match.group(1))
+        return f"/static/{hashed}" if hashed else match.group(0)
+
+    return STATIC_REF.sub(replace, text)
+
+
+def build_order(path: str) -> Tuple[int, str]:
+    """Plain assets first, then CSS/JS (which may reference them), then HTML."""
+    ext = os.path.splitext(path)[1].lower()
+    return (2 if ext == ".html" else 1 if ext in REWRITABLE else 0), path
+
+
+def list_sources(source_dir: str) -> List[str]:
+    paths = []
+    for directory, _, files in os.walk(source_dir):
+        for name in files:
+            if not name.startswith("."):
+                paths.append(os.path.relpath(os.path.join(directory, name), source_dir).replace(os.sep, "/"))
+    return sorted(paths, key=build_order)
+
+
+def compress(content: bytes) -> Dict[str, bytes]:
+    """Pre-compressed variants by file suffix; only those smaller than the original."""
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    return {suffix: data for suffix, data in variants.items() if len(data) < len(content)}
+
+
+def build(source_dir: str = STATIC_SOURCE_DIR) -> Dict[str, bytes]:
+    """Every output file (relative path -> bytes) of a build, including manifest.json."""
+    assets: Dict[str, str] = {}
+    outputs: Dict[str, bytes] = {}
+    for path in list_sources(source_dir):
+        with open(os.path.join(source_dir, path), "rb") as f:
+            content = f.read()
+        ext = os.path.splitext(path)[1].lower()
+        if ext in REWRITABLE:
+            content = rewrite_refs(content.decode("utf-8"), assets).encode("utf-8")
+
+        names = [path]
+        if ext != ".html":
+            assets[path] = fingerprint(path, content)
+            names.append(assets[path])
+        for name in names:
+            outputs[name] = content
+            if ext in COMPRESSIBLE and len(content) >= COMPRESS_MIN_BYTES:
+                for suffix, data in compress(content).items():
+                    outputs[name + suffix] = data
+
+    manifest = {"assets": assets}
+    outputs[MANIFEST_NAME] = (json.dumps(manifest, indent=2, sort_keys=True) + "\n").encode("utf-8")
+    return outputs
+
+
+def write(outputs: Dict[str, bytes], build_dir: str = STATIC_BUILD_DIR) -> Dict[str, int]:
+    """Write changed files, remove files no longer produced; returns counts."""
+    written = unchanged = removed = 0
+    for path, content in outputs.items():
+        target = os.path.join(build_dir, path)
+        if read_file(target) == content:
+            # Untouched files keep their mtime, and so their ETag
+            unchanged += 1
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(content)
+        os.replace(tmp, target)
+        written += 1
+
+    for path in stale_files(outputs, build_dir):
+        os.remove(os.path.join(build_dir, path))
+        removed += 1
+    return {"written": written, "unchanged": unchanged, "removed": removed}
+
+
+def read_file(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def stale_files(outputs: Dict[str, bytes], build_dir: str) -> List[str]:
+    if not os.path.isdir(build_dir):
+        return []
+    return [path for path in list_sources(build_dir) if path not in outputs]
+
+
+def out_of_date(outputs: Dict[str, bytes], build_dir: str = STATIC_BUILD_DIR) -> List[str]:
+    changed = [path for path, content in outputs.items() if read_file(os.path.join(build_dir, path)) != content]
+    return changed + stale_files(outputs, build_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint and pre-compress static assets")
+    parser.add_argument("--source", default=STATIC_SOURCE_DIR)
+    parser.add_argument("--out", default=STATIC_BUILD_DIR)
+    parser.add_argument("--check", action="store_true", help="Exit 1 if the build directory is out of date")
+    args = parser.parse_args()
+
+    outputs = build(args.source)
+    if args.check:
+        changed = out_of_date(outputs, args.out)
+        for path in changed:
+            print(f"❌ Out of date: {path}")
+        if changed:
+            sys.exit(1)
+        print(f"✅ {args.out} is up to date")
+        return
+
+    counts = write(outputs, args.out)
+    assets = json.loads(outputs[MANIFEST_NAME])["assets"]
+    print("=" * 60)
+    print(f"📦 Static build: {args.source} -> {args.out}")
+    print("=" * 60)
+    for path in list_sources(args.source):
+        content = outputs[path]
+        sizes = "  ".join(f"{suffix[1:]}={len(outputs[path + suffix]):>7,}"
+                          for suffix in (".gz", ".br") if path + suffix in outputs)
+        print(f"{assets.get(path, path):<44} {len(content):>8,} bytes  {sizes}")
+    print(f"\nWritten: {counts['written']}  Unchanged: {counts['unchanged']}  Removed: {counts['removed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+In-process TTL + LRU cache with hit/miss/eviction counters.
+
+Used to keep customer rows in memory for the duration of a conversation so
+the agent's sequence of tool webhooks costs a single database round trip.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl_seconds`."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int, name: str = "cache"):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or None (counts as a miss if absent/expired)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full."""
+        if self.max_entries <= 0:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def modify(self, key: Hashable, fn: Callable[[Any], Any]) -> bool:
+        """Replace a live entry's value with fn(value), keeping its expiry; False if absent."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                return False
+            self._data[key] = (entry[0], fn(entry[1]))
+            return True
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Invalidate a single key; returns the removed value if present."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self.invalidations += 1
+                return entry[1]
+            return None
+
+    def discard_if(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Invalidate every entry matching predicate(key, value); returns count."""
+        with self._lock:
+            doomed = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+            for key in doomed:
+                del self._data[key]
+            self.invalidations += len(doomed)
+            return len(doomed)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Every live (key, value), least recently used first."""
+        now = time.monotonic()
+        with self._lock:
+            return [(k, v) for k, (expires_at, v) in self._data.items() if expires_at > now]
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for sizing the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
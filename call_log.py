@@ -0,0 +1,192 @@
+"""
+Durable record of every call attempt (the `call_attempts` table).
+
+update-status used to write only the customer's status; the outcome summary
+the agent sends was logged and lost. Each finished call is now recorded as a
+CallAttempt: conversation and agent ids, phone, when it was dispatched and
+when it ended, the outcome, the agent's summary, and the last payment plan
+offered (and whether the customer accepted it).
+
+Inserts never happen on the request path. record() appends to an in-memory
+buffer and returns; a background task writes the buffer in batches of
+CALL_LOG_BATCH_SIZE rows (one PostgREST insert each) at least every
+CALL_LOG_FLUSH_INTERVAL_SECS. Failed batches are retried on the next flush up
+to CALL_LOG_MAX_RETRIES times. If the database stays unreachable the buffer is
+capped at CALL_LOG_MAX_PENDING rows and the oldest are dropped and counted.
+Whatever is buffered is flushed on shutdown.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from database import get_supabase_client
+from metrics import Histogram
+from repository import run_query
+
+
+CALL_LOG_TABLE = "call_attempts"
+CALL_LOG_BATCH_SIZE = int(os.getenv("CALL_LOG_BATCH_SIZE", "100"))
+CALL_LOG_FLUSH_INTERVAL_SECS = float(os.getenv("CALL_LOG_FLUSH_INTERVAL_SECS", "2"))
+CALL_LOG_MAX_PENDING = int(os.getenv("CALL_LOG_MAX_PENDING", "10000"))
+CALL_LOG_MAX_RETRIES = int(os.getenv("CALL_LOG_MAX_RETRIES", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CallAttempt:
+    """One row of call_attempts."""
+    phone: str
+    outcome: str
+    conversation_id: Optional[str] = None
+    agent_id: Optional[str] = None
+    customer_id: Optional[str] = None
+    started_at: Optional[str] = None
+    ended_at: Optional[str] = None
+    summary: Optional[str] = None
+    plan_offered: Optional[Dict[str, Any]] = None
+    plan_accepted: Optional[bool] = None
+
+    def as_row(self) -> Dict[str, Any]:
+        row = asdict(self)
+        row["ended_at"] = row["ended_at"] or datetime.now().astimezone().isoformat()
+        return row
+
+
+class CallLog:
+    """Buffers call attempts and inserts them in batches from a background task."""
+
+    def __init__(self, table: str = CALL_LOG_TABLE, batch_size: int = CALL_LOG_BATCH_SIZE,
+                 flush_interval: float = CALL_LOG_FLUSH_INTERVAL_SECS,
+                 max_pending: int = CALL_LOG_MAX_PENDING, max_retries: int = CALL_LOG_MAX_RETRIES):
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        # (row, failed attempts so far)
+        self.pending: Deque[Tuple[Dict[str, Any], int]] = deque()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.inserted = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.dropped = 0
+        self.last_error: Optional[str] = None
+        self.flush_latency = Histogram(
+            "call_log_flush_duration_seconds", "Time to insert one batch of call attempts",
+        )
+
+    def record(self, attempt: CallAttempt):
+        """Queue an attempt for insertion; never blocks or touches the database."""
+        self.pending.append((attempt.as_row(), 0))
+        self.recorded += 1
+        while len(self.pending) > self.max_pending:
+            self.pending.popleft()
+            self.dropped += 1
+        if len(self.pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _insert(self, rows: List[Dict[str, Any]]):
+        # Loaded with the Supabase client, not at import (see database.py)
+        from postgrest.types import ReturnMethod
+        await run_query(
+            lambda: get_supabase_client().table(self.table)
+            .insert(rows, returning=ReturnMethod.minimal)
+            .execute()
+        )
+
+    async def flush(self) -> int:
+        """Insert everything buffered so far; returns how many rows were written."""
+        written = 0
+        async with self._flush_lock:
+            while self.pending:
+                batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+                started = time.perf_counter()
+                try:
+                    await self._insert([row for row, _ in batch])
+                except Exception as e:
+                    self.failed_batches += 1
+                    self.last_error = str(e)
+                    retry = [(row, tries + 1) for row, tries in batch if tries + 1 < self.max_retries]
+                    self.dropped += len(batch) - len(retry)
+                    # Back to the front, in order; retried on the next flush
+                    self.pending.extendleft(reversed(retry))
+                    logger.warning("⚠️  Could not write %s call attempts: %s", len(batch), e)
+                    break
+                self.flush_latency.observe(time.perf_counter() - started)
+                self.batches += 1
+                self.inserted += len(batch)
+                written += len(batch)
+        return written
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self.pending:
+                await self.flush()
+
+    def start(self):
+        """Start the background writer (idempotent)."""
+        if self._task is None or self._task.done():
+            # Bound to the running loop (a second app in the same process gets a new one)
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background writer and flush what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.pending:
+            await self.flush()
+        if self.pending:
+            logger.warning("⚠️  %s call attempts were not written before shutdown", len(self.pending))
+
+    async def recent(self, customer_id: Optional[str] = None, phone: Optional[str] = None,
+                     limit: int = 20) -> List[Dict[str, Any]]:
+        """Latest attempts for a customer (by id or phone), newest first."""
+        def query():
+            q = get_supabase_client().table(self.table).select("*")
+            if customer_id:
+                q = q.eq("customer_id", customer_id)
+            if phone:
+                q = q.eq("phone", phone)
+            return q.order("ended_at", desc=True).limit(limit).execute()
+
+        result = await run_query(query)
+        return result.data or []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self.pending),
+            "recorded": self.recorded,
+            "inserted": self.inserted,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "dropped": self.dropped,
+            "last_error": self.last_error,
+            "batch_size": self.batch_size,
+            "flush_interval_secs": self.flush_interval,
+            "flush_latency": self.flush_latency.snapshot(),
+        }
+
+
+call_log = CallLog()
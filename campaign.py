@@ -0,0 +1,492 @@
+"""
+Concurrent outbound call campaigns.
+
+A campaign selects customers with a filter (status, risk level, due-date
+window), orders them in a priority queue (highest risk first, then oldest
+due date, then largest debt) and dispatches outbound calls through the
+ElevenLabs Twilio outbound-call API with:
+
+  - a ceiling on concurrent dispatches (`max_concurrent`)
+  - a per-second dispatch rate (token bucket, `calls_per_second`)
+  - retry with jittered exponential backoff when the API refused the dispatch
+    without placing the call (429, 503 with Retry-After, connection failures),
+    honouring Retry-After
+  - at most one dial per customer per run; after a failure that may have
+    placed the call anyway (5xx, no answer), the customer keeps their lease
+    and gets last_call_at instead of going back into the queue
+
+Run from the API (POST /api/campaigns) or from the command line:
+    python campaign.py --risk high,medium --due-to 2026-09-30 --max-concurrent 5 --rate 2
+
+Point ELEVENLABS_API_BASE_URL at fake_elevenlabs.py to try it offline.
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+from dotenv import load_dotenv
+
+from dialer_settings import (
+    CAMPAIGN_CALLS_PER_SECOND,
+    CAMPAIGN_MAX_CONCURRENT_CALLS,
+    CAMPAIGN_MAX_RETRIES,
+    CLAIM_LEASE_SECS,
+    CampaignSettings,
+)
+from elevenlabs_client import ElevenLabsClient, ElevenLabsError, backoff_delay as jittered_backoff
+from metrics import Histogram
+from portfolio import call_priority
+from repository import CustomerRepository
+
+load_dotenv()
+
+
+@dataclass
+class CampaignFilter:
+    """Which customers a campaign calls."""
+    statuses: List[str] = field(default_factory=lambda: ["active"])
+    risk_levels: Optional[List[str]] = None
+    due_from: Optional[date] = None
+    due_to: Optional[date] = None
+    limit: Optional[int] = None
+
+
+@dataclass
+class CallResult:
+    """Outcome of dispatching one customer's call."""
+    phone: str
+    customer_name: str
+    customer_id: Optional[str] = None
+    success: bool = False
+    conversation_id: Optional[str] = None
+    attempts: int = 0
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+# The outbound-call API refused or failed a dispatch
+DispatchError = ElevenLabsError
+
+
+def may_have_dialed(error: DispatchError) -> bool:
+    """Whether a failed dispatch may still have placed the call (5xx, or no answer after sending)."""
+    if error.retryable:
+        return False
+    return error.status_code is None or error.status_code >= 500
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return  # unlimited
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def backoff_delay(attempt: int, settings: CampaignSettings,
+                  retry_after: Optional[float] = None) -> float:
+    return jittered_backoff(attempt, settings.backoff_base_secs, settings.backoff_max_secs, retry_after)
+
+
+class OutboundCallClient:
+    """
+    Dispatches a campaign's calls for one agent.
+
+    Uses the given ElevenLabsClient (e.g. the API server's shared pool) or
+    opens its own from `client_kwargs`. Retries are left to the campaign,
+    which paces them through its token bucket.
+    """
+
+    def __init__(self, agent_id: Optional[str] = None, agent_phone_number_id: Optional[str] = None,
+                 client: Optional[ElevenLabsClient] = None, **client_kwargs):
+        self.agent_id = agent_id or os.getenv("ELEVENLABS_AGENT_ID")
+        self.agent_phone_number_id = agent_phone_number_id or os.getenv("AGENT_PHONE_NUMBER_ID")
+        self.owns_client = client is None
+        self.client = client or ElevenLabsClient(**client_kwargs)
+
+    async def place_call(self, phone: str, customer_name: str) -> Dict[str, Any]:
+        """Dispatch one call; returns the API response or raises DispatchError."""
+        return await self.client.place_call(
+            self.agent_id, phone, self.agent_phone_number_id,
+            dynamic_variables={"phone_number": phone, "customer_name": customer_name},
+            max_retries=0,
+        )
+
+    async def aclose(self):
+        if self.owns_client:
+            await self.client.aclose()
+
+
+class CustomerClaims:
+    """
+    Pulls customers for a campaign from the database call queue.
+
+    Every batch is leased to this campaign's worker id (claim_next_customers),
+    so several campaigns or dialer processes can run against the same
+    portfolio without calling anyone twice.
+    """
+
+    def __init__(self, repo, campaign_filter: CampaignFilter,
+                 lease_secs: int = CLAIM_LEASE_SECS, worker_id: Optional[str] = None):
+        self.repo = repo
+        self.filter = campaign_filter
+        self.lease_secs = lease_secs
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def claim(self, limit: int) -> List[Dict[str, Any]]:
+        return await self.repo.claim_next(
+            self.worker_id,
+            limit=limit,
+            lease_secs=self.lease_secs,
+            statuses=self.filter.statuses,
+            risk_levels=self.filter.risk_levels,
+            due_from=self.filter.due_from,
+            due_to=self.filter.due_to,
+        )
+
+    async def release(self, customer_ids: Sequence[str]) -> int:
+        return await self.repo.release_claims(self.worker_id, customer_ids)
+
+    async def record_attempt(self, customer: Dict[str, Any]):
+        """Stamp last_call_at, so the recall guard applies once the lease expires."""
+        await self.repo.update_by_id(customer["id"], {"last_call_at": datetime.now().astimezone().isoformat()})
+
+
+OnDispatched = Callable[[Dict[str, Any], Optional[str], float], Awaitable[None]]
+
+
+class Campaign:
+    """
+    A prioritised batch of outbound calls and its progress.
+
+    Customers come either from a fixed list or, with `claims`, from the
+    database call queue a few batches at a time (short leases, no
+    double-calling across dialers).
+    """
+
+    def __init__(self, customers: Sequence[Dict[str, Any]], client: OutboundCallClient,
+                 settings: Optional[CampaignSettings] = None,
+                 campaign_filter: Optional[CampaignFilter] = None,
+                 on_dispatched: Optional[OnDispatched] = None,
+                 claims: Optional[CustomerClaims] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.client = client
+        self.settings = settings or CampaignSettings()
+        self.filter = campaign_filter or CampaignFilter()
+        self.on_dispatched = on_dispatched
+        self.claims = claims
+        self.exhausted = claims is None
+        self._refill_lock = asyncio.Lock()
+        # Customer ids dialed (or refused) in this run: never dialed again by it
+        self.attempted: Set[str] = set()
+        # Refused without being placed: handed back when the run ends
+        self._refused: List[Dict[str, Any]] = []
+        self.status = "pending"
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.results: List[CallResult] = []
+        self.in_flight = 0
+        self.retries = 0
+        self.dispatch_latency = Histogram(
+            "campaign_dispatch_seconds", "Outbound-call API request latency",
+        )
+        self.task: Optional[asyncio.Task] = None
+
+        # heapq entries: (priority, insertion order, customer)
+        self._order = itertools.count()
+        self.queue = [(call_priority(c), next(self._order), c) for c in customers]
+        heapq.heapify(self.queue)
+        self.total = len(self.queue)
+
+    # --- running ------------------------------------------------------------
+
+    async def run(self) -> "Campaign":
+        """Dispatch every queued call; returns when the queue is drained or cancelled."""
+        self.status = "running"
+        self.started_at = time.monotonic()
+        bucket = TokenBucket(self.settings.calls_per_second)
+        workers = self.settings.max_concurrent if self.claims else min(self.settings.max_concurrent, self.total)
+        try:
+            await asyncio.gather(*(self._worker(bucket) for _ in range(max(1, workers))))
+            self.status = "completed"
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+            raise
+        finally:
+            self.finished_at = time.monotonic()
+            # Claimed but never dialed (cancelled), or refused by the API: hand them back
+            await self._release([c for _, _, c in self.queue] + self._refused)
+        return self
+
+    def cancel(self):
+        """Stop dispatching; calls already placed are not affected."""
+        if self.task and not self.task.done():
+            self.task.cancel()
+        elif self.status == "pending":
+            self.status = "cancelled"
+
+    async def _refill(self) -> bool:
+        """Claim the next batch from the database queue; False once it runs dry."""
+        async with self._refill_lock:
+            if self.queue:
+                return True
+            if self.exhausted:
+                return False
+            # Small batches keep leases short: claimed rows are dialed within seconds
+            want = self.settings.max_concurrent * 2
+            if self.filter.limit is not None:
+                want = min(want, self.filter.limit - self.total)
+            batch: List[Dict[str, Any]] = []
+            while want > 0 and not batch:
+                claimed = await self.claims.claim(want)
+                if len(claimed) < want:
+                    self.exhausted = True
+                # A lease that expired mid-run can hand back someone already
+                # dialed; keep the new lease so the next claim moves on
+                batch = [c for c in claimed if c.get("id") not in self.attempted]
+                if self.exhausted:
+                    break
+            if want <= 0:
+                self.exhausted = True
+            for customer in batch:
+                heapq.heappush(self.queue, (call_priority(customer), next(self._order), customer))
+            self.total += len(batch)
+            return bool(batch)
+
+    async def _release(self, customers: Sequence[Dict[str, Any]]):
+        if not self.claims or not customers:
+            return
+        try:
+            await self.claims.release([c["id"] for c in customers])
+        except Exception:
+            pass  # leases expire on their own
+
+    async def _record_attempt(self, customer: Dict[str, Any]):
+        if not self.claims or customer.get("id") is None:
+            return
+        try:
+            await self.claims.record_attempt(customer)
+        except Exception:
+            pass  # the lease still holds this customer until it expires
+
+    async def _worker(self, bucket: TokenBucket):
+        while self.queue or await self._refill():
+            if not self.queue:
+                continue
+            _, _, customer = heapq.heappop(self.queue)
+            if customer.get("id") is not None:
+                if customer["id"] in self.attempted:
+                    continue
+                self.attempted.add(customer["id"])
+            self.in_flight += 1
+            try:
+                self.results.append(await self._dispatch(customer, bucket))
+            finally:
+                self.in_flight -= 1
+
+    async def _dispatch(self, customer: Dict[str, Any], bucket: TokenBucket) -> CallResult:
+        result = CallResult(phone=customer["phone"], customer_name=customer.get("name") or "",
+                            customer_id=customer.get("id"))
+        while True:
+            await bucket.acquire()
+            result.attempts += 1
+            dispatched_at = time.monotonic()
+            try:
+                data = await self.client.place_call(result.phone, result.customer_name)
+            except DispatchError as e:
+                self.dispatch_latency.observe(time.monotonic() - dispatched_at)
+                result.status_code, result.error = e.status_code, str(e)
+                if not e.retryable or result.attempts > self.settings.max_retries:
+                    if may_have_dialed(e):
+                        # The phone may be ringing: keep the lease until it
+                        # expires and stamp last_call_at, so nobody redials
+                        await self._record_attempt(customer)
+                    else:
+                        self._refused.append(customer)
+                    return result
+                self.retries += 1
+                # Keep holding this worker's slot: backing off is the back-pressure
+                await asyncio.sleep(backoff_delay(result.attempts - 1, self.settings, e.retry_after))
+                continue
+
+            self.dispatch_latency.observe(time.monotonic() - dispatched_at)
+            result.success, result.status_code, result.error = True, 200, None
+            result.conversation_id = data.get("conversation_id")
+            if self.on_dispatched:
+                try:
+                    await self.on_dispatched(customer, result.conversation_id, dispatched_at)
+                except Exception as e:
+                    # The call is already ringing; bookkeeping failures must not retry it
+                    result.error = f"post-dispatch hook failed: {e}"
+            return result
+
+    # --- reporting ----------------------------------------------------------
+
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def snapshot(self, include_results: bool = False) -> Dict[str, Any]:
+        dispatched = sum(1 for r in self.results if r.success)
+        elapsed = self.elapsed()
+        snapshot = {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "filter": {
+                "statuses": self.filter.statuses,
+                "risk_levels": self.filter.risk_levels,
+                "due_from": self.filter.due_from.isoformat() if self.filter.due_from else None,
+                "due_to": self.filter.due_to.isoformat() if self.filter.due_to else None,
+                "limit": self.filter.limit,
+            },
+            "settings": {
+                "max_concurrent": self.settings.max_concurrent,
+                "calls_per_second": self.settings.calls_per_second,
+                "max_retries": self.settings.max_retries,
+            },
+            "total": self.total,
+            "queued": len(self.queue),
+            "in_flight": self.in_flight,
+            "dispatched": dispatched,
+            "failed": len(self.results) - dispatched,
+            "retries": self.retries,
+            "elapsed_secs": round(elapsed, 3),
+            "dispatch_rate_per_sec": round(dispatched / elapsed, 3) if elapsed else None,
+            "dispatch_latency": self.dispatch_latency.snapshot(),
+        }
+        if include_results:
+            snapshot["results"] = [r.__dict__ for r in self.results]
+        return snapshot
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def _split(value: Optional[str]) -> Optional[List[str]]:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+
+async def _run_cli(args) -> Optional[Campaign]:
+    from make_call import prewarm_api_cache
+
+    campaign_filter = CampaignFilter(
+        statuses=_split(args.status) or ["active"],
+        risk_levels=_split(args.risk),
+        due_from=date.fromisoformat(args.due_from) if args.due_from else None,
+        due_to=date.fromisoformat(args.due_to) if args.due_to else None,
+        limit=args.limit,
+    )
+    settings = CampaignSettings(
+        max_concurrent=args.max_concurrent,
+        calls_per_second=args.rate,
+        max_retries=args.retries,
+    )
+
+    repo = CustomerRepository()
+    matching = await repo.count_matching(
+        statuses=campaign_filter.statuses,
+        risk_levels=campaign_filter.risk_levels,
+        due_from=campaign_filter.due_from,
+        due_to=campaign_filter.due_to,
+    )
+    if campaign_filter.limit is not None:
+        matching = min(matching, campaign_filter.limit)
+    if not matching:
+        print("❌ No customers match this campaign filter")
+        return None
+
+    # Preview only: the campaign itself claims customers batch by batch, so
+    # anyone already leased by another dialer is skipped
+    print(f"📋 {matching} customers match "
+          f"(max {settings.max_concurrent} concurrent, {settings.calls_per_second}/s, "
+          f"{settings.max_retries} retries)")
+    if not args.yes:
+        confirm = (await asyncio.to_thread(input, "Start campaign? (yes/no): ")).strip().lower()
+        if confirm not in ["yes", "y"]:
+            print("❌ Campaign cancelled")
+            return None
+
+    async def on_dispatched(customer, conversation_id, dispatched_at):
+        print(f"✅ {customer['name']} ({customer['phone']}) - {conversation_id}")
+        await repo.update_by_phone(customer["phone"], {"last_call_at": datetime.now().astimezone().isoformat()})
+        await asyncio.to_thread(prewarm_api_cache, customer["phone"], conversation_id)
+
+    client = OutboundCallClient(max_connections=settings.max_concurrent, max_in_flight=settings.max_concurrent)
+    campaign = Campaign([], client, settings, campaign_filter, on_dispatched,
+                        claims=CustomerClaims(repo, campaign_filter))
+    try:
+        await campaign.run()
+    finally:
+        await client.aclose()
+    return campaign
+
+
+def print_summary(campaign: Campaign):
+    snapshot = campaign.snapshot(include_results=True)
+    latency = snapshot["dispatch_latency"]
+    print("=" * 60)
+    print(f"📊 Campaign {snapshot['id']}: {snapshot['status']}")
+    print("=" * 60)
+    print(f"Dispatched: {snapshot['dispatched']}/{snapshot['total']}  "
+          f"Failed: {snapshot['failed']}  Retries: {snapshot['retries']}")
+    print(f"Elapsed: {snapshot['elapsed_secs']}s  "
+          f"Throughput: {snapshot['dispatch_rate_per_sec']} calls/s")
+    if latency["count"]:
+        print(f"Dispatch latency: p50={latency['p50'] * 1000:.0f}ms "
+              f"p95={latency['p95'] * 1000:.0f}ms p99={latency['p99'] * 1000:.0f}ms")
+    for result in snapshot["results"]:
+        if not result["success"]:
+            print(f"❌ {result['phone']}: {result['status_code']} {result['error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an outbound call campaign")
+    parser.add_argument("--status", default="active", help="Comma-separated statuses (default: active)")
+    parser.add_argument("--risk", help="Comma-separated risk levels, e.g. high,medium")
+    parser.add_argument("--due-from", help="Earliest due date (YYYY-MM-DD)")
+    parser.add_argument("--due-to", help="Latest due date (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, help="Call at most this many customers")
+    parser.add_argument("--max-concurrent", type=int, default=CAMPAIGN_MAX_CONCURRENT_CALLS)
+    parser.add_argument("--rate", type=float, default=CAMPAIGN_CALLS_PER_SECOND,
+                        help="Dispatches per second (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=CAMPAIGN_MAX_RETRIES)
+    parser.add_argument("--yes", action="store_true", help="Skip the confirmation prompt")
+    args = parser.parse_args()
+
+    if not os.getenv("ELEVENLABS_API_KEY") or not os.getenv("ELEVENLABS_AGENT_ID"):
+        print("❌ Error: Missing ElevenLabs credentials")
+        print("Please set ELEVENLABS_API_KEY and ELEVENLABS_AGENT_ID in .env file")
+        raise SystemExit(1)
+
+    finished = asyncio.run(_run_cli(args))
+    if finished:
+        print_summary(finished)
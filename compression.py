@@ -0,0 +1,171 @@
+"""
+Response compression, negotiated per request (brotli or gzip).
+
+CompressionMiddleware compresses a response when:
+  - the client accepts br (with the brotli package installed) or gzip;
+    br is preferred
+  - the body is at least COMPRESS_MIN_BYTES. Tool webhook answers are a few
+    hundred bytes and go out as they are: there, compressing costs more time
+    than the bytes saved
+  - it is JSON or text and not already encoded (the pre-compressed static
+    files from static_assets.py pass through untouched)
+  - it is sent in one piece; streamed responses pass through
+
+The levels are for per-request work, not the highest ratio: gzip level 5
+sends customer JSON at under a fifth of its size, at ~4ms per 1,000 rows
+(bench_serialization.py). Bodies over COMPRESS_OFFLOAD_BYTES are compressed
+in a worker thread so the event loop keeps answering tool webhooks. Static
+files are compressed once, at the maximum, by build_static.py instead.
+
+Behind nginx this is the only compression of API responses (nginx.conf does
+not gzip proxied responses).
+"""
+
+import asyncio
+import gzip
+import os
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from metrics import REGISTRY, Counter
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "5"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+# Larger bodies are compressed off the event loop
+COMPRESS_OFFLOAD_BYTES = int(os.getenv("COMPRESS_OFFLOAD_BYTES", "262144"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+COMPRESSED_RESPONSES = REGISTRY.register(Counter(
+    "http_compressed_responses_total", "Responses compressed by the app, by content coding",
+    labelnames=("encoding",),
+))
+COMPRESSION_BYTES_IN = REGISTRY.register(Counter(
+    "http_compression_input_bytes_total", "Response bytes before compression",
+    labelnames=("encoding",),
+))
+COMPRESSION_BYTES_OUT = REGISTRY.register(Counter(
+    "http_compression_output_bytes_total", "Response bytes sent after compression",
+    labelnames=("encoding",),
+))
+
+
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    """Content codings from an Accept-Encoding header, without any refused by q=0."""
+    codings = []
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        codings.append(coding)
+    return codings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+def is_compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES) and "content-encoding" not in headers
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing large JSON/text responses (see module docstring)."""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Held until the body shows whether it is worth compressing
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            passthrough = True
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if not is_compressible(headers) or message.get("more_body", False) or len(body) < self.minimum_size:
+                await send(start)
+                await send(message)
+                return
+
+            # Large enough to compress for clients that accept it
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is not None:
+                if len(body) > COMPRESS_OFFLOAD_BYTES:
+                    compressed = await asyncio.to_thread(compress, body, encoding)
+                else:
+                    compressed = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(compressed))
+                COMPRESSED_RESPONSES.inc(encoding=encoding)
+                COMPRESSION_BYTES_IN.inc(len(body), encoding=encoding)
+                COMPRESSION_BYTES_OUT.inc(len(compressed), encoding=encoding)
+                body = compressed
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def compression_stats():
+    """Responses compressed and bytes saved, by content coding (this worker)."""
+    by_encoding = {}
+    for (encoding,), count in list(COMPRESSED_RESPONSES.values.items()):
+        bytes_in = COMPRESSION_BYTES_IN.values.get((encoding,), 0)
+        bytes_out = COMPRESSION_BYTES_OUT.values.get((encoding,), 0)
+        by_encoding[encoding] = {
+            "responses": int(count),
+            "bytes_in": int(bytes_in),
+            "bytes_out": int(bytes_out),
+            "ratio": round(bytes_out / bytes_in, 4) if bytes_in else None,
+        }
+    return {
+        "min_bytes": COMPRESS_MIN_BYTES,
+        "gzip_level": COMPRESS_GZIP_LEVEL,
+        "brotli_quality": COMPRESS_BROTLI_QUALITY if brotli is not None else None,
+        "by_encoding": by_encoding,
+    }
@@ -0,0 +1,139 @@
+"""
+Registry of dispatched outbound conversations.
+
+When a call is dispatched we already hold the customer's row; stashing it here
+(together with precomputed case details) lets the agent's first tool webhooks
+be answered from memory while the callee is still saying "hello". Entries are
+reachable by phone and by ElevenLabs conversation_id.
+
+Entries also collect what the call log needs when update-status ends the
+call: the agent that placed it, when it was dispatched and the last payment
+plan proposed to the customer.
+
+Both indexes come from state_backend.make_cache(), so with STATE_BACKEND=redis
+a call dispatched by one worker is found by whichever worker receives its
+tool webhooks. Entries are values, not shared objects: every change is
+written back with _save() (to Redis as JSON, see encode_entry()).
+"""
+
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from metrics import Histogram
+from state_backend import make_cache
+
+
+CONVERSATION_TTL_SECS = float(os.getenv("CONVERSATION_TTL_SECS", "900"))
+CONVERSATION_MAX_ENTRIES = int(os.getenv("CONVERSATION_MAX_ENTRIES", "5000"))
+
+
+@dataclass
+class DispatchedConversation:
+    """A call we placed and the data its tools will ask for."""
+    phone: str
+    conversation_id: Optional[str]
+    customer: Dict[str, Any]
+    case_details: Dict[str, Any]
+    dispatched_at: float  # time.monotonic() when the dispatch request was sent
+    agent_id: Optional[str] = None
+    first_tool_at: Optional[float] = None
+    plan_offered: Optional[Dict[str, Any]] = None
+    plan_accepted: Optional[bool] = None
+
+    def started_at(self) -> str:
+        """Wall-clock dispatch time (ISO 8601)."""
+        return datetime.fromtimestamp(time.time() - (time.monotonic() - self.dispatched_at)).astimezone().isoformat()
+
+
+def encode_entry(entry: DispatchedConversation) -> Dict[str, Any]:
+    return asdict(entry)
+
+
+def decode_entry(data: Dict[str, Any]) -> DispatchedConversation:
+    return DispatchedConversation(**data)
+
+
+class ConversationRegistry:
+    """Dispatched conversations keyed by phone and conversation_id."""
+
+    def __init__(self, ttl_seconds: float = CONVERSATION_TTL_SECS,
+                 max_entries: int = CONVERSATION_MAX_ENTRIES):
+        self.by_phone = make_cache(ttl_seconds, max_entries, name="conversations_by_phone",
+                                   encode=encode_entry, decode=decode_entry)
+        self.by_conversation = make_cache(ttl_seconds, max_entries, name="conversations_by_id",
+                                          encode=encode_entry, decode=decode_entry)
+        self.time_to_first_tool = Histogram(
+            "time_to_first_tool_response_seconds",
+            "Seconds from outbound call dispatch to the first tool response",
+            buckets=(1, 2, 5, 10, 15, 20, 30, 45, 60, 120),
+        )
+
+    async def register(self, phone: str, conversation_id: Optional[str], customer: Dict[str, Any],
+                       case_details: Dict[str, Any], dispatched_at: Optional[float] = None,
+                       agent_id: Optional[str] = None) -> DispatchedConversation:
+        """Stash a dispatched call's customer row and case details."""
+        previous = await self.by_phone.get(phone)
+        entry = DispatchedConversation(
+            phone=phone,
+            conversation_id=conversation_id,
+            customer=customer,
+            case_details=case_details,
+            dispatched_at=dispatched_at if dispatched_at is not None else time.monotonic(),
+            agent_id=agent_id,
+        )
+        if previous is not None and previous.conversation_id == conversation_id:
+            # Re-registered with a fresher row: keep what the call has collected so far
+            entry.agent_id = agent_id or previous.agent_id
+            entry.first_tool_at = previous.first_tool_at
+            entry.plan_offered, entry.plan_accepted = previous.plan_offered, previous.plan_accepted
+        await self._save(entry)
+        return entry
+
+    async def _save(self, entry: DispatchedConversation):
+        await self.by_phone.set(entry.phone, entry)
+        if entry.conversation_id:
+            await self.by_conversation.set(entry.conversation_id, entry)
+
+    async def lookup(self, phone: Optional[str] = None,
+                     conversation_id: Optional[str] = None) -> Optional[DispatchedConversation]:
+        """Find a conversation, preferring the conversation_id when supplied."""
+        if conversation_id:
+            entry = await self.by_conversation.get(conversation_id)
+            if entry is not None:
+                return entry
+        return await self.by_phone.get(phone) if phone else None
+
+    async def forget(self, phone: str):
+        """Drop a phone's conversation (e.g. after its data changed)."""
+        entry = await self.by_phone.pop(phone)
+        if entry is not None and entry.conversation_id:
+            await self.by_conversation.pop(entry.conversation_id)
+
+    async def record_tool_response(self, phone: Optional[str] = None, conversation_id: Optional[str] = None):
+        """Observe time-to-first-tool-response the first time a call's tool answers."""
+        entry = await self.lookup(phone, conversation_id)
+        if entry is None or entry.first_tool_at is not None:
+            return
+        entry.first_tool_at = time.monotonic()
+        await self._save(entry)
+        self.time_to_first_tool.observe(entry.first_tool_at - entry.dispatched_at)
+
+    async def record_plan(self, phone: Optional[str], conversation_id: Optional[str],
+                          plan: Dict[str, Any], accepted: bool):
+        """Remember the latest payment plan proposed during a call."""
+        entry = await self.lookup(phone, conversation_id)
+        if entry is not None:
+            entry.plan_offered, entry.plan_accepted = plan, accepted
+            await self._save(entry)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "active": await self.by_phone.size(),
+            "time_to_first_tool_response": self.time_to_first_tool.snapshot(),
+        }
+
+
+conversations = ConversationRegistry()
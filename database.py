@@ -1,12 +1,26 @@
 """
 Database connection module for Olivia Voice Agent PoC.
 Handles Supabase client initialization and provides reusable connection.
+
+The client is created on first use, not at import: importing the app (a
+worker booting, a test, a CLI --help) needs no credentials. Everything here
+goes through PostgREST (table queries and RPCs), so the client is postgrest's
+directly rather than supabase.create_client(), which also imports and builds
+the auth, storage, realtime and functions clients (roughly a quarter of a
+second per worker) that nothing uses.
 """
 
+import logging
 import os
-from supabase import create_client, Client
+import threading
+from typing import TYPE_CHECKING, Optional
+
+import httpx
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from postgrest import SyncPostgrestClient as Client
+
 # Load environment variables
 load_dotenv()
 
@@ -14,27 +28,81 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-# Validate required environment variables
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError(
-        "Missing required environment variables. "
-        "Please ensure SUPABASE_URL and SUPABASE_KEY are set in your .env file."
-    )
+# Connection pool shared by every PostgREST request. Sized to match the
+# repository thread pool so each worker thread can hold a keep-alive connection.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_TIMEOUT_SECS = float(os.getenv("DB_TIMEOUT_SECS", "10"))
 
-# Initialize Supabase client
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("✅ Supabase client initialized successfully")
-except Exception as e:
-    print(f"❌ Failed to initialize Supabase client: {e}")
-    raise
+logger = logging.getLogger(__name__)
 
+_client: Optional["Client"] = None
+_http_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
 
-def get_supabase_client() -> Client:
+
+def _create_client() -> "Client":
+    global _http_client
+    # Validate required environment variables
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError(
+            "Missing required environment variables. "
+            "Please ensure SUPABASE_URL and SUPABASE_KEY are set in your .env file."
+        )
+    from postgrest import SyncPostgrestClient
+
+    _http_client = httpx.Client(
+        http2=True,
+        timeout=httpx.Timeout(DB_TIMEOUT_SECS),
+        limits=httpx.Limits(
+            max_connections=DB_POOL_SIZE,
+            max_keepalive_connections=DB_POOL_SIZE,
+            keepalive_expiry=60,
+        ),
+        follow_redirects=True,
+    )
+    try:
+        # The same endpoint and auth headers supabase-py's client uses
+        client = SyncPostgrestClient(
+            f"{SUPABASE_URL.rstrip('/')}/rest/v1",
+            headers={
+                "apikey": SUPABASE_KEY,
+                "Authorization": f"Bearer {SUPABASE_KEY}",
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+            },
+            http_client=_http_client,
+        )
+    except Exception as e:
+        logger.error("❌ Failed to initialize Supabase client: %s", e)
+        _http_client.close()
+        _http_client = None
+        raise
+    logger.info("✅ Supabase client initialized successfully")
+    return client
+
+
+def get_supabase_client() -> "Client":
     """
-    Returns the initialized Supabase client.
-    
+    Returns the Supabase client, creating it on first call.
+
     Returns:
-        Client: Supabase client instance
+        Client: PostgREST client for the Supabase project (table() / rpc())
+
+    Raises:
+        ValueError: SUPABASE_URL or SUPABASE_KEY is not set
     """
-    return supabase
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _create_client()
+    return _client
+
+
+def close_supabase_client():
+    """Close the pooled connections; the next get_supabase_client() starts afresh."""
+    global _client, _http_client
+    with _client_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _client, _http_client = None, None
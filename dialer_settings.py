@@ -0,0 +1,34 @@
+"""
+Dialing defaults shared by the campaign runner, the call queue and the API.
+
+Plain settings with no imports from the rest of the app, so models.py can use
+them as request defaults without loading campaign.py or repository.py (and
+with them the database client and the ElevenLabs client).
+"""
+
+import os
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+CAMPAIGN_MAX_CONCURRENT_CALLS = int(os.getenv("CAMPAIGN_MAX_CONCURRENT_CALLS", "5"))
+CAMPAIGN_CALLS_PER_SECOND = float(os.getenv("CAMPAIGN_CALLS_PER_SECOND", "1"))
+CAMPAIGN_MAX_RETRIES = int(os.getenv("CAMPAIGN_MAX_RETRIES", "3"))
+
+# Dialer leases: how long a claimed customer stays reserved for one worker
+CLAIM_LEASE_SECS = int(os.getenv("CLAIM_LEASE_SECS", "900"))
+# Customers called more recently than this are not claimed again
+CLAIM_MIN_RECALL_SECS = int(os.getenv("CLAIM_MIN_RECALL_SECS", "86400"))
+
+
+@dataclass
+class CampaignSettings:
+    """How fast a campaign dials."""
+    max_concurrent: int = CAMPAIGN_MAX_CONCURRENT_CALLS
+    calls_per_second: float = CAMPAIGN_CALLS_PER_SECOND
+    max_retries: int = CAMPAIGN_MAX_RETRIES
+    backoff_base_secs: float = 0.5
+    backoff_max_secs: float = 30.0
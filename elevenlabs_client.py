@@ -0,0 +1,270 @@
+"""
+Shared async client for the ElevenLabs API.
+
+Every ElevenLabs request (call dispatch, agent list) goes through one
+httpx.AsyncClient per process, so connections are pooled and kept alive
+(HTTP/2 when the `h2` package is installed) instead of paying a new TCP+TLS
+handshake per request. On top of the pool:
+
+  - per-endpoint timeouts (ELEVENLABS_TIMEOUTS)
+  - a ceiling on requests in flight (ELEVENLABS_MAX_IN_FLIGHT)
+  - retry with full-jitter exponential backoff, honouring Retry-After
+
+GETs are retried on 429 / 5xx and network errors. A POST (call dispatch) is
+only retried when ElevenLabs cannot have acted on it: a 429, a 503 with
+Retry-After, or a connection that failed before the request was sent. A 500,
+502, 504, read timeout or dropped connection may come after the call was
+placed, so it is returned as a failure rather than risk ringing a customer
+twice.
+
+The API server uses the process-wide client from get_elevenlabs_client();
+synchronous scripts use run_sync().
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import httpx
+from dotenv import load_dotenv
+
+from instrumentation import span
+from metrics import Histogram
+
+load_dotenv()
+
+
+ELEVENLABS_API_BASE_URL = os.getenv("ELEVENLABS_API_BASE_URL", "https://api.elevenlabs.io")
+OUTBOUND_CALL_PATH = "/v1/convai/twilio/outbound-call"
+AGENTS_PATH = "/v1/convai/agents"
+
+ELEVENLABS_MAX_CONNECTIONS = int(os.getenv("ELEVENLABS_MAX_CONNECTIONS", "20"))
+ELEVENLABS_MAX_IN_FLIGHT = int(os.getenv("ELEVENLABS_MAX_IN_FLIGHT", "20"))
+ELEVENLABS_MAX_RETRIES = int(os.getenv("ELEVENLABS_MAX_RETRIES", "2"))
+ELEVENLABS_HTTP2 = os.getenv("ELEVENLABS_HTTP2", "true").lower() in ("1", "true", "yes")
+
+# Seconds, by endpoint. Dispatching a call waits on Twilio; listing agents shouldn't
+ELEVENLABS_TIMEOUTS = {
+    "outbound_call": httpx.Timeout(30.0, connect=5.0),
+    "agents": httpx.Timeout(10.0, connect=5.0),
+}
+
+# Retryable answers to a GET; a POST is only retried on POST_RETRYABLE_STATUS_CODES
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Refused without being processed (503 only when it comes with Retry-After)
+POST_RETRYABLE_STATUS_CODES = {429, 503}
+
+# Failures that happen before the request is sent: safe to retry even for POST
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ElevenLabsError(Exception):
+    """ElevenLabs refused or failed a request."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def backoff_delay(attempt: int, base_secs: float, max_secs: float,
+                  retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff; Retry-After wins when the API sends one."""
+    if retry_after is not None:
+        return min(retry_after, max_secs)
+    return random.uniform(0, min(max_secs, base_secs * (2 ** attempt)))
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _retryable_status(method: str, response: httpx.Response) -> bool:
+    if method == "GET":
+        return response.status_code in RETRYABLE_STATUS_CODES
+    if response.status_code == 503:
+        return _retry_after(response) is not None
+    return response.status_code in POST_RETRYABLE_STATUS_CODES
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ElevenLabsClient:
+    """Pooled, bounded, retrying access to the ElevenLabs API."""
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_connections: int = ELEVENLABS_MAX_CONNECTIONS,
+                 max_in_flight: int = ELEVENLABS_MAX_IN_FLIGHT,
+                 max_retries: int = ELEVENLABS_MAX_RETRIES,
+                 http2: bool = ELEVENLABS_HTTP2,
+                 backoff_base_secs: float = 0.25, backoff_max_secs: float = 10.0):
+        self.api_key = api_key or os.getenv("ELEVENLABS_API_KEY")
+        self.base_url = base_url or os.getenv("ELEVENLABS_API_BASE_URL", ELEVENLABS_API_BASE_URL)
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base_secs = backoff_base_secs
+        self.backoff_max_secs = backoff_max_secs
+        self.http2 = http2 and _http2_available()
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=self.http2,
+            timeout=ELEVENLABS_TIMEOUTS["outbound_call"],
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections,
+                                keepalive_expiry=60.0),
+            headers={"xi-api-key": self.api_key or ""},
+        )
+        self._slots = asyncio.Semaphore(max(1, max_in_flight))
+        self.in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.latency: Dict[str, Histogram] = {
+            endpoint: Histogram(f"elevenlabs_{endpoint}_seconds", f"ElevenLabs {endpoint} request latency")
+            for endpoint in ELEVENLABS_TIMEOUTS
+        }
+
+    async def request(self, endpoint: str, method: str, path: str,
+                      json: Optional[Dict[str, Any]] = None,
+                      max_retries: Optional[int] = None) -> Any:
+        """
+        Send one API request and return the decoded JSON body.
+
+        Retries retryable failures up to `max_retries` times (default: the
+        client's), then raises ElevenLabsError.
+        """
+        retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            try:
+                return await self._send(endpoint, method, path, json)
+            except ElevenLabsError as e:
+                if not e.retryable or attempt >= retries:
+                    self.failures += 1
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base_secs, self.backoff_max_secs, e.retry_after)
+                attempt += 1
+                self.retries += 1
+                logger.warning("⚠️  ElevenLabs %s failed (%s); retry %s/%s in %.2fs",
+                               endpoint, e.status_code or e, attempt, retries, delay)
+                # Back off without holding an in-flight slot
+                await asyncio.sleep(delay)
+
+    async def _send(self, endpoint: str, method: str, path: str, json: Optional[Dict[str, Any]]) -> Any:
+        async with self._slots:
+            self.in_flight += 1
+            self.requests += 1
+            started = time.perf_counter()
+            try:
+                with span("elevenlabs"):
+                    response = await self.client.request(method, path, json=json,
+                                                         timeout=ELEVENLABS_TIMEOUTS[endpoint])
+            except httpx.HTTPError as e:
+                raise ElevenLabsError(
+                    f"{type(e).__name__}: {e}",
+                    retryable=method == "GET" or isinstance(e, _NOT_SENT_ERRORS),
+                )
+            finally:
+                self.in_flight -= 1
+                self.latency[endpoint].observe(time.perf_counter() - started)
+
+        if response.status_code == 200:
+            return response.json()
+        raise ElevenLabsError(
+            response.text[:200],
+            status_code=response.status_code,
+            retryable=_retryable_status(method, response),
+            retry_after=_retry_after(response),
+        )
+
+    async def place_call(self, agent_id: str, to_number: str,
+                         agent_phone_number_id: Optional[str] = None,
+                         dynamic_variables: Optional[Dict[str, Any]] = None,
+                         agent_override: Optional[Dict[str, Any]] = None,
+                         max_retries: Optional[int] = None) -> Dict[str, Any]:
+        """Dispatch an outbound call through Twilio; returns the API response."""
+        payload: Dict[str, Any] = {"agent_id": agent_id, "to_number": to_number}
+        if agent_phone_number_id:
+            payload["agent_phone_number_id"] = agent_phone_number_id
+        agent = dict(agent_override or {})
+        if dynamic_variables:
+            agent["dynamic_variables"] = dynamic_variables
+        if agent:
+            payload["conversation_config_override"] = {"agent": agent}
+        return await self.request("outbound_call", "POST", OUTBOUND_CALL_PATH, json=payload,
+                                  max_retries=max_retries)
+
+    async def list_agents(self) -> List[Dict[str, Any]]:
+        data = await self.request("agents", "GET", AGENTS_PATH)
+        return data.get("agents", [])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "latency": {endpoint: h.snapshot() for endpoint, h in self.latency.items()},
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+_shared_client: Optional[ElevenLabsClient] = None
+
+
+def get_elevenlabs_client() -> ElevenLabsClient:
+    """The process-wide client (created on first use, inside the event loop)."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = ElevenLabsClient()
+    return _shared_client
+
+
+async def close_elevenlabs_client():
+    """Close the pooled connections (called on application shutdown)."""
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
+
+
+def run_sync(operation: Callable[[ElevenLabsClient], Awaitable[T]], **client_kwargs) -> T:
+    """
+    Run one operation from synchronous code (CLI scripts), e.g.
+    run_sync(lambda client: client.list_agents())
+    """
+    async def main():
+        client = ElevenLabsClient(**client_kwargs)
+        try:
+            return await operation(client)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(main())
@@ -0,0 +1,179 @@
+"""
+Local stand-in for the ElevenLabs outbound-call API.
+
+Serves POST /v1/convai/twilio/outbound-call and GET /v1/convai/agents with an
+artificial per-request latency. Each accepted call stays "live" for
+`call_duration` seconds; once `max_live_calls` are live further dispatches get
+a 429 with Retry-After, like the real concurrency limit. A fraction of
+requests can fail with 503 (with Retry-After) to exercise retry logic.
+`handshake_ms` delays every new connection, standing in for the TCP+TLS setup
+a real HTTPS connection costs (so connection reuse shows up in benchmarks).
+
+Usage:
+    python fake_elevenlabs.py --port 8765 --latency-ms 250 --max-live-calls 10
+
+Then point the dialer at it:
+    ELEVENLABS_API_BASE_URL=http://127.0.0.1:8765 ELEVENLABS_API_KEY=local python campaign.py
+"""
+
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+
+class FakeElevenLabs:
+    """Outbound-call bookkeeping plus the HTTP server that serves it."""
+
+    def __init__(self, latency_ms: float = 250.0, max_live_calls: Optional[int] = None,
+                 call_duration: float = 60.0, error_rate: float = 0.0, seed: int = 42,
+                 handshake_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.max_live_calls = max_live_calls
+        self.call_duration = call_duration
+        self.error_rate = error_rate
+        self.handshake = handshake_ms / 1000.0
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.live_until: List[float] = []  # monotonic end time of each live call
+        self.calls: List[Dict[str, Any]] = []
+        self.counts = {"connections": 0, "requests": 0, "accepted": 0, "rate_limited": 0, "errors": 0}
+        self.httpd: Optional[ThreadingHTTPServer] = None
+
+    def handle(self, method: str, path: str, headers, body: bytes):
+        """Dispatch a request; returns (status, payload, extra_headers)."""
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            self.counts["requests"] += 1
+            if not headers.get("xi-api-key"):
+                return 401, {"detail": "Missing xi-api-key"}, {}
+
+            if method == "GET" and path == "/v1/convai/agents":
+                return 200, {"agents": [
+                    {"agent_id": "agent_fake_jess", "name": "Jess"},
+                    {"agent_id": "agent_fake_lina", "name": "Lina"},
+                ]}, {}
+
+            if method != "POST" or path != "/v1/convai/twilio/outbound-call":
+                return 404, {"detail": "Not found"}, {}
+
+            payload = json.loads(body) if body else {}
+            if not payload.get("agent_id") or not payload.get("to_number"):
+                return 422, {"detail": "agent_id and to_number are required"}, {}
+
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.counts["errors"] += 1
+                return 503, {"detail": "Service temporarily unavailable"}, {"Retry-After": "0.05"}
+
+            now = time.monotonic()
+            self.live_until = [t for t in self.live_until if t > now]
+            if self.max_live_calls is not None and len(self.live_until) >= self.max_live_calls:
+                self.counts["rate_limited"] += 1
+                retry_after = max(0.0, min(self.live_until) - now)
+                return 429, {"detail": "Concurrent call limit reached"}, {"Retry-After": f"{retry_after:.3f}"}
+
+            self.live_until.append(now + self.call_duration)
+            self.counts["accepted"] += 1
+            call = {
+                "success": True,
+                "message": "Call initiated",
+                "conversation_id": f"conv_{uuid.uuid4().hex[:20]}",
+                "callSid": f"CA{uuid.uuid4().hex}",
+            }
+            self.calls.append({"to_number": payload["to_number"], **call})
+            return 200, call, {}
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out as separate writes; don't let Nagle hold the body
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with server.lock:
+                    server.counts["connections"] += 1
+                if server.handshake:
+                    time.sleep(server.handshake)
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                try:
+                    status, payload, extra = server.handle(
+                        self.command, urlsplit(self.path).path, self.headers, body
+                    )
+                except Exception as e:
+                    status, payload, extra = 400, {"detail": str(e)}, {}
+
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in extra.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+        """Start serving on a background thread; returns the HTTP server."""
+        self.httpd = ThreadingHTTPServer((host, port), self.make_handler())
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self.httpd
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def shutdown(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+def start_fake_elevenlabs(latency_ms: float = 250.0, max_live_calls: Optional[int] = None,
+                          call_duration: float = 60.0, error_rate: float = 0.0,
+                          port: int = 0, handshake_ms: float = 0.0) -> FakeElevenLabs:
+    """Convenience helper for benchmarks: serve and return the stand-in."""
+    fake = FakeElevenLabs(latency_ms, max_live_calls, call_duration, error_rate, handshake_ms=handshake_ms)
+    fake.serve(port=port)
+    return fake
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local ElevenLabs outbound-call stand-in")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=250.0)
+    parser.add_argument("--max-live-calls", type=int, default=None)
+    parser.add_argument("--call-duration", type=float, default=60.0, help="Seconds each call stays live")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of dispatches failing with 503")
+    parser.add_argument("--handshake-ms", type=float, default=0.0, help="Delay per new connection (TLS stand-in)")
+    args = parser.parse_args()
+
+    fake = start_fake_elevenlabs(args.latency_ms, args.max_live_calls, args.call_duration,
+                                 args.error_rate, args.port, args.handshake_ms)
+    print(f"🧪 Fake ElevenLabs listening on {fake.url} ({args.latency_ms}ms latency)")
+    print(f"   ELEVENLABS_API_BASE_URL={fake.url} ELEVENLABS_API_KEY=local")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.shutdown()
@@ -0,0 +1,522 @@
+"""
+Local PostgREST stand-in for benchmarks and offline development.
+
+Implements the subset of the PostgREST HTTP API that supabase-py uses against
+the `customers` table (select/insert/upsert/update/delete with eq/neq/gt/gte/
+lt/lte/in/is filters, or/and groups, order, limit and offset), backed by an
+in-memory table. An artificial per-request latency makes it behave like a
+remote Supabase project.
+
+Usage:
+    python fake_postgrest.py --port 54321 --customers 1000 --latency-ms 40
+
+Then point the API at it:
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=local uvicorn main:app
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+# Remote procedures exposed under /rest/v1/rpc/<name>; each receives the
+# server and the JSON body and returns a JSON-serialisable value.
+RPC_FUNCTIONS: Dict[str, Callable[["FakePostgrest", Dict[str, Any]], Any]] = {}
+
+
+def rpc(name: str):
+    """Register a fake SQL function."""
+    def decorator(fn):
+        RPC_FUNCTIONS[name] = fn
+        return fn
+    return decorator
+
+
+def _set_phone_e164(row: Dict[str, Any], previous: Optional[Dict[str, Any]] = None):
+    """Mirrors the set_customers_phone_e164 trigger in schema.sql."""
+    phone = row.get("phone") or ""
+    moved = previous is not None and phone != previous.get("phone") \
+        and row.get("phone_e164") == previous.get("phone_e164")
+    if row.get("phone_e164") is None or moved:
+        candidate = "+" + re.sub(r"\D", "", phone)
+        valid = phone.strip().startswith("+") and re.fullmatch(r"\+[1-9]\d{7,14}", candidate)
+        row["phone_e164"] = candidate if valid else None
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split a PostgREST logic expression on commas outside parentheses."""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _coerce(raw: str, sample: Any) -> Any:
+    """Convert a query-string value to the type of the stored column value."""
+    if raw == "null":
+        return None
+    if isinstance(sample, bool):
+        return raw.lower() == "true"
+    if isinstance(sample, (int, float)):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def _match(row: Dict[str, Any], column: str, op: str, raw: str) -> bool:
+    """Evaluate a single `column=op.value` filter against a row."""
+    negate = False
+    if op.startswith("not."):
+        negate = True
+        op = op[4:]
+
+    value = row.get(column)
+    if op != "in":
+        raw = raw.strip('"')
+
+    if op == "is":
+        result = value is None if raw == "null" else value == (raw == "true")
+    elif op == "in":
+        options = [o.strip('"') for o in _split_top_level(raw.strip("()"))]
+        result = value is not None and any(value == _coerce(o, value) for o in options)
+    elif value is None:
+        result = False
+    else:
+        target = _coerce(raw, value)
+        if op == "eq":
+            result = value == target
+        elif op == "neq":
+            result = value != target
+        elif op == "gt":
+            result = value > target
+        elif op == "gte":
+            result = value >= target
+        elif op == "lt":
+            result = value < target
+        elif op == "lte":
+            result = value <= target
+        elif op in ("like", "ilike"):
+            needle = str(raw).replace("*", "").replace("%", "")
+            haystack = str(value)
+            result = needle.lower() in haystack.lower() if op == "ilike" else needle in haystack
+        else:
+            raise ValueError(f"Unsupported operator: {op}")
+
+    return not result if negate else result
+
+
+def _match_expression(row: Dict[str, Any], expression: str) -> bool:
+    """Evaluate `col.op.value` or a nested `and(...)`/`or(...)` group."""
+    if expression.startswith("and(") or expression.startswith("or("):
+        kind, _, inner = expression.partition("(")
+        checks = [_match_expression(row, part) for part in _split_top_level(inner[:-1])]
+        return all(checks) if kind == "and" else any(checks)
+
+    column, _, rest = expression.partition(".")
+    op, _, raw = rest.partition(".")
+    if op == "not":
+        inner_op, _, raw = raw.partition(".")
+        op = f"not.{inner_op}"
+    return _match(row, column, op, raw)
+
+
+@rpc("customer_stats")
+def customer_stats(server: "FakePostgrest", params: Dict[str, Any]) -> Dict[str, Any]:
+    """Python twin of the customer_stats() SQL function in schema.sql."""
+    today = datetime.now().date()
+
+    def bucket(due: Optional[str]) -> str:
+        days = (today - datetime.strptime(due, "%Y-%m-%d").date()).days if due else 0
+        if days <= 0:
+            return "current"
+        if days <= 30:
+            return "1-30"
+        if days <= 60:
+            return "31-60"
+        if days <= 90:
+            return "61-90"
+        return "90+"
+
+    stats = {"total_customers": 0, "total_debt": 0.0, "total_recovered": 0.0,
+             "by_status": {}, "by_risk_level": {}, "overdue_buckets": {}}
+    for row in server.table("customers"):
+        debt = float(row.get("debt_amount") or 0)
+        stats["total_customers"] += 1
+        stats["total_debt"] += debt
+        if row.get("status") == "promised_to_pay":
+            stats["total_recovered"] += debt
+        for group, key in (("by_status", row.get("status") or "unknown"),
+                           ("by_risk_level", row.get("risk_level") or "unknown"),
+                           ("overdue_buckets", bucket(row.get("due_date")))):
+            entry = stats[group].setdefault(key, {"count": 0, "debt": 0.0})
+            entry["count"] += 1
+            entry["debt"] += debt
+    return stats
+
+
+RISK_RANK = {"high": 0, "medium": 1, "low": 2}
+
+
+def _claimable(row: Dict[str, Any], now: str) -> bool:
+    return not row.get("claimed_until") or row["claimed_until"] < now
+
+
+def _recall_due(row: Dict[str, Any], recall_before: datetime) -> bool:
+    return not row.get("last_call_at") or datetime.fromisoformat(row["last_call_at"]) < recall_before
+
+
+@rpc("claim_next_customers")
+def claim_next_customers(server: "FakePostgrest", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Python twin of claim_next_customers() (atomic under the server lock)."""
+    now = _now_iso()
+    statuses = params.get("p_statuses") or ["active"]
+    risk_levels = params.get("p_risk_levels")
+    due_from, due_to = params.get("p_due_from"), params.get("p_due_to")
+    recall_before = datetime.now(timezone.utc) - timedelta(seconds=int(params.get("p_min_recall_secs", 86400)))
+    candidates = [
+        r for r in server.table("customers")
+        if r.get("status") in statuses
+        and (risk_levels is None or r.get("risk_level") in risk_levels)
+        and (due_from is None or (r.get("due_date") and r["due_date"] >= due_from))
+        and (due_to is None or (r.get("due_date") and r["due_date"] <= due_to))
+        and _claimable(r, now)
+        and _recall_due(r, recall_before)
+    ]
+    candidates.sort(key=lambda r: (
+        RISK_RANK.get(r.get("risk_level"), 3),
+        r.get("due_date") is None, r.get("due_date") or "",
+        -float(r.get("debt_amount") or 0),
+        r.get("last_call_at") is not None, r.get("last_call_at") or "",
+        r["id"],
+    ))
+    lease = timedelta(seconds=int(params.get("p_lease_secs", 900)))
+    claimed_until = (datetime.now(timezone.utc) + lease).isoformat()
+    picked = candidates[:int(params.get("p_limit", 1))]
+    for row in picked:
+        row.update({"claimed_by": params["p_worker"], "claimed_until": claimed_until, "updated_at": now})
+    return [dict(r, risk_rank=RISK_RANK.get(r.get("risk_level"), 3)) for r in picked]
+
+
+@rpc("release_customer_claims")
+def release_customer_claims(server: "FakePostgrest", params: Dict[str, Any]) -> int:
+    """Python twin of release_customer_claims()."""
+    ids = set(params.get("p_ids") or [])
+    released = 0
+    for row in server.table("customers"):
+        if row["id"] in ids and row.get("claimed_by") == params.get("p_worker"):
+            row.update({"claimed_by": None, "claimed_until": None, "updated_at": _now_iso()})
+            released += 1
+    return released
+
+
+@rpc("apply_customer_updates")
+def apply_customer_updates(server: "FakePostgrest", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Python twin of apply_customer_updates()."""
+    by_phone = {r.get("phone_e164"): r for r in server.table("customers")}
+    matched = []
+    for update in params.get("p_updates") or []:
+        row = by_phone.get(update.get("phone"))
+        if row is None:
+            continue
+        row.update({k: v for k, v in update.items() if k != "phone" and v is not None})
+        row["updated_at"] = _now_iso()
+        matched.append({"phone": row["phone_e164"]})
+    return matched
+
+
+class Query:
+    """Parsed PostgREST query string."""
+
+    def __init__(self, query_string: str):
+        self.select: Optional[str] = None
+        self.order: List[tuple] = []
+        self.limit: Optional[int] = None
+        self.offset: int = 0
+        self.on_conflict: Optional[str] = None
+        self.filters: List[tuple] = []
+
+        for key, value in parse_qsl(query_string, keep_blank_values=True):
+            if key == "select":
+                self.select = value
+            elif key == "order":
+                for term in value.split(","):
+                    parts = term.split(".")
+                    self.order.append((parts[0], "desc" in parts[1:], "nullsfirst" in parts[1:]))
+            elif key == "limit":
+                self.limit = int(value)
+            elif key == "offset":
+                self.offset = int(value)
+            elif key == "on_conflict":
+                self.on_conflict = value
+            elif key in ("or", "and"):
+                self.filters.append((key, None, value))
+            elif key not in RESERVED_PARAMS:
+                op, _, raw = value.partition(".")
+                if op == "not":
+                    inner_op, _, raw = raw.partition(".")
+                    op = f"not.{inner_op}"
+                self.filters.append((key, op, raw))
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        for column, op, raw in self.filters:
+            if column in ("or", "and") and op is None:
+                if not _match_expression(row, f"{column}{raw}"):
+                    return False
+            elif not _match(row, column, op, raw):
+                return False
+        return True
+
+    def project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.select or self.select == "*":
+            return dict(row)
+        columns = [c.strip() for c in self.select.split(",") if c.strip()]
+        return {c: row.get(c) for c in columns}
+
+    def apply(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        result = [r for r in rows if self.matches(r)]
+        for column, desc, nulls_first in reversed(self.order):
+            present = [r for r in result if r.get(column) is not None]
+            missing = [r for r in result if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=desc)
+            result = missing + present if nulls_first else present + missing
+        result = result[self.offset:]
+        if self.limit is not None:
+            result = result[:self.limit]
+        return result
+
+
+class FakePostgrest:
+    """In-memory tables plus the HTTP server that serves them."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.tables: Dict[str, List[Dict[str, Any]]] = {"customers": []}
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.httpd: Optional[ThreadingHTTPServer] = None
+
+    # --- data helpers -----------------------------------------------------
+
+    def seed_customers(self, count: int, seed: int = 42) -> List[Dict[str, Any]]:
+        """Populate the customers table with deterministic synthetic rows."""
+        rng = random.Random(seed)
+        today = datetime.now().date()
+        statuses = ["active"] * 6 + ["promised_to_pay", "callback_requested", "refused", "voicemail"]
+        rows = []
+        for i in range(count):
+            stamp = (datetime.now(timezone.utc) - timedelta(seconds=i)).isoformat()
+            rows.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "phone": f"+1555{i:07d}",
+                "phone_e164": f"+1555{i:07d}",
+                "name": f"Customer {i}",
+                "debt_amount": round(rng.uniform(50, 5000), 2),
+                "due_date": (today - timedelta(days=rng.randint(-30, 365))).isoformat(),
+                "status": rng.choice(statuses),
+                "risk_level": rng.choice(["low", "medium", "high"]),
+                "created_at": stamp,
+                "updated_at": stamp,
+            })
+        with self.lock:
+            self.tables.setdefault("customers", []).extend(rows)
+        return rows
+
+    def table(self, name: str) -> List[Dict[str, Any]]:
+        return self.tables.setdefault(name, [])
+
+    # --- HTTP handling ----------------------------------------------------
+
+    def handle(self, method: str, path: str, query_string: str, headers, body: bytes):
+        """Dispatch a request; returns (status, payload, extra_headers)."""
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            self.request_count += 1
+            parts = [p for p in path.split("/") if p]
+            if len(parts) < 3 or parts[:2] != ["rest", "v1"]:
+                return 404, {"message": "Not found"}, {}
+
+            payload = json.loads(body) if body else None
+
+            if parts[2] == "rpc":
+                fn = RPC_FUNCTIONS.get(parts[3]) if len(parts) > 3 else None
+                if fn is None:
+                    return 404, {"message": f"Function {parts[3:]} not found"}, {}
+                return 200, fn(self, payload or {}), {}
+
+            table = self.table(parts[2])
+            query = Query(query_string)
+            prefer = headers.get("Prefer", "")
+
+            if method == "GET":
+                rows = query.apply(table)
+                extra = {}
+                if "count=exact" in prefer:
+                    total = sum(1 for r in table if query.matches(r))
+                    extra["Content-Range"] = f"0-{max(len(rows) - 1, 0)}/{total}"
+                return 200, [query.project(r) for r in rows], extra
+
+            if method == "POST":
+                records = payload if isinstance(payload, list) else [payload]
+                merge = "merge-duplicates" in prefer
+                conflict_column = query.on_conflict or "id"
+                # Unique indexes: the conflict target, customers.phone and customers.phone_e164
+                by_conflict = {r.get(conflict_column): r for r in table} if merge else {}
+                phones = {p for r in table for p in (r.get("phone"), r.get("phone_e164")) if p} \
+                    if parts[2] == "customers" else set()
+                written = []
+                for record in records:
+                    existing = None
+                    if merge and record.get(conflict_column) is not None:
+                        existing = by_conflict.get(record[conflict_column])
+                    if existing is not None:
+                        previous = dict(existing)
+                        existing.update(record)
+                        if parts[2] == "customers":
+                            _set_phone_e164(existing, previous)
+                        existing["updated_at"] = _now_iso()
+                        written.append(existing)
+                        continue
+                    if parts[2] == "customers" and (record.get("phone") in phones
+                                                    or record.get("phone_e164") in phones):
+                        return 409, {"code": "23505", "message": "duplicate key value violates unique constraint",
+                                     "details": None, "hint": None}, {}
+                    row = {"id": str(uuid.uuid4()), "created_at": _now_iso(), "updated_at": _now_iso()}
+                    if parts[2] == "customers":
+                        # Column defaults from schema.sql
+                        row.update({"status": "active", "risk_level": "medium"})
+                    row.update(record)
+                    if parts[2] == "customers":
+                        _set_phone_e164(row)
+                    table.append(row)
+                    written.append(row)
+                    phones.add(row.get("phone"))
+                    if merge:
+                        by_conflict[row.get(conflict_column)] = row
+                if "return=minimal" in prefer:
+                    return 201, None, {}
+                return 201, [query.project(r) for r in written], {}
+
+            if method == "PATCH":
+                matched = [r for r in table if query.matches(r)]
+                for row in matched:
+                    previous = dict(row)
+                    row.update(payload or {})
+                    if parts[2] == "customers":
+                        _set_phone_e164(row, previous)
+                    row["updated_at"] = _now_iso()
+                return 200, [query.project(r) for r in matched], {}
+
+            if method == "DELETE":
+                matched = [r for r in table if query.matches(r)]
+                doomed = {id(r) for r in matched}
+                self.tables[parts[2]] = [r for r in table if id(r) not in doomed]
+                if parts[2] == "customers":
+                    # Mirrors the record_customer_tombstone trigger in schema.sql
+                    self.table("customer_tombstones").extend(
+                        {"id": r["id"], "deleted_at": _now_iso()} for r in matched
+                    )
+                return 200, [query.project(r) for r in matched], {}
+
+            return 405, {"message": "Method not allowed"}, {}
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self):
+                split = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                try:
+                    status, payload, extra = server.handle(
+                        self.command, split.path, split.query, self.headers, body
+                    )
+                except Exception as e:
+                    status, payload, extra = 400, {"message": str(e)}, {}
+
+                data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in extra.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+        """Start serving on a background thread; returns the HTTP server."""
+        self.httpd = ThreadingHTTPServer((host, port), self.make_handler())
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self.httpd
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def shutdown(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+def start_fake_postgrest(customers: int = 1000, latency_ms: float = 0.0, port: int = 0) -> FakePostgrest:
+    """Convenience helper for benchmarks: seed, serve and return the stand-in."""
+    fake = FakePostgrest(latency_ms=latency_ms)
+    fake.seed_customers(customers)
+    fake.serve(port=port)
+    return fake
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local PostgREST stand-in")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    fake = start_fake_postgrest(args.customers, args.latency_ms, args.port)
+    print(f"🧪 Fake PostgREST listening on {fake.url} ({args.customers} customers, {args.latency_ms}ms latency)")
+    print(f"   SUPABASE_URL={fake.url} SUPABASE_KEY=local")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.shutdown()
@@ -0,0 +1,61 @@
+"""
+Production serving: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+One worker per core by default (WEB_CONCURRENCY overrides). With more than
+one worker, run Redis and set STATE_BACKEND=redis so the customer cache,
+dispatched conversations and campaign status are shared (state_backend.py).
+
+ELEVENLABS_MAX_IN_FLIGHT / ELEVENLABS_MAX_CONNECTIONS are limits for the
+whole deployment: each worker gets an equal share, so adding workers never
+lets more requests reach ElevenLabs at once.
+"""
+
+import math
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+# The shares below must see .env values before workers load it themselves
+load_dotenv()
+
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# ElevenLabs gives up on a tool webhook after 20s; nothing legitimate runs longer
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+# Long enough for the write-behind buffer and call log to flush on shutdown
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 75  # above typical load balancer idle timeouts
+
+# Each worker imports the app itself: thread pools, HTTP clients and the log
+# listener thread must not be created before the fork
+preload_app = False
+
+# Access logging is the metrics middleware's job
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+
+def _share(name: str, default: int):
+    total = int(os.getenv(name, str(default)))
+    os.environ[name] = str(max(1, math.ceil(total / workers)))
+
+
+# Workers inherit the environment at fork
+_share("ELEVENLABS_MAX_IN_FLIGHT", 20)
+_share("ELEVENLABS_MAX_CONNECTIONS", 20)
+
+
+def on_starting(server):
+    backend = os.getenv("STATE_BACKEND", "memory").lower()
+    if workers > 1 and backend != "redis":
+        server.log.warning(
+            "%s workers with STATE_BACKEND=%s: caches, dispatched conversations and campaign "
+            "status are per worker. Set STATE_BACKEND=redis for a shared view.", workers, backend,
+        )
@@ -0,0 +1,322 @@
+"""
+Bulk customer import from XLSX/CSV portfolio drops.
+
+Rows are streamed from the file (openpyxl read-only mode for XLSX, csv for
+CSV), phones are normalised to E.164, every row is validated with
+CreateCustomerRequest and valid rows are upserted on `phone_e164` in batches, with
+several batches in flight at once. A 50k-row file is a few dozen round trips
+instead of two per row.
+
+The header row is found automatically, so report exports with title and
+filter rows above the table (like the "missing renewals" spreadsheets) work
+as-is. Column names are matched against HEADER_ALIASES.
+
+Usage:
+    python importer.py "documents/portfolio.xlsx" --batch-size 1000 --concurrency 4
+    python importer.py customers.csv --dry-run        # validate only
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import os
+import re
+import time
+from datetime import date, datetime
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence
+
+from pydantic import ValidationError
+
+from models import CreateCustomerRequest, ImportReport, ImportRowError
+from phones import PHONE_DEFAULT_COUNTRY_CODE, normalize_phone
+
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", "4"))
+
+# Only the first few rejected rows are reported individually
+MAX_REPORTED_ERRORS = 50
+
+# Rows scanned looking for the header before giving up
+HEADER_SEARCH_ROWS = 50
+
+# customers column -> header spellings seen in exports (compared lower-cased)
+HEADER_ALIASES = {
+    "name": ["name", "customer name", "full name", "customer", "plan: opportunity: opportunity name"],
+    "phone": ["phone", "phone number", "mobile", "mobile phone", "cell", "telephone", "contact phone"],
+    "debt_amount": ["debt_amount", "debt amount", "debt", "amount", "balance", "amount due",
+                    "create olive commission"],
+    "due_date": ["due_date", "due date", "expiry date", "plan: expiry date"],
+    "status": ["status"],
+    "risk_level": ["risk_level", "risk level", "risk"],
+}
+REQUIRED_HEADERS = ("name", "debt_amount")
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%Y/%m/%d")
+
+# "Sylvia Harris - 2012 Ford EDGE": opportunity names carry the vehicle
+_NAME_VEHICLE_SUFFIX = re.compile(r"\s*-\s*(?=(?:19|20)\d{2}\b).*$")
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def detect_format(filename: Optional[str] = None, content_type: Optional[str] = None) -> str:
+    """'xlsx' or 'csv' from a file name or MIME type; raises ValueError otherwise."""
+    name = (filename or "").lower()
+    mime = (content_type or "").lower()
+    if name.endswith(".xlsx") or "spreadsheetml" in mime:
+        return "xlsx"
+    if name.endswith(".csv") or "csv" in mime or mime.startswith("text/"):
+        return "csv"
+    raise ValueError("Unsupported file type: upload .xlsx or .csv")
+
+
+def iter_csv_rows(fileobj: IO[bytes]) -> Iterator[Sequence[Any]]:
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def iter_xlsx_rows(fileobj: IO[bytes]) -> Iterator[Sequence[Any]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("XLSX import needs openpyxl: pip install openpyxl")
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_rows(fileobj: IO[bytes], fmt: str) -> Iterator[Sequence[Any]]:
+    return iter_xlsx_rows(fileobj) if fmt == "xlsx" else iter_csv_rows(fileobj)
+
+
+def _header_key(cell: Any) -> str:
+    # Report exports decorate sorted columns with arrows
+    return re.sub(r"\s+", " ", str(cell or "").replace("↑", "").replace("↓", "")).strip().lower()
+
+
+def map_header(row: Sequence[Any]) -> Optional[Dict[str, int]]:
+    """Column index per customers field if `row` looks like the header row."""
+    lookup = {alias: field for field, aliases in HEADER_ALIASES.items() for alias in aliases}
+    mapping: Dict[str, int] = {}
+    for index, cell in enumerate(row):
+        field = lookup.get(_header_key(cell))
+        if field and field not in mapping:
+            mapping[field] = index
+    return mapping if all(f in mapping for f in REQUIRED_HEADERS) else None
+
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+def _text(value: Any) -> str:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() if value is not None else ""
+
+
+def _amount(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = _text(value).replace("$", "").replace(",", "")
+    if not text:
+        raise ValueError("Debt amount is missing")
+    return float(text)
+
+
+def _due_date(value: Any) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = _text(value)
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised due date: {text!r}")
+
+
+def parse_row(values: Sequence[Any], mapping: Dict[str, int],
+              default_country_code: str = PHONE_DEFAULT_COUNTRY_CODE) -> Dict[str, Any]:
+    """
+    One spreadsheet row -> a customers row, validated with CreateCustomerRequest.
+
+    Only mapped columns are returned, so re-importing a file without a status
+    column never resets statuses set by calls. Raises ValueError on bad data.
+    """
+    def cell(field):
+        index = mapping.get(field)
+        return values[index] if index is not None and index < len(values) else None
+
+    data: Dict[str, Any] = {
+        "name": _NAME_VEHICLE_SUFFIX.sub("", _text(cell("name"))),
+        "phone": normalize_phone(cell("phone"), default_country_code),
+        "debt_amount": _amount(cell("debt_amount")),
+    }
+    if not data["name"]:
+        raise ValueError("Name is missing")
+    if "due_date" in mapping:
+        data["due_date"] = _due_date(cell("due_date"))
+    for field in ("status", "risk_level"):
+        if field in mapping and _text(cell(field)):
+            data[field] = _text(cell(field)).lower()
+
+    try:
+        customer = CreateCustomerRequest(**data)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+    return customer.model_dump(include=set(mapping) | {"phone"})
+
+
+def iter_batches(fileobj: IO[bytes], fmt: str, report: ImportReport,
+                 batch_size: int = IMPORT_BATCH_SIZE,
+                 default_country_code: str = PHONE_DEFAULT_COUNTRY_CODE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield validated rows in batches of up to `batch_size`, updating `report`.
+
+    A phone repeated within a batch keeps its last row (one upsert cannot
+    touch the same row twice).
+    """
+    rows = iter_rows(fileobj, fmt)
+    mapping = None
+    for line, values in enumerate(rows, start=1):
+        mapping = map_header(values)
+        if mapping:
+            break
+        if line >= HEADER_SEARCH_ROWS:
+            break
+    if not mapping:
+        raise ValueError(
+            "No header row found; expected columns like: "
+            + ", ".join(HEADER_ALIASES[f][0] for f in HEADER_ALIASES)
+        )
+    report.missing_columns = [f for f in ("phone", "due_date") if f not in mapping]
+
+    batch: Dict[str, Dict[str, Any]] = {}
+    for line, values in enumerate(rows, start=line + 1):
+        if not any(_text(v) for v in values):
+            continue
+        report.rows_read += 1
+        try:
+            record = parse_row(values, mapping, default_country_code)
+        except ValueError as e:
+            report.rejected += 1
+            if len(report.errors) < MAX_REPORTED_ERRORS:
+                report.errors.append(ImportRowError(row=line, error=str(e)))
+            continue
+        if record["phone"] in batch:
+            report.duplicates += 1
+            del batch[record["phone"]]
+        batch[record["phone"]] = record
+        report.valid += 1
+        if len(batch) >= batch_size:
+            yield list(batch.values())
+            batch = {}
+    if batch:
+        yield list(batch.values())
+
+
+# ============================================================================
+# IMPORTING
+# ============================================================================
+
+async def import_customers(fileobj: IO[bytes], fmt: str, repo,
+                           batch_size: int = IMPORT_BATCH_SIZE,
+                           concurrency: int = IMPORT_CONCURRENCY,
+                           dry_run: bool = False,
+                           default_country_code: str = PHONE_DEFAULT_COUNTRY_CODE) -> ImportReport:
+    """
+    Stream `fileobj` into the customers table; returns the import report.
+
+    Parsing runs on a worker thread a batch at a time while up to
+    `concurrency` upserts are in flight. Raises ValueError if the file has
+    no recognisable header row.
+    """
+    report = ImportReport(dry_run=dry_run)
+    started = time.perf_counter()
+    batches = iter_batches(fileobj, fmt, report, batch_size, default_country_code)
+    slots = asyncio.Semaphore(max(1, concurrency))
+    pending = set()
+
+    async def write(batch):
+        try:
+            written = await repo.upsert_many(batch, on_conflict="phone_e164")
+            report.imported += written
+        except Exception as e:
+            report.rejected += len(batch)
+            report.failed_batches += 1
+            if len(report.errors) < MAX_REPORTED_ERRORS:
+                report.errors.append(ImportRowError(row=None, error=f"Batch of {len(batch)} failed: {e}"))
+        finally:
+            slots.release()
+
+    try:
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            report.batches += 1
+            if dry_run:
+                continue
+            await slots.acquire()
+            task = asyncio.create_task(write(batch))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+    finally:
+        if pending:
+            await asyncio.gather(*pending)
+
+    report.elapsed_secs = round(time.perf_counter() - started, 3)
+    report.rows_per_sec = round(report.rows_read / report.elapsed_secs, 1) if report.elapsed_secs else None
+    return report
+
+
+def print_report(report: ImportReport):
+    print("=" * 60)
+    print(f"📊 Import {'(dry run) ' if report.dry_run else ''}complete")
+    print("=" * 60)
+    print(f"Rows read: {report.rows_read}  Valid: {report.valid}  Imported: {report.imported}")
+    print(f"Rejected: {report.rejected}  Duplicate phones: {report.duplicates}  Batches: {report.batches}")
+    print(f"Elapsed: {report.elapsed_secs}s  Throughput: {report.rows_per_sec} rows/s")
+    if report.missing_columns:
+        print(f"⚠️  File has no column for: {', '.join(report.missing_columns)}")
+    shown = report.errors[:10]
+    for error in shown:
+        print(f"❌ Row {error.row}: {error.error}")
+    if report.rejected > len(shown):
+        print(f"   ... {report.rejected - len(shown)} more rejected")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import customers from an XLSX or CSV file")
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=IMPORT_CONCURRENCY, help="Batches in flight")
+    parser.add_argument("--country-code", default=PHONE_DEFAULT_COUNTRY_CODE,
+                        help="Country code for numbers without one (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true", help="Validate without writing")
+    args = parser.parse_args()
+
+    from repository import CustomerRepository
+
+    print(f"📥 Importing {args.path}...")
+    with open(args.path, "rb") as f:
+        result = asyncio.run(import_customers(
+            f, detect_format(args.path), CustomerRepository(),
+            batch_size=args.batch_size, concurrency=args.concurrency,
+            dry_run=args.dry_run, default_country_code=args.country_code,
+        ))
+    print_report(result)
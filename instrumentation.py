@@ -0,0 +1,192 @@
+"""
+Request latency instrumentation for the API server.
+
+MetricsMiddleware times every HTTP request by route template
+(/api/customers/{customer_id}, not the concrete URL) and counts responses by
+status code. Inside a request, dependency calls are timed with span():
+repository.run_query wraps each Supabase query in span("supabase") and the
+ElevenLabs client wraps each HTTP call in span("elevenlabs"). Spans are
+collected per request and recorded under the request's route once it
+finishes, so a slow tool webhook can be split into database time, ElevenLabs
+time and our own time.
+
+ElevenLabs gives up on a tool webhook after `response_timeout_secs` (20s in
+tools_config/). Tool routes also count how many responses used more than
+half, 80% and all of that budget.
+
+Tasks started while handling a request (a campaign, a background refresh)
+are created with create_background_task(), so their spans are recorded under
+"background" rather than appended to a request that has already finished.
+
+Everything is exposed in Prometheus text format on GET /metrics.
+"""
+
+import asyncio
+import glob
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Coroutine, Dict, List, Optional, Tuple
+
+from metrics import REGISTRY, Counter, Gauge, HistogramFamily
+
+
+TOOLS_CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools_config")
+
+
+def _tool_timeout_from_config(directory: str = TOOLS_CONFIG_DIR) -> Optional[float]:
+    """The tightest response_timeout_secs across the ElevenLabs tool configs."""
+    timeouts = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                timeout = json.load(f).get("response_timeout_secs")
+        except (OSError, ValueError):
+            continue
+        if timeout:
+            timeouts.append(float(timeout))
+    return min(timeouts) if timeouts else None
+
+
+TOOL_RESPONSE_TIMEOUT_SECS = float(
+    os.getenv("TOOL_RESPONSE_TIMEOUT_SECS") or _tool_timeout_from_config() or 20
+)
+TOOL_ROUTE_PREFIX = "/tools/"
+# Fractions of the tool timeout reported by tool_timeout_budget_exceeded_total
+TOOL_BUDGET_FRACTIONS = (0.5, 0.8, 1.0)
+
+# Dependencies timed outside a request (campaign workers, startup warm-up)
+BACKGROUND_ROUTE = "background"
+
+REQUEST_LATENCY = REGISTRY.register(HistogramFamily(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    labelnames=("method", "route"),
+))
+REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP responses by route template and status code",
+    labelnames=("method", "route", "status"),
+))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled",
+))
+DEPENDENCY_LATENCY = REGISTRY.register(HistogramFamily(
+    "dependency_duration_seconds", "Time spent in Supabase / ElevenLabs calls, by calling route",
+    labelnames=("dependency", "route"),
+))
+DEPENDENCY_TIME_PER_REQUEST = REGISTRY.register(HistogramFamily(
+    "dependency_time_per_request_seconds", "Total time one request spent waiting on a dependency",
+    labelnames=("dependency", "route"),
+))
+TOOL_BUDGET_EXCEEDED = REGISTRY.register(Counter(
+    "tool_timeout_budget_exceeded_total",
+    f"Tool webhook responses slower than a fraction of the {TOOL_RESPONSE_TIMEOUT_SECS:g}s ElevenLabs timeout",
+    labelnames=("route", "fraction"),
+))
+
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+
+@contextmanager
+def span(dependency: str):
+    """Time a dependency call; attributed to the current request's route."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        spans = _request_spans.get()
+        if spans is None:
+            DEPENDENCY_LATENCY.observe(elapsed, dependency=dependency, route=BACKGROUND_ROUTE)
+        else:
+            spans.append((dependency, elapsed))
+
+
+async def _detached(coro: Coroutine[Any, Any, Any]) -> Any:
+    # Runs in the task's own copy of the context: the request is unaffected
+    _request_spans.set(None)
+    return await coro
+
+
+def create_background_task(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    """
+    asyncio.create_task() for work that outlives the current request.
+
+    A task copies the context it was created in, and with it the request's
+    span list; spans recorded after the request finished would go nowhere.
+    Here they are recorded under BACKGROUND_ROUTE instead.
+    """
+    return asyncio.create_task(_detached(coro))
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _record(method: str, route: str, status: int, elapsed: float, spans: List[Tuple[str, float]]):
+    REQUEST_LATENCY.observe(elapsed, method=method, route=route)
+    REQUESTS.inc(method=method, route=route, status=str(status))
+
+    per_dependency: Dict[str, float] = {}
+    for dependency, seconds in spans:
+        DEPENDENCY_LATENCY.observe(seconds, dependency=dependency, route=route)
+        per_dependency[dependency] = per_dependency.get(dependency, 0.0) + seconds
+    for dependency, seconds in per_dependency.items():
+        DEPENDENCY_TIME_PER_REQUEST.observe(seconds, dependency=dependency, route=route)
+
+    if route.startswith(TOOL_ROUTE_PREFIX):
+        for fraction in TOOL_BUDGET_FRACTIONS:
+            if elapsed > fraction * TOOL_RESPONSE_TIMEOUT_SECS:
+                TOOL_BUDGET_EXCEEDED.inc(route=route, fraction=f"{fraction:g}")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status codes and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        spans: List[Tuple[str, float]] = []
+        token = _request_spans.set(spans)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_FLIGHT.dec()
+            _request_spans.reset(token)
+            # The router stores the matched route on the scope
+            _record(scope["method"], _route_template(scope), status, elapsed, spans)
+
+
+def latency_summary() -> Dict[str, Dict[str, object]]:
+    """Per-route p50/p95/p99, p95 time per dependency and the share of the tool timeout the p99 uses."""
+    summary = {}
+    for (method, route), histogram in sorted(REQUEST_LATENCY.children.items()):
+        snapshot = histogram.snapshot()
+        entry = {key: snapshot[key] for key in ("count", "avg", "p50", "p95", "p99")}
+        entry["dependency_p95"] = {
+            dependency: DEPENDENCY_TIME_PER_REQUEST.children[(dependency, child_route)].percentile(95)
+            for dependency, child_route in list(DEPENDENCY_TIME_PER_REQUEST.children)
+            if child_route == route
+        }
+        if route.startswith(TOOL_ROUTE_PREFIX) and snapshot["p99"] is not None:
+            entry["p99_timeout_budget_used"] = round(snapshot["p99"] / TOOL_RESPONSE_TIMEOUT_SECS, 4)
+        summary[f"{method} {route}"] = entry
+    return summary
@@ -1,7 +1,7 @@
 
 import os
-import requests
 from dotenv import load_dotenv
+from elevenlabs_client import ElevenLabsError, run_sync
 
 # Load environment variables
 load_dotenv()
@@ -13,30 +13,20 @@ if not ELEVENLABS_API_KEY:
     exit(1)
 
 def list_agents():
-    url = "https://api.elevenlabs.io/v1/convai/agents"
-    headers = {
-        "xi-api-key": ELEVENLABS_API_KEY
-    }
-    
     try:
-        response = requests.get(url, headers=headers)
+        agents = run_sync(lambda client: client.list_agents())
         
-        if response.status_code == 200:
-            data = response.json()
-            agents = data.get('agents', [])
-            
-            print(f"✅ Found {len(agents)} agents:")
+        print(f"✅ Found {len(agents)} agents:")
+        print("-" * 40)
+        
+        for agent in agents:
+            print(f"Name: {agent.get('name')}")
+            print(f"ID:   {agent.get('agent_id')}")
             print("-" * 40)
             
-            for agent in agents:
-                print(f"Name: {agent.get('name')}")
-                print(f"ID:   {agent.get('agent_id')}")
-                print("-" * 40)
-                
-        else:
-            print(f"❌ Error: {response.status_code}")
-            print(response.text)
-            
+    except ElevenLabsError as e:
+        print(f"❌ Error: {e.status_code or 'request failed'}")
+        print(e)
     except Exception as e:
         print(f"❌ Exception: {e}")
 
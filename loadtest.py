@@ -0,0 +1,363 @@
+"""
+Load test replaying ElevenLabs tool-call traffic.
+
+Each simulated conversation makes the calls an agent makes during a call,
+with think time between tools:
+
+    --flow split     get-customer-name -> get-case-details -> propose-payment-plan x N -> update-status
+    --flow combined  get-conversation-context -> propose-payment-plan x N -> update-status
+
+Request bodies are built from the webhook schemas in tools_config/*.json:
+`system__called_number` and `system__conversation_id` get the call's phone
+and conversation id, and LLM-filled parameters get plausible values (enum
+members, the installment counts named in the description, amounts, a summary).
+
+By default the API runs in-process against fake_postgrest.py (a local
+PostgREST stand-in with configurable latency). --url targets a running server
+instead; it will write call outcomes through update-status, so only point it
+at a staging database.
+
+For each concurrency level the report shows throughput and p50/p95/p99 per
+tool. Latency is measured from when a tool call was due (previous response
+plus think time), so queueing in a saturated server counts.
+
+--save-baseline writes the results to JSON; --baseline compares against one
+and exits 1 when a tool's p95/p99 grew, or throughput dropped, by more than
+--max-regression (or any request failed):
+
+    python loadtest.py --conversations 20,50,100 --save-baseline loadtest_baseline.json
+    python loadtest.py --conversations 20,50,100 --baseline loadtest_baseline.json --max-regression 0.2
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from bench_tools import percentile
+
+
+TOOLS_CONFIG_DIR = "tools_config"
+# Tool order per conversation flow; propose_payment_plan repeats --plans-min..--plans-max times
+FLOWS = {
+    "split": ("get_customer_name", "get_case_details", "propose_payment_plan", "update_status"),
+    # The callee confirmed the {{customer_name}} passed at dispatch, so one context call suffices
+    "combined": ("get_conversation_context", "propose_payment_plan", "update_status"),
+}
+# Parameters a flow fixes instead of leaving them to the "LLM"
+FIXED_PARAMS = {"get_conversation_context": {"identity_confirmed": True}}
+PERCENTILES = (50, 95, 99)
+
+
+# ============================================================================
+# REQUEST GENERATION (from tools_config/)
+# ============================================================================
+
+def load_tools(sequence, directory: str = TOOLS_CONFIG_DIR) -> Dict[str, Dict[str, Any]]:
+    """Webhook tools by name: {"path", "method", "properties", "timeout"}."""
+    tools = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        schema = config.get("api_schema") or {}
+        if config.get("type") != "webhook" or not schema.get("url"):
+            continue
+        tools[config["name"]] = {
+            "path": httpx.URL(schema["url"]).path,
+            "method": schema.get("method", "POST"),
+            "properties": (schema.get("request_body_schema") or {}).get("properties", []),
+            "timeout": config.get("response_timeout_secs"),
+        }
+    missing = [name for name in sequence if name not in tools]
+    if missing:
+        raise SystemExit(f"❌ tools_config/ has no webhook for: {', '.join(missing)}")
+    return tools
+
+
+def _llm_value(prop: Dict[str, Any], rng: random.Random) -> Any:
+    if prop.get("enum"):
+        return rng.choice(prop["enum"])
+    if prop["type"] == "integer":
+        # "Number of installments requested (2, 3, or 4)"
+        choices = [int(n) for n in re.findall(r"\d+", prop.get("description", ""))]
+        return rng.choice(choices) if choices else rng.randint(1, 10)
+    if prop["type"] == "number":
+        return round(rng.uniform(50, 2000), 2)
+    if prop["type"] == "boolean":
+        return rng.random() < 0.5
+    return rng.choice([
+        "Agreed to pay $200 on Friday",
+        "Customer asked for a call back next week",
+        "Disputes the amount, wants a statement by email",
+    ])
+
+
+def build_body(tool: Dict[str, Any], phone: str, conversation_id: str, rng: random.Random,
+               fixed: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    A request body as the agent would send it. Required parameters are always
+    set; of the optional LLM parameters one is always filled (e.g. installments
+    *or* offer_amount) and the rest half the time. `fixed` values win.
+    """
+    dynamic = {"system__called_number": phone, "system__conversation_id": conversation_id}
+    body = {}
+    optional = [p for p in tool["properties"] if p["value_type"] == "llm_prompt" and not p.get("required")]
+    chosen = rng.choice(optional)["id"] if optional else None
+    for prop in tool["properties"]:
+        if prop["value_type"] == "dynamic_variable":
+            value = dynamic.get(prop.get("dynamic_variable"))
+        elif prop["value_type"] == "constant":
+            value = prop.get("constant_value")
+        elif prop.get("required") or prop["id"] == chosen or rng.random() < 0.5:
+            value = _llm_value(prop, rng)
+        else:
+            continue
+        if value is not None:
+            body[prop["id"]] = value
+    body.update(fixed or {})
+    return body
+
+
+# ============================================================================
+# LOAD GENERATION
+# ============================================================================
+
+class Results:
+    """Latency samples (ms) and failures per tool for one concurrency level."""
+
+    def __init__(self, sequence):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in sequence}
+        self.errors: Dict[str, int] = {name: 0 for name in sequence}
+        self.error_samples: List[str] = []
+        self.elapsed = 0.0
+
+    def record(self, tool: str, latency_ms: float, error: Optional[str] = None):
+        self.latencies[tool].append(latency_ms)
+        if error:
+            self.errors[tool] += 1
+            if len(self.error_samples) < 5:
+                self.error_samples.append(f"{tool}: {error}")
+
+    def summary(self) -> Dict[str, Any]:
+        requests = sum(len(samples) for samples in self.latencies.values())
+        tools = {}
+        for name, samples in self.latencies.items():
+            tools[name] = {"count": len(samples), "errors": self.errors[name]}
+            for pct in PERCENTILES:
+                tools[name][f"p{pct}"] = round(percentile(samples, pct), 2)
+        return {
+            "requests": requests,
+            "errors": sum(self.errors.values()),
+            "elapsed_secs": round(self.elapsed, 3),
+            "throughput": round(requests / self.elapsed, 2) if self.elapsed else 0.0,
+            "tools": tools,
+        }
+
+
+async def run_conversation(client: httpx.AsyncClient, tools, phone: str, conversation_id: str,
+                           results: Results, args, rng: random.Random):
+    plans = rng.randint(args.plans_min, args.plans_max)
+    steps = []
+    for name in FLOWS[args.flow]:
+        steps.extend([name] * (plans if name == "propose_payment_plan" else 1))
+    think_secs = args.think_ms / 1000
+    due = time.perf_counter() + rng.uniform(0, think_secs)
+    for name in steps:
+        tool = tools[name]
+        body = build_body(tool, phone, conversation_id, rng, FIXED_PARAMS.get(name))
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        error = None
+        try:
+            response = await client.request(tool["method"], tool["path"], json=body)
+            if response.status_code >= 400:
+                error = f"{response.status_code} {response.text[:120]}"
+        except httpx.HTTPError as e:
+            error = f"{type(e).__name__}: {e}"
+        finished = time.perf_counter()
+        results.record(name, (finished - due) * 1000, error)
+        due = finished + rng.uniform(0.5, 1.5) * think_secs
+
+
+async def fetch_phones(client: httpx.AsyncClient, wanted: int) -> List[str]:
+    """Phones of existing customers, paging through GET /api/customers."""
+    phones, cursor = [], None
+    while len(phones) < wanted:
+        params = {"limit": 200, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/api/customers", params=params)
+        response.raise_for_status()
+        page = response.json()
+        phones.extend(item["phone"] for item in page["items"])
+        cursor = page.get("next_cursor")
+        if not cursor:
+            break
+    if not phones:
+        raise SystemExit("❌ No customers to call: seed the database first")
+    return phones
+
+
+async def run_level(client: httpx.AsyncClient, tools, phones: List[str], conversations: int,
+                    args, seed: int) -> Results:
+    """`conversations` concurrent callers, each running --rounds conversations back to back."""
+    results = Results(FLOWS[args.flow])
+    rng = random.Random(seed)
+
+    async def caller(slot: int):
+        for round_no in range(args.rounds):
+            index = slot * args.rounds + round_no
+            await run_conversation(client, tools, phones[index % len(phones)],
+                                   f"conv_loadtest_{seed}_{index}", results, args, rng)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(slot) for slot in range(conversations)))
+    results.elapsed = time.perf_counter() - started
+    return results
+
+
+def make_client(args, app=None) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if app is not None:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                 timeout=args.timeout)
+    return httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout)
+
+
+async def run_all(args, levels: List[int], app=None) -> Dict[str, Dict[str, Any]]:
+    tools = load_tools(FLOWS[args.flow])
+    report = {}
+    async with make_client(args, app) as client:
+        phones = await fetch_phones(client, max(levels) * args.rounds)
+        for level in levels:
+            results = await run_level(client, tools, phones, level, args, seed=level)
+            report[str(level)] = results.summary()
+            print_level(level, report[str(level)], results.error_samples)
+    return report
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def print_level(level: int, summary: Dict[str, Any], error_samples: List[str]):
+    print(f"\n👥 {level} concurrent conversations: {summary['requests']} requests in "
+          f"{summary['elapsed_secs']}s, {summary['throughput']} req/s, {summary['errors']} errors")
+    for name, stats in summary["tools"].items():
+        print(f"   {name:<24} n={stats['count']:<6} p50={stats['p50']:8.1f}ms  "
+              f"p95={stats['p95']:8.1f}ms  p99={stats['p99']:8.1f}ms  errors={stats['errors']}")
+    for sample in error_samples:
+        print(f"   ⚠️  {sample}")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float,
+            min_delta_ms: float) -> List[str]:
+    """Regressions beyond the threshold; latency must also grow by min_delta_ms to count."""
+    failures = []
+    for level, current in report.items():
+        if current["errors"]:
+            failures.append(f"{level} conversations: {current['errors']} failed requests")
+        base = baseline.get("levels", {}).get(level)
+        if base is None:
+            continue
+        if current["throughput"] < base["throughput"] * (1 - max_regression):
+            failures.append(f"{level} conversations: throughput {current['throughput']} req/s "
+                            f"< baseline {base['throughput']} req/s")
+        for name, stats in current["tools"].items():
+            base_stats = base["tools"].get(name)
+            if not base_stats:
+                continue
+            for key in ("p95", "p99"):
+                now, before = stats[key], base_stats[key]
+                if now > before * (1 + max_regression) and now - before > min_delta_ms:
+                    failures.append(f"{level} conversations: {name} {key} {now}ms > baseline {before}ms "
+                                    f"(+{(now / before - 1) * 100 if before else 100:.0f}%)")
+    return failures
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay ElevenLabs tool-call traffic against the API")
+    parser.add_argument("--conversations", default="10,50",
+                        help="Concurrent conversations; comma-separated to run several levels")
+    parser.add_argument("--flow", choices=sorted(FLOWS), default="split",
+                        help="split: name and case details in two tools; combined: get-conversation-context")
+    parser.add_argument("--rounds", type=int, default=3, help="Conversations per caller at each level")
+    parser.add_argument("--plans-min", type=int, default=1, help="Fewest propose-payment-plan calls per conversation")
+    parser.add_argument("--plans-max", type=int, default=3, help="Most propose-payment-plan calls per conversation")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="Mean pause between tool calls")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="PostgREST stand-in latency (in-process)")
+    parser.add_argument("--customers", type=int, default=2000, help="Customers seeded in the stand-in (in-process)")
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Client timeout per request (s)")
+    parser.add_argument("--save-baseline", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file and exit 1 on regression")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed p95/p99 growth or throughput drop as a fraction (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0,
+                        help="Ignore latency growth smaller than this (timer noise at low latencies)")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.conversations.split(",")]
+
+    print("=" * 60)
+    print(f"📊 Tool-call load test ({args.flow} flow): {args.conversations} conversations x "
+          f"{args.rounds} rounds, {args.think_ms}ms think time")
+    fake = None
+    app = None
+    if args.url:
+        print(f"🎯 Target: {args.url}")
+    else:
+        from fake_postgrest import start_fake_postgrest
+
+        fake = start_fake_postgrest(customers=args.customers, latency_ms=args.latency_ms)
+        os.environ["SUPABASE_URL"] = fake.url
+        os.environ["SUPABASE_KEY"] = "loadtest"
+        import logging
+        import main as api
+
+        logging.disable(logging.CRITICAL)
+        app = api.app
+        print(f"🎯 Target: in-process app, PostgREST stand-in with {args.latency_ms}ms latency")
+    print("=" * 60)
+
+    try:
+        report = asyncio.run(run_all(args, levels, app))
+    finally:
+        if fake:
+            fake.shutdown()
+
+    settings = {key: getattr(args, key) for key in ("flow", "rounds", "plans_min", "plans_max",
+                                              "think_ms", "latency_ms")}
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "levels": report}, f, indent=2)
+        print(f"\n💾 Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != settings:
+            print(f"\n⚠️  Baseline was recorded with different settings: {baseline.get('settings')}")
+        failures = compare(report, baseline, args.max_regression, args.min_delta_ms)
+    else:
+        failures = [f"{level} conversations: {r['errors']} failed requests" for level, r in report.items() if r["errors"]]
+
+    print()
+    if failures:
+        print("❌ Load test failed:")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+    print("✅ Load test passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Queue-backed logging for the API server.
+
+Request handlers only put records on a bounded in-memory queue
+(QueueHandler); a background QueueListener thread formats them and writes the
+console and daily log files. A slow disk therefore never adds to tool-call
+latency. If the queue fills up, records are dropped and counted rather than
+blocking the request.
+
+Files roll over at midnight (logs/app_YYYYMMDD.log, logs/errors_YYYYMMDD.log)
+and are kept for LOG_RETENTION_DAYS. LOG_FORMAT=json writes one JSON object
+per line, carrying the conversation_id and phone bound to the request with
+bind_log_context().
+"""
+
+import atexit
+import copy
+import glob
+import json
+import logging
+import os
+import queue
+import sys
+from collections import Counter
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+
+# Our loggers' level; DEBUG reaches the app file only (the console shows INFO and up)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # text | json
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "14"))
+
+# Request-scoped fields copied onto every record (and into JSON output)
+CONTEXT_FIELDS = ("conversation_id", "phone")
+
+TEXT_FORMAT = logging.Formatter(
+    fmt='%(asctime)s | %(levelname)-8s | %(name)s | %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+_log_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+_queue_handler: Optional["BoundedQueueHandler"] = None
+_listener: Optional["DrainingQueueListener"] = None
+_settings: Dict[str, Any] = {}
+
+
+def bind_log_context(**fields):
+    """
+    Attach fields (conversation_id, phone) to every record logged by the
+    current request. Each request runs in its own context, so nothing leaks
+    between concurrent requests.
+    """
+    _log_context.set({**_log_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+
+
+class ContextFilter(logging.Filter):
+    """Copies the bound request context onto the record before it is queued."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, context fields, exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DailyFileHandler(logging.FileHandler):
+    """
+    Writes to <directory>/<prefix>_YYYYMMDD.log for the day each record was
+    logged, switching files at midnight, and deletes files older than
+    `retention_days`.
+    """
+
+    def __init__(self, directory: str, prefix: str, retention_days: int = LOG_RETENTION_DAYS):
+        self.directory = directory
+        self.prefix = prefix
+        self.retention_days = retention_days
+        self.day = date.today()
+        super().__init__(self._path(self.day), encoding="utf-8", delay=True)
+        self._prune()
+
+    def _path(self, day: date) -> str:
+        return os.path.join(self.directory, f"{self.prefix}_{day:%Y%m%d}.log")
+
+    def emit(self, record: logging.LogRecord):
+        day = date.fromtimestamp(record.created)
+        if day != self.day:
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+            self.day = day
+            self.baseFilename = os.path.abspath(self._path(day))
+            self._prune()
+        super().emit(record)
+
+    def _prune(self):
+        if self.retention_days <= 0:
+            return
+        cutoff = f"{self.prefix}_{self.day - timedelta(days=self.retention_days):%Y%m%d}.log"
+        for path in glob.glob(os.path.join(self.directory, f"{self.prefix}_*.log")):
+            if os.path.basename(path) < cutoff:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.dropped_by_level: Counter = Counter()
+        self.high_water = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the %-interpolation happens on the caller's thread; timestamps,
+        # formatting and I/O happen on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = TEXT_FORMAT.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self.dropped_by_level[record.levelname] += 1
+            return
+        depth = self.queue.qsize()
+        if depth > self.high_water:
+            self.high_water = depth
+
+
+class DrainingQueueListener(QueueListener):
+    """QueueListener whose stop() waits for room in a full queue instead of failing."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def setup_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT,
+                  log_dir: str = LOG_DIR, queue_size: int = LOG_QUEUE_SIZE) -> logging.Logger:
+    """
+    Route the root logger through a bounded queue to console + daily files.
+    Safe to call more than once (later calls are no-ops).
+    """
+    global _queue_handler, _listener, _settings
+    root_logger = logging.getLogger()
+    if _listener is not None:
+        return root_logger
+
+    os.makedirs(log_dir, exist_ok=True)
+    formatter = JsonFormatter() if log_format == "json" else TEXT_FORMAT
+
+    # Console output (INFO level)
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setLevel(logging.INFO)
+    # File output - General logs (everything that passes the logger levels)
+    file_handler = DailyFileHandler(log_dir, "app")
+    file_handler.setLevel(logging.DEBUG)
+    # File output - Errors only
+    error_handler = DailyFileHandler(log_dir, "errors")
+    error_handler.setLevel(logging.ERROR)
+    for handler in (console_handler, file_handler, error_handler):
+        handler.setFormatter(formatter)
+
+    _queue_handler = BoundedQueueHandler(queue.Queue(maxsize=queue_size))
+    _queue_handler.addFilter(ContextFilter())
+    _listener = DrainingQueueListener(_queue_handler.queue, console_handler, file_handler, error_handler,
+                                      respect_handler_level=True)
+    _listener.start()
+    _settings = {"format": log_format, "level": level, "queue_capacity": queue_size}
+    atexit.register(shutdown_logging)
+
+    # Root stays at INFO to keep library noise out; our own loggers follow LOG_LEVEL
+    root_logger.handlers = [_queue_handler]
+    root_logger.setLevel(logging.INFO)
+    for name in ("main", "agents", "elevenlabs_client"):
+        logging.getLogger(name).setLevel(level)
+    return root_logger
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    if _queue_handler and _queue_handler.dropped:
+        print(f"⚠️  Logging queue overflowed: {_queue_handler.dropped} records dropped "
+              f"{dict(_queue_handler.dropped_by_level)}", file=sys.stderr)
+
+
+def logging_stats() -> Dict[str, Any]:
+    """Queue depth and overflow counters."""
+    handler = _queue_handler
+    return {
+        **_settings,
+        "queue_size": handler.queue.qsize() if handler else 0,
+        "high_water": handler.high_water if handler else 0,
+        "dropped": handler.dropped if handler else 0,
+        "dropped_by_level": dict(handler.dropped_by_level) if handler else {},
+    }
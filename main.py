@@ -3,242 +3,209 @@ Jess Voice Agent - FastAPI Backend
 Provides tool endpoints for ElevenLabs conversational AI agent.
 """
 
-from fastapi import FastAPI, HTTPException
+import time
+
+# When importing this module began; the startup log reports time to ready from here
+IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime, timedelta
+from fastapi.responses import PlainTextResponse, Response
+from typing import Optional, List, Dict
+from datetime import datetime
+from repository import CustomerRepository
 from database import get_supabase_client
+from models import (
+    GetCustomerNameRequest, GetCustomerNameResponse, GetCaseDetailsRequest,
+    GetCaseDetailsResponse, ProposePaymentPlanRequest, ProposePaymentPlanResponse,
+    UpdateStatusRequest, UpdateStatusResponse, CustomerPage,
+    GroupStats, PortfolioStats, CustomerChanges, InitiateCallRequest,
+    InitiateCallResponse, ClaimCustomersRequest, ReleaseClaimsRequest,
+    StartCampaignRequest, PrewarmConversationRequest, CreateCustomerRequest,
+    UpdateCustomerRequest, ImportReport, BulkUpdateRequest, BulkUpdateResponse,
+    BulkUpdateResult, GetConversationContextRequest, GetConversationContextResponse,
+    OfferMatrixResponse,
+)
+from conversations import conversations
+from call_log import CallAttempt, call_log
+from write_behind import WriteBehindQueue
+from phone_index import customer_phone_key, phone_index
+from state_backend import backend_info, close_redis, make_cache
+from static_assets import StaticAssets, static_root
+from compression import CompressionMiddleware, compression_stats
+from fast_json import FastJSONResponse, backend as json_backend
+from agents import AgentCatalogueUnavailable, agent_catalogue, etag_matches
+from cache import TTLCache
+from campaign import Campaign, CampaignFilter, CampaignSettings, CustomerClaims, OutboundCallClient
+from elevenlabs_client import ElevenLabsError, close_elevenlabs_client, get_elevenlabs_client
+from offers import offer_book
+from portfolio import PORTFOLIO_COLUMNS, Portfolio, days_overdue_for
+from importer import IMPORT_BATCH_SIZE, detect_format, import_customers
+from instrumentation import MetricsMiddleware, TOOL_RESPONSE_TIMEOUT_SECS, create_background_task, latency_summary
+from metrics import REGISTRY, gauge_lines, histogram_lines, render_prometheus
+import repository
+import asyncio
+import tempfile
 import logging
-from logging.handlers import RotatingFileHandler
+from logging_setup import bind_log_context, logging_stats, setup_logging, shutdown_logging
 import os
-import requests
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging (similar to Serilog in .NET)
-# Creates logs in both console and file
-def setup_logging():
-    """
-    Configure logging with multiple outputs (console + file).
-    Similar to Serilog configuration in .NET.
-    """
-    # Create logs directory if it doesn't exist
-    os.makedirs("logs", exist_ok=True)
-    
-    # Define log format
-    log_format = logging.Formatter(
-        fmt='%(asctime)s | %(levelname)-8s | %(name)s | %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Root logger configuration
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)  # Set root to INFO to avoid noise from libraries
-    
-    # Remove existing handlers to avoid duplicates
-    root_logger.handlers = []
-    
-    # Configure app logger separately for DEBUG
-    app_logger = logging.getLogger("main")
-    app_logger.setLevel(logging.DEBUG)
-    
-    # Handler 1: Console output (INFO level)
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(log_format)
-    root_logger.addHandler(console_handler)
-    
-    # Handler 2: File output - General logs (DEBUG level)
-    file_handler = RotatingFileHandler(
-        filename=f"logs/app_{datetime.now().strftime('%Y%m%d')}.log",
-        maxBytes=10 * 1024 * 1024,  # 10MB per file
-        backupCount=5,  # Keep 5 backup files
-        encoding='utf-8'
-    )
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(log_format)
-    root_logger.addHandler(file_handler)
-    
-    # Handler 3: File output - Errors only (ERROR level)
-    error_handler = RotatingFileHandler(
-        filename=f"logs/errors_{datetime.now().strftime('%Y%m%d')}.log",
-        maxBytes=10 * 1024 * 1024,
-        backupCount=5,
-        encoding='utf-8'
-    )
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(log_format)
-    root_logger.addHandler(error_handler)
-    
-    return root_logger
-
-# Initialize logging
-setup_logging()
+# Handlers are attached when the app starts (setup_logging() in lifespan)
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI(
-    title="Jess Voice Agent API",
-    description="Backend tools for autonomous debt collection voice agent",
-    version="1.0.0"
-)
-
-# Configure CORS to allow ElevenLabs to call our endpoints
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify ElevenLabs domains
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Mount static files directory
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-@app.on_event("startup")
-async def startup_event():
-    logger.info("============================================================")
-    logger.info("🚀 Jess Voice Agent API Starting (CRUD Enabled)...")
-    logger.info("============================================================")
-
-# Initialize Supabase client
-supabase = get_supabase_client()
+# Every endpoint below; create_app() mounts it on the application
+router = APIRouter()
 
+# Async data access layer (Supabase queries run off the event loop)
+customer_repo = CustomerRepository()
 
-# ============================================================================
-# REQUEST/RESPONSE MODELS
-# ============================================================================
-
-class GetCustomerNameRequest(BaseModel):
-    phone: str = Field(..., description="Customer phone number")
-
-
-class GetCustomerNameResponse(BaseModel):
-    customer_name: str = Field(..., description="Customer full name for identity confirmation")
+# Status and last_call_at writes made during calls: acknowledged at once,
+# coalesced per phone, journaled to disk and flushed in batches
+write_behind = WriteBehindQueue(customer_repo)
+# Operator edits flush (or drop) buffered writes they would otherwise lose to
+customer_repo.pending_writes = write_behind
 
+# Dashboard header aggregates: computed in the database, shared by all viewers (and workers)
+STATS_CACHE_TTL_SECS = float(os.getenv("STATS_CACHE_TTL_SECS", "15"))
+stats_cache = make_cache(ttl_seconds=STATS_CACHE_TTL_SECS, max_entries=1, name="stats")
+stats_refresh_lock = asyncio.Lock()
 
-class GetCaseDetailsRequest(BaseModel):
-    phone: str = Field(..., description="Customer phone number")
+# Whole-table snapshot behind the portfolio analytics endpoints (vectorised, see portfolio.py)
+PORTFOLIO_SNAPSHOT_TTL_SECS = float(os.getenv("PORTFOLIO_SNAPSHOT_TTL_SECS", "300"))
+portfolio_cache = TTLCache(ttl_seconds=PORTFOLIO_SNAPSHOT_TTL_SECS, max_entries=1, name="portfolio")
+portfolio_refresh_lock = asyncio.Lock()
 
+# Uploads larger than this are spooled to disk while importing
+IMPORT_SPOOL_MAX_BYTES = 16 * 1024 * 1024
 
-class GetCaseDetailsResponse(BaseModel):
-    customer_name: str = Field(..., description="Customer full name")
-    debt_amount: float = Field(..., description="Total debt amount")
-    due_date: str = Field(..., description="Original due date")
-    risk_level: str = Field(..., description="Risk level: low, medium, high")
-    days_overdue: int = Field(..., description="Number of days past due date")
+# Outbound campaigns started through the API on this worker, by id
+campaigns: Dict[str, Campaign] = {}
+# Their snapshots, published for every worker, and cancels requested through other workers
+CAMPAIGN_STATUS_TTL_SECS = float(os.getenv("CAMPAIGN_STATUS_TTL_SECS", "86400"))
+CAMPAIGN_PUBLISH_INTERVAL_SECS = float(os.getenv("CAMPAIGN_PUBLISH_INTERVAL_SECS", "1.0"))
+campaign_board = make_cache(ttl_seconds=CAMPAIGN_STATUS_TTL_SECS, max_entries=1000, name="campaigns")
+campaign_cancels = make_cache(ttl_seconds=CAMPAIGN_STATUS_TTL_SECS, max_entries=1000, name="campaign_cancels")
 
 
-class ProposePaymentPlanRequest(BaseModel):
-    phone: str = Field(..., description="Customer phone number")
-    installments: Optional[int] = Field(None, description="Number of installments requested")
-    offer_amount: Optional[float] = Field(None, description="Settlement offer amount")
+# ============================================================================
+# HELPER FUNCTIONS
+# ============================================================================
 
+def calculate_days_overdue(due_date_str: str) -> int:
+    """Calculate number of days overdue from a date string."""
+    try:
+        due_date = datetime.strptime(due_date_str, "%Y-%m-%d")
+        today = datetime.now()
+        delta = today - due_date
+        return max(0, delta.days)
+    except Exception as e:
+        logger.error("Error calculating days overdue: %s", e)
+        return 0
 
-class ProposePaymentPlanResponse(BaseModel):
-    plan_type: str = Field(..., description="Type of plan: installments or settlement")
-    installment_amount: Optional[float] = Field(None, description="Amount per installment")
-    payment_dates: Optional[List[str]] = Field(None, description="List of payment dates")
-    total_amount: float = Field(..., description="Total amount to be paid")
-    discount_applied: float = Field(..., description="Discount amount if applicable")
-    accepted: bool = Field(..., description="Whether the plan is acceptable")
-    message: str = Field(..., description="Explanation message")
 
+def to_list_item(customer: dict, days_overdue: int) -> dict:
+    """
+    Format a customer row for the dashboard list.
+    
+    A plain dict with CustomerListItem's fields and types, sent with
+    FastJSONResponse: no model per row, no revalidation (fast_json.py).
+    """
+    return {
+        "id": customer['id'],
+        "name": customer['name'],
+        "phone": customer['phone'],
+        "debt_amount": float(customer['debt_amount']),
+        "status": customer.get('status', 'active'),
+        "risk_level": customer['risk_level'],
+        "due_date": customer['due_date'],
+        "days_overdue": days_overdue,
+        # Use updated_at as fallback for last_call_date since database schema might vary
+        "last_call_date": customer.get('last_call_date') or customer.get('updated_at'),
+        "updated_at": customer.get('updated_at'),
+    }
 
-class UpdateStatusRequest(BaseModel):
-    phone: str = Field(..., description="Customer phone number")
-    new_status: str = Field(..., description="New status: promised_to_pay, wrong_number, refused, etc.")
-    summary: Optional[str] = Field(None, description="Summary of the interaction")
 
+def to_list_items(rows: List[dict]) -> List[dict]:
+    """Format rows for the dashboard, computing days overdue for all of them at once."""
+    return [to_list_item(customer, days) for customer, days in zip(rows, days_overdue_for(rows))]
 
-class UpdateStatusResponse(BaseModel):
-    success: bool = Field(..., description="Whether the update was successful")
-    message: str = Field(..., description="Status message")
 
+def build_case_details(customer: dict) -> dict:
+    """Compute the get-case-details payload for a customer row."""
+    return {
+        "customer_name": customer['name'],
+        "debt_amount": float(customer['debt_amount']),
+        "due_date": customer['due_date'],
+        "risk_level": customer['risk_level'],
+        "days_overdue": calculate_days_overdue(customer['due_date']),
+    }
 
-# ============================================================================
-# DASHBOARD/PANEL MODELS
-# ============================================================================
 
-class CustomerListItem(BaseModel):
-    """Customer item for dashboard list"""
-    id: str  # UUID in Supabase
-    name: str
-    phone: str
-    debt_amount: float
-    status: str
-    risk_level: str
-    due_date: str
-    days_overdue: int
-    last_call_date: Optional[str] = None
-    updated_at: Optional[str] = None
+async def stash_dispatched_call(phone: str, conversation_id: Optional[str], customer: dict,
+                                dispatched_at: float, agent_id: Optional[str] = None):
+    """
+    Keep a just-dispatched customer's row and case details in memory (and
+    build its offer matrix) so the agent's first tool webhooks don't wait on
+    the database.
+    """
+    await customer_repo.prime(customer)
+    await conversations.register(
+        phone, conversation_id, customer, build_case_details(customer), dispatched_at, agent_id
+    )
+    offer_book.get(customer)
 
 
-class InitiateCallRequest(BaseModel):
-    """Request to initiate a call to a customer"""
-    phone: str = Field(..., description="Customer phone number to call")
-    agent_id: Optional[str] = Field(None, description="Specific ElevenLabs Agent ID to use")
+async def record_dispatched_call(customer: dict, conversation_id: Optional[str],
+                                 dispatched_at: float, agent_id: Optional[str] = None):
+    """Pre-warm the conversation and queue the last_call_at write after a dispatch."""
+    phone = customer_phone_key(customer)
+    updates = {"last_call_at": datetime.now().astimezone().isoformat()}
+    # Pre-warm: the agent's first tool calls will ask for this same row
+    await stash_dispatched_call(phone, conversation_id, {**customer, **updates}, dispatched_at, agent_id)
+    await write_behind.submit(phone, updates)
 
 
-class InitiateCallResponse(BaseModel):
-    """Response from call initiation"""
-    success: bool
-    conversation_id: Optional[str] = None
-    message: str
-    customer_name: Optional[str] = None
+# The columns build_case_details() reads, plus the row id
+CASE_DETAILS_FIELDS = ("id", "name", "debt_amount", "due_date", "risk_level")
 
 
-# ============================================================================
-# HELPER FUNCTIONS
-# ============================================================================
+async def cached_case_details(customer: dict, phone: str, conversation_id: Optional[str]) -> dict:
+    """
+    Reuse precomputed case details if they were built from the same values.
 
-def calculate_days_overdue(due_date_str: str) -> int:
-    """Calculate number of days overdue from a date string."""
-    try:
-        due_date = datetime.strptime(due_date_str, "%Y-%m-%d")
-        today = datetime.now()
-        delta = today - due_date
-        return max(0, delta.days)
-    except Exception as e:
-        logger.error(f"Error calculating days overdue: {e}")
-        return 0
+    Compared by value: the cached row is replaced (not mutated) by every
+    write-behind patch, so the stashed dict is rarely the one we are given.
+    """
+    entry = await conversations.lookup(phone, conversation_id)
+    if entry is not None and all(entry.customer.get(f) == customer.get(f) for f in CASE_DETAILS_FIELDS):
+        return entry.case_details
+    return build_case_details(customer)
 
 
-def generate_payment_dates(num_installments: int) -> List[str]:
-    """Generate monthly payment dates starting from next month."""
-    dates = []
-    base_date = datetime.now()
-    
-    for i in range(num_installments):
-        # Add months (approximately 30 days each)
-        payment_date = base_date + timedelta(days=30 * (i + 1))
-        dates.append(payment_date.strftime("%Y-%m-%d"))
-    
-    return dates
 
 
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
 
-@app.get("/")
-async def root():
+@router.get("/")
+async def root(request: Request):
     """Serve the landing page."""
-    return FileResponse("static/landing.html")
+    return await request.app.state.static_files.get_response("landing.html", request.scope)
 
 
-@app.get("/dashboard")
-async def dashboard():
+@router.get("/dashboard")
+async def dashboard(request: Request):
     """Serve the dashboard HTML page."""
-    return FileResponse("static/dashboard.html")
+    return await request.app.state.static_files.get_response("dashboard.html", request.scope)
 
 
-@app.get("/health")
+@router.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {
@@ -248,7 +215,7 @@ async def health_check():
     }
 
 
-@app.post("/tools/get-customer-name", response_model=GetCustomerNameResponse)
+@router.post("/tools/get-customer-name", response_model=GetCustomerNameResponse)
 async def get_customer_name(request: GetCustomerNameRequest):
     """
     Retrieve ONLY the customer name for identity verification.
@@ -257,34 +224,34 @@ async def get_customer_name(request: GetCustomerNameRequest):
     sensitive information. Use this to confirm you're speaking with the 
     right person, then call get-case-details after confirmation.
     """
-    logger.info(f"🔍 Getting customer name for phone: {request.phone}")
-    logger.debug(f"Request payload: {request.dict()}")
+    bind_log_context(conversation_id=request.conversation_id, phone=request.phone)
+    logger.info("🔍 Getting customer name for phone: %s", request.phone)
+    logger.debug("Request payload: %s", request)
     
     try:
         # Query customer from database
-        result = supabase.table('customers').select("name").eq('phone', request.phone).execute()
+        customer = await customer_repo.get_by_phone(request.phone)
         
-        if not result.data or len(result.data) == 0:
-            logger.warning(f"⚠️  Customer not found: {request.phone}")
+        if not customer:
+            logger.warning("⚠️  Customer not found: %s", request.phone)
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        customer = result.data[0]
-        
         response = GetCustomerNameResponse(
             customer_name=customer['name']
         )
         
-        logger.info(f"✅ Customer name retrieved: {response.customer_name}")
+        await conversations.record_tool_response(request.phone, request.conversation_id)
+        logger.info("✅ Customer name retrieved: %s", response.customer_name)
         return response
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Error retrieving customer name: {e}")
+        logger.error("❌ Error retrieving customer name: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@app.post("/tools/get-case-details", response_model=GetCaseDetailsResponse)
+@router.post("/tools/get-case-details", response_model=GetCaseDetailsResponse)
 async def get_case_details(request: GetCaseDetailsRequest):
     """
     Retrieve customer debt details.
@@ -293,40 +260,86 @@ async def get_case_details(request: GetCaseDetailsRequest):
     Jess must confirm she's speaking with the correct person before accessing
     sensitive debt information.
     """
-    logger.info(f"🔍 Getting case details for phone: {request.phone}")
+    bind_log_context(conversation_id=request.conversation_id, phone=request.phone)
+    logger.info("🔍 Getting case details for phone: %s", request.phone)
     
     try:
         # Query customer from database
-        result = supabase.table('customers').select("*").eq('phone', request.phone).execute()
+        customer = await customer_repo.get_by_phone(request.phone)
         
-        if not result.data or len(result.data) == 0:
-            logger.warning(f"⚠️  Customer not found: {request.phone}")
+        if not customer:
+            logger.warning("⚠️  Customer not found: %s", request.phone)
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        customer = result.data[0]
+        # Days overdue etc. are precomputed when the call was dispatched
+        details = await cached_case_details(customer, request.phone, request.conversation_id)
+        days_overdue = details['days_overdue']
+        
+        response = GetCaseDetailsResponse(**details)
+        
+        await conversations.record_tool_response(request.phone, request.conversation_id)
+        logger.info("✅ Case details retrieved for %s: $%s, %s days overdue",
+                    customer['name'], response.debt_amount, days_overdue)
+        return response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("❌ Error retrieving case details: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/tools/get-conversation-context", response_model=GetConversationContextResponse,
+          response_model_exclude_none=True)
+async def get_conversation_context(request: GetConversationContextRequest):
+    """
+    Name, case details and acceptable payment offers in one webhook, replacing
+    the get-customer-name -> get-case-details round trips.
+    
+    PRIVACY-FIRST: debt details and offers are only returned when
+    identity_confirmed is true. Without it the response carries just the name
+    to confirm, exactly like get-customer-name.
+    """
+    bind_log_context(conversation_id=request.conversation_id, phone=request.phone)
+    logger.info("🔍 Getting conversation context for phone: %s (identity confirmed: %s)",
+                request.phone, request.identity_confirmed)
+    
+    try:
+        customer = await customer_repo.get_by_phone(request.phone)
+        
+        if not customer:
+            logger.warning("⚠️  Customer not found: %s", request.phone)
+            raise HTTPException(status_code=404, detail="Customer not found")
         
-        # Calculate days overdue
-        days_overdue = calculate_days_overdue(customer['due_date'])
+        await conversations.record_tool_response(request.phone, request.conversation_id)
+        if not request.identity_confirmed:
+            return GetConversationContextResponse(
+                customer_name=customer['name'],
+                identity_confirmed=False,
+                message="Confirm you are speaking with the customer, then call again with identity_confirmed=true"
+            )
         
-        response = GetCaseDetailsResponse(
-            customer_name=customer['name'],
-            debt_amount=float(customer['debt_amount']),
-            due_date=customer['due_date'],
-            risk_level=customer['risk_level'],
-            days_overdue=days_overdue
+        details = await cached_case_details(customer, request.phone, request.conversation_id)
+        offers = offer_book.get(customer).headline()
+        response = GetConversationContextResponse(
+            **details,
+            identity_confirmed=True,
+            offers=offers,
+            message="Identity confirmed: discuss the debt and offer one of the payment plans"
         )
         
-        logger.info(f"✅ Case details retrieved for {customer['name']}: ${response.debt_amount}, {days_overdue} days overdue")
+        logger.info("✅ Conversation context retrieved for %s: $%s, %s days overdue",
+                    customer['name'], response.debt_amount, response.days_overdue)
         return response
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Error retrieving case details: {e}")
+        logger.error("❌ Error retrieving conversation context: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@app.post("/tools/propose-payment-plan", response_model=ProposePaymentPlanResponse)
+@router.post("/tools/propose-payment-plan", response_model=ProposePaymentPlanResponse)
 async def propose_payment_plan(request: ProposePaymentPlanRequest):
     """
     Calculate and validate payment plans or settlement offers.
@@ -334,39 +347,49 @@ async def propose_payment_plan(request: ProposePaymentPlanRequest):
     Supports two modes:
     1. Installment plan: Customer wants to pay in multiple installments
     2. Settlement offer: Customer offers a reduced amount
+    
+    Both are answered from the customer's precomputed offer matrix (offers.py).
     """
-    logger.info(f"💰 Proposing payment plan for phone: {request.phone}")
+    bind_log_context(conversation_id=request.conversation_id, phone=request.phone)
+    logger.info("💰 Proposing payment plan for phone: %s", request.phone)
     
     try:
         # Get customer's current debt
-        result = supabase.table('customers').select("*").eq('phone', request.phone).execute()
+        customer = await customer_repo.get_by_phone(request.phone)
         
-        if not result.data or len(result.data) == 0:
+        if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        customer = result.data[0]
-        total_debt = float(customer['debt_amount'])
+        await conversations.record_tool_response(request.phone, request.conversation_id)
+        offers = offer_book.get(customer)
+        total_debt = offers.debt_amount
         
         # Mode 1: Installment Plan
         if request.installments:
-            if request.installments < 1 or request.installments > 12:
+            plan = offers.installment_plan(request.installments)
+            if plan is None:
+                await conversations.record_plan(request.phone, request.conversation_id,
+                                                {"plan_type": "installments", "installments": request.installments},
+                                                accepted=False)
                 return ProposePaymentPlanResponse(
                     plan_type="installments",
                     total_amount=total_debt,
                     discount_applied=0.0,
                     accepted=False,
-                    message="Number of installments must be between 1 and 12"
+                    message=(f"Number of installments must be between {offers.min_installments} "
+                             f"and {offers.max_installments}")
                 )
             
-            installment_amount = round(total_debt / request.installments, 2)
-            payment_dates = generate_payment_dates(request.installments)
-            
-            logger.info(f"✅ Installment plan: {request.installments} payments of ${installment_amount}")
+            logger.info("✅ Installment plan: %s payments of $%s",
+                        request.installments, plan['installment_amount'])
+            await conversations.record_plan(request.phone, request.conversation_id,
+                                            {"plan_type": "installments", **plan, "total_amount": total_debt},
+                                            accepted=True)
             
             return ProposePaymentPlanResponse(
                 plan_type="installments",
-                installment_amount=installment_amount,
-                payment_dates=payment_dates,
+                installment_amount=plan['installment_amount'],
+                payment_dates=plan['payment_dates'],
                 total_amount=total_debt,
                 discount_applied=0.0,
                 accepted=True,
@@ -375,11 +398,16 @@ async def propose_payment_plan(request: ProposePaymentPlanRequest):
         
         # Mode 2: Settlement Offer
         elif request.offer_amount:
-            minimum_acceptable = total_debt * 0.80  # Must pay at least 80%
+            minimum_acceptable = offers.minimum_settlement_amount
+            accepted = offers.accepts_settlement(request.offer_amount)
+            await conversations.record_plan(request.phone, request.conversation_id,
+                                            {"plan_type": "settlement", "offer_amount": request.offer_amount,
+                                             "minimum_settlement_amount": minimum_acceptable},
+                                            accepted=accepted)
             
-            if request.offer_amount >= minimum_acceptable:
+            if accepted:
                 discount = total_debt - request.offer_amount
-                logger.info(f"✅ Settlement accepted: ${request.offer_amount} (discount: ${discount})")
+                logger.info("✅ Settlement accepted: $%s (discount: $%s)", request.offer_amount, discount)
                 
                 return ProposePaymentPlanResponse(
                     plan_type="settlement",
@@ -389,14 +417,15 @@ async def propose_payment_plan(request: ProposePaymentPlanRequest):
                     message=f"Settlement offer of ${request.offer_amount} accepted"
                 )
             else:
-                logger.info(f"❌ Settlement rejected: ${request.offer_amount} < ${minimum_acceptable}")
+                logger.info("❌ Settlement rejected: $%s < $%s", request.offer_amount, minimum_acceptable)
                 
                 return ProposePaymentPlanResponse(
                     plan_type="settlement",
                     total_amount=total_debt,
                     discount_applied=0.0,
                     accepted=False,
-                    message=f"Minimum acceptable amount is ${round(minimum_acceptable, 2)} (80% of debt)"
+                    message=(f"Minimum acceptable amount is ${minimum_acceptable} "
+                             f"({offers.settlement_floor:.0%} of debt)")
                 )
         
         else:
@@ -408,11 +437,11 @@ async def propose_payment_plan(request: ProposePaymentPlanRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Error proposing payment plan: {e}")
+        logger.error("❌ Error proposing payment plan: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@app.post("/tools/update-status", response_model=UpdateStatusResponse)
+@router.post("/tools/update-status", response_model=UpdateStatusResponse)
 async def update_status(request: UpdateStatusRequest):
     """
     Update customer status after call completion.
@@ -423,26 +452,35 @@ async def update_status(request: UpdateStatusRequest):
     - refused: Customer refused to pay
     - callback_requested: Customer asked to be called back
     - voicemail: Reached voicemail
+    
+    The status is written behind the response (write_behind.py) and the call
+    attempt (outcome, summary, last plan offered) is queued for the
+    call_attempts table (call_log.py), so neither waits on the database.
     """
-    logger.info(f"📝 Updating status for {request.phone} to '{request.new_status}'")
+    bind_log_context(conversation_id=request.conversation_id, phone=request.phone)
+    logger.info("📝 Updating status for %s to '%s'", request.phone, request.new_status)
     
     try:
-        # Update customer status
-        update_data = {
-            "status": request.new_status,
-            "updated_at": datetime.now().isoformat()
-        }
+        # Usually cached since the start of the call. If the database is
+        # unreachable, accept the update anyway: the flush drops unknown phones.
+        try:
+            customer = await customer_repo.get_by_phone(request.phone)
+        except Exception as db_error:
+            logger.warning("Could not look up customer, queueing status anyway: %s", db_error)
+            customer = {}
         
-        result = supabase.table('customers').update(update_data).eq('phone', request.phone).execute()
-        
-        if not result.data or len(result.data) == 0:
+        if customer is None:
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        logger.info(f"✅ Status updated successfully")
+        # Acknowledged now, written by the write-behind flusher
+        await write_behind.submit(request.phone, {"status": request.new_status})
+        
+        await conversations.record_tool_response(request.phone, request.conversation_id)
+        logger.info("✅ Status update queued")
         
-        # Log the interaction summary if provided
         if request.summary:
-            logger.info(f"📋 Call summary: {request.summary}")
+            logger.info("📋 Call summary: %s", request.summary)
+        await record_call_attempt(request, customer)
         
         return UpdateStatusResponse(
             success=True,
@@ -452,181 +490,575 @@ async def update_status(request: UpdateStatusRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Error updating status: {e}")
+        logger.error("❌ Error updating status: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+async def record_call_attempt(request: UpdateStatusRequest, customer: dict):
+    """Queue the finished call for the call_attempts table (written off the request path)."""
+    entry = await conversations.lookup(request.phone, request.conversation_id)
+    call_log.record(CallAttempt(
+        phone=request.phone,
+        outcome=request.new_status,
+        conversation_id=request.conversation_id or (entry.conversation_id if entry else None),
+        agent_id=entry.agent_id if entry else None,
+        customer_id=customer.get("id"),
+        started_at=entry.started_at() if entry else None,
+        summary=request.summary,
+        plan_offered=entry.plan_offered if entry else None,
+        plan_accepted=entry.plan_accepted if entry else None,
+    ))
+
+
 # ============================================================================
 # DASHBOARD/PANEL API ENDPOINTS
 # ============================================================================
 
-# --- Customer CRUD Models ---
-class CreateCustomerRequest(BaseModel):
-    name: str = Field(..., description="Customer full name")
-    phone: str = Field(..., description="Customer phone number (E.164)")
-    debt_amount: float = Field(..., description="Debt amount")
-    due_date: Optional[str] = Field(None, description="Due date YYYY-MM-DD")
-    status: str = Field("active", description="Initial status")
-    risk_level: str = Field("medium", description="Risk level (low, medium, high)")
-
-class UpdateCustomerRequest(BaseModel):
-    name: Optional[str] = None
-    phone: Optional[str] = None
-    debt_amount: Optional[float] = None
-    due_date: Optional[str] = None
-    status: Optional[str] = None
-    risk_level: Optional[str] = None
-
 # --- Customer CRUD Endpoints ---
 
-@app.post("/api/customers")
+@router.post("/api/customers")
 async def create_customer(customer: CreateCustomerRequest):
     """Create a new customer"""
-    supabase = get_supabase_client()
     try:
         # Check if phone exists
-        existing = supabase.table('customers').select("id").eq("phone", customer.phone).execute()
-        if existing.data:
+        if await customer_repo.phone_exists(customer.phone):
             raise HTTPException(status_code=400, detail="Customer with this phone already exists")
 
         new_customer = customer.dict(exclude_unset=True)
         # Add timestamps (optional, DB usually handles defaults but good to be explicit if needed)
         # new_customer['created_at'] = datetime.now().isoformat()
         
-        result = supabase.table('customers').insert(new_customer).execute()
+        created = await customer_repo.create(new_customer)
         
-        if result.data:
-            return {"success": True, "customer": result.data[0]}
+        if created:
+            return {"success": True, "customer": created}
         else:
             raise HTTPException(status_code=500, detail="Failed to create customer")
             
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # Created through another worker between the check and the insert
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error creating customer: {e}")
+        logger.error("Error creating customer: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/api/customers/{customer_id}")
+@router.post("/api/customers/import", response_model=ImportReport)
+async def import_customers_file(
+    request: Request,
+    filename: Optional[str] = Query(None, description="Original file name (.xlsx or .csv)"),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=5000, description="Rows per upsert"),
+    dry_run: bool = Query(False, description="Validate without writing"),
+):
+    """
+    Bulk import customers from an XLSX or CSV file sent as the request body, e.g.
+    curl --data-binary @portfolio.xlsx "$API/api/customers/import?filename=portfolio.xlsx"
+    Rows are upserted on phone in batches; the report lists rejected rows.
+    """
+    try:
+        fmt = detect_format(filename, request.headers.get("content-type"))
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    
+    logger.info("📥 Importing customers (%s, batch size %s%s)",
+                fmt, batch_size, ', dry run' if dry_run else '')
+    
+    try:
+        # XLSX is a zip (needs seeking), so the upload is spooled first; small files stay in memory
+        with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_MAX_BYTES) as spool:
+            async for chunk in request.stream():
+                spool.write(chunk)
+            spool.seek(0)
+            report = await import_customers(spool, fmt, customer_repo, batch_size=batch_size, dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("❌ Error importing customers: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    logger.info(
+        "✅ Imported %s/%s rows (%s rejected) in %ss, %s rows/s",
+        report.imported, report.rows_read, report.rejected, report.elapsed_secs, report.rows_per_sec
+    )
+    return report
+
+@router.patch("/api/customers/bulk", response_model=BulkUpdateResponse)
+async def bulk_update_customers(request: BulkUpdateRequest):
+    """
+    Apply the same changes to many customers in one request, e.g. a campaign reset:
+    {"filter": {"status": ["callback_requested"]}, "changes": {"status": "active"}}
+    IDs are updated in batched statements; a filter or `all` is a single statement.
+    """
+    updates = request.changes.model_dump(exclude_unset=True)
+    if not updates:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    targets = [request.ids is not None, request.filter is not None, request.all]
+    if sum(targets) != 1:
+        raise HTTPException(status_code=400, detail="Give exactly one of ids, filter or all")
+    selection = request.filter.model_dump(exclude_none=True) if request.filter else {}
+    if request.filter is not None and not selection:
+        raise HTTPException(status_code=400, detail="Filter has no conditions; use all=true to update everyone")
+    if "phone" in updates and not (request.ids is not None and len(request.ids) == 1):
+        raise HTTPException(status_code=400, detail="Phone numbers are unique; change them one customer at a time")
+    
+    try:
+        rows, errors = await customer_repo.bulk_update(
+            updates,
+            ids=request.ids,
+            statuses=selection.get("status"),
+            risk_levels=selection.get("risk_level"),
+            due_from=selection.get("due_from"),
+            due_to=selection.get("due_to"),
+            match_all=request.all,
+        )
+    except Exception as e:
+        logger.error("❌ Error in bulk update: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    results = [BulkUpdateResult(id=row["id"], success=True) for row in rows]
+    if request.ids is not None:
+        updated_ids = {row["id"] for row in rows}
+        results += [
+            BulkUpdateResult(id=customer_id, success=False, error=errors.get(customer_id, "Customer not found"))
+            for customer_id in dict.fromkeys(request.ids) if customer_id not in updated_ids
+        ]
+    failed = len(results) - len(rows)
+    
+    logger.info("✏️  Bulk update %s: %s updated, %s failed", sorted(updates), len(rows), failed)
+    return BulkUpdateResponse(success=failed == 0, updated=len(rows), failed=failed, results=results)
+
+@router.put("/api/customers/{customer_id}")
 async def update_customer(customer_id: str, customer: UpdateCustomerRequest):
     """Update an existing customer"""
-    supabase = get_supabase_client()
     try:
         updates = customer.dict(exclude_unset=True)
         if not updates:
             raise HTTPException(status_code=400, detail="No fields to update")
             
-        result = supabase.table('customers').update(updates).eq("id", customer_id).execute()
+        updated = await customer_repo.update_by_id(customer_id, updates)
         
-        if result.data:
-            return {"success": True, "customer": result.data[0]}
+        if updated:
+            return {"success": True, "customer": updated}
         else:
              raise HTTPException(status_code=404, detail="Customer not found")
              
     except Exception as e:
-        logger.error(f"Error updating customer: {e}")
+        logger.error("Error updating customer: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.delete("/api/customers/{customer_id}")
+@router.delete("/api/customers/{customer_id}")
 async def delete_customer(customer_id: str):
     """Delete a customer"""
-    supabase = get_supabase_client()
     try:
-        result = supabase.table('customers').delete().eq("id", customer_id).execute()
         # Supabase delete returns the deleted record
-        if result.data:
+        deleted = await customer_repo.delete_by_id(customer_id)
+        if deleted:
              return {"success": True, "message": "Customer deleted"}
         else:
              raise HTTPException(status_code=404, detail="Customer not found")
              
     except Exception as e:
-        logger.error(f"Error deleting customer: {e}")
+        logger.error("Error deleting customer: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/customers", response_model=List[CustomerListItem])
-async def list_customers():
+@router.get("/api/customers/{customer_id}/offers", response_model=OfferMatrixResponse)
+async def get_customer_offers(customer_id: str):
     """
-    Fetch all customers from Supabase for the dashboard.
+    The customer's full offer matrix for today: every installment plan the
+    policy allows, the settlement floor and the tiered settlement offers.
     """
-    logger.info("👥 Fetching customer list")
-    supabase = get_supabase_client()
+    try:
+        customer = await customer_repo.get_by_id(customer_id)
+        if not customer:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        return offer_book.get(customer).as_dict()
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error building offers: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/api/customers/{customer_id}/call-attempts")
+async def get_customer_call_attempts(customer_id: str, limit: int = Query(20, ge=1, le=200)):
+    """The customer's most recent call attempts (outcome, summary, plan offered), newest first."""
+    try:
+        return FastJSONResponse(await call_log.recent(customer_id=customer_id, limit=limit))
+    except Exception as e:
+        logger.error("Error loading call attempts: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def split_param(value: Optional[str]) -> Optional[List[str]]:
+    """Turn a comma-separated query parameter into a list (None if empty)."""
+    if not value:
+        return None
+    items = [v.strip() for v in value.split(",") if v.strip()]
+    return items or None
+
+
+@router.get("/api/customers", response_model=CustomerPage)
+async def list_customers(
+    limit: int = Query(50, ge=1, le=200, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    status: Optional[str] = Query(None, description="Comma-separated statuses"),
+    risk_level: Optional[str] = Query(None, description="Comma-separated risk levels"),
+    overdue: Optional[str] = Query(None, description="Comma-separated buckets: current, 1-30, 31-60, 61-90, 90+"),
+    sort: str = Query("updated_at", description="updated_at, due_date, debt_amount or name"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+):
+    """
+    Fetch one page of customers for the dashboard.
+    
+    Uses keyset (cursor) pagination on (sort column, id), so every page costs
+    the same regardless of how deep the operator scrolls.
+    """
+    logger.info("👥 Fetching customer page (limit=%s, status=%s, risk=%s, overdue=%s)",
+                limit, status, risk_level, overdue)
     
     try:
-        # Fetch all customers, ordered by updated_at desc
-        result = supabase.table('customers').select("*").order('updated_at', desc=True).execute()
+        rows, next_cursor = await customer_repo.list_page(
+            limit=limit,
+            cursor=cursor,
+            sort=sort,
+            descending=(order == "desc"),
+            statuses=split_param(status),
+            risk_levels=split_param(risk_level),
+            overdue_buckets=split_param(overdue),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("❌ Error fetching customers: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    customers = to_list_items(rows)
+    
+    logger.info("✅ Retrieved %s customers", len(customers))
+    return FastJSONResponse({"items": customers, "next_cursor": next_cursor})
+
+
+@router.get("/api/customers/changes", response_model=CustomerChanges)
+async def customer_changes(
+    since: Optional[str] = Query(None, description="cursor from the previous sync"),
+    limit: int = Query(500, ge=1, le=2000),
+):
+    """
+    Delta sync for the dashboard: rows inserted/updated and ids deleted since
+    `since`. Call without `since` to get a starting cursor; keep calling while
+    `has_more` is true.
+    """
+    try:
+        changes = await customer_repo.changes_since(since, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("❌ Error fetching customer changes: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    if changes["upserts"] or changes["deletes"]:
+        logger.info("🔄 Sync: %s changed, %s deleted", len(changes['upserts']), len(changes['deletes']))
+    
+    return FastJSONResponse({
+        "upserts": to_list_items(changes["upserts"]),
+        "deletes": changes["deletes"],
+        "cursor": changes["cursor"],
+        "has_more": changes["has_more"],
+    })
+
+
+@router.get("/api/stats", response_model=PortfolioStats)
+async def portfolio_stats():
+    """
+    Portfolio totals, counts by status/risk level and overdue histogram.
+    
+    Aggregated by the customer_stats() SQL function and cached for
+    STATS_CACHE_TTL_SECS, so the header costs one small request regardless
+    of portfolio size or how many operators are watching.
+    """
+    cached = await stats_cache.get("portfolio")
+    if cached is not None:
+        return cached
+    
+    async with stats_refresh_lock:
+        # Another request may have refreshed while we waited
+        cached = await stats_cache.get("portfolio")
+        if cached is not None:
+            return cached
         
-        if not result.data:
-            logger.info("No customers found")
-            return []
+        try:
+            raw = await customer_repo.portfolio_stats()
+        except Exception as e:
+            logger.error("❌ Error computing stats: %s", e)
+            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
         
-        # Format customer data
-        customers = []
-        for customer in result.data:
-            days_overdue = calculate_days_overdue(customer['due_date'])
-            
-            customers.append(CustomerListItem(
-                id=customer['id'],
-                name=customer['name'],
-                phone=customer['phone'],
-                debt_amount=float(customer['debt_amount']),
-                status=customer.get('status', 'active'),
-                risk_level=customer['risk_level'],
-                due_date=customer['due_date'],
-                days_overdue=days_overdue,
-                # Use updated_at as fallback for last_call_date since database schema might vary
-                last_call_date=customer.get('last_call_date') or customer.get('updated_at'),
-                updated_at=customer.get('updated_at')
-            ))
-        
-        logger.info(f"✅ Retrieved {len(customers)} customers")
-        return customers
+        by_status = raw.get("by_status") or {}
+        promised = by_status.get("promised_to_pay", {}).get("count", 0)
+        contacted = raw.get("total_customers", 0) - by_status.get("active", {}).get("count", 0)
         
+        stats = PortfolioStats(
+            total_customers=raw.get("total_customers", 0),
+            total_debt=round(float(raw.get("total_debt") or 0), 2),
+            total_recovered=round(float(raw.get("total_recovered") or 0), 2),
+            success_rate=round(promised / contacted, 4) if contacted else 0.0,
+            by_status=by_status,
+            by_risk_level=raw.get("by_risk_level") or {},
+            overdue_buckets=raw.get("overdue_buckets") or {},
+            generated_at=datetime.now().isoformat(),
+        )
+        # Cached as JSON types (shared through Redis with several workers)
+        await stats_cache.set("portfolio", stats.model_dump())
+        return stats
+
+
+def analyze_portfolio(rows: List[dict]) -> dict:
+    """Columnar load plus one vectorised analysis pass (runs off the event loop)."""
+    portfolio = Portfolio.from_rows(rows)
+    return {"portfolio": portfolio, "analysis": portfolio.analyze(),
+            "generated_at": datetime.now().isoformat()}
+
+
+async def load_portfolio_snapshot() -> dict:
+    """The analysed customer table, reloaded at most every PORTFOLIO_SNAPSHOT_TTL_SECS."""
+    snapshot = portfolio_cache.get("portfolio")
+    if snapshot is not None:
+        return snapshot
+    
+    async with portfolio_refresh_lock:
+        snapshot = portfolio_cache.get("portfolio")
+        if snapshot is not None:
+            return snapshot
+        
+        started = time.perf_counter()
+        rows = await customer_repo.scan(PORTFOLIO_COLUMNS)
+        snapshot = await asyncio.to_thread(analyze_portfolio, rows)
+        portfolio_cache.set("portfolio", snapshot)
+        logger.info("📈 Portfolio snapshot: %s customers analysed in %.2fs",
+                    len(rows), time.perf_counter() - started)
+        return snapshot
+
+
+@router.get("/api/portfolio/ranking")
+async def portfolio_ranking(
+    limit: int = Query(50, ge=1, le=1000),
+    status: Optional[str] = Query("active", description="Comma-separated statuses"),
+):
+    """
+    Customers with the highest expected recovery (debt x recovery probability
+    by risk level and days overdue), with days overdue, bucket and risk score.
+    """
+    try:
+        snapshot = await load_portfolio_snapshot()
     except Exception as e:
-        logger.error(f"❌ Error fetching customers: {e}")
+        logger.error("❌ Error loading portfolio: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    portfolio, analysis = snapshot["portfolio"], snapshot["analysis"]
+    return FastJSONResponse({
+        "generated_at": snapshot["generated_at"],
+        "total_customers": len(portfolio),
+        "items": portfolio.ranking(analysis, limit=limit, statuses=split_param(status)),
+    })
+
+
+@router.get("/api/portfolio/stats")
+async def portfolio_analytics():
+    """Totals, group breakdowns and expected recovery from the vectorised portfolio snapshot."""
+    try:
+        snapshot = await load_portfolio_snapshot()
+    except Exception as e:
+        logger.error("❌ Error loading portfolio: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    return {"generated_at": snapshot["generated_at"],
+            **snapshot["portfolio"].stats(snapshot["analysis"])}
 
 
-@app.get("/api/agents")
-async def list_agents():
+@router.get("/api/cache/stats")
+async def cache_stats():
     """
-    Fetch available agents from ElevenLabs API.
+    Hit/miss/eviction counters for the customer cache (this worker's view) and
+    the state backend holding it. Use these to size CUSTOMER_CACHE_TTL_SECS
+    and CUSTOMER_CACHE_MAX_ENTRIES.
     """
-    logger.info("🤖 Fetching agents from ElevenLabs")
+    await customer_repo.cache.size()
+    return {**customer_repo.cache.stats(), "state": await backend_info()}
+
+
+@router.get("/api/offers/stats")
+async def offer_stats():
+    """Offer matrix cache counters and the active offer policy."""
+    return offer_book.stats()
+
+
+@router.get("/api/call-log/stats")
+async def call_log_stats():
+    """Call attempts buffered, written and dropped, and batch insert latency."""
+    return call_log.stats()
+
+
+@router.get("/api/phone-index/stats")
+async def phone_index_stats():
+    """Phone index size, sync age, and lookups answered without the database."""
+    return phone_index.stats()
+
+
+@router.get("/api/compression/stats")
+async def response_compression_stats():
+    """Responses compressed (gzip / br) and bytes saved, and the JSON serialiser in use."""
+    return {**compression_stats(), "json_serializer": json_backend()}
+
+
+@router.get("/api/write-behind/stats")
+async def write_behind_stats():
+    """Customer writes waiting to be flushed, coalescing, flush failures and flush latency."""
+    return write_behind.stats()
+
+
+@router.get("/api/logging/stats")
+async def log_queue_stats():
+    """Log queue depth, high-water mark and records dropped on overflow."""
+    return logging_stats()
+
+
+@router.get("/api/conversations/stats")
+async def conversation_stats():
+    """
+    Dispatched-conversation registry size and time-to-first-tool-response
+    (seconds from outbound call dispatch to the first tool webhook answered).
+    """
+    return await conversations.stats()
+
+
+@router.post("/api/conversations/prewarm")
+async def prewarm_conversation(request: PrewarmConversationRequest):
+    """
+    Pre-warm the customer cache for a call dispatched outside this API
+    (make_call.py), so the agent's first tool webhooks are served from memory.
+    """
+    customer = await customer_repo.get_by_phone(request.phone, fresh=True)
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
     
-    ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
-    if not ELEVENLABS_API_KEY:
+    await stash_dispatched_call(request.phone, request.conversation_id, customer, time.monotonic())
+    logger.info("🔥 Pre-warmed conversation %s for %s", request.conversation_id, customer['name'])
+    return {"success": True, "customer_name": customer['name']}
+
+
+@router.get("/api/agents")
+async def list_agents(request: Request, response: Response):
+    """
+    Available ElevenLabs agents, served from the in-memory catalogue
+    (refreshed in the background once older than AGENTS_CACHE_TTL_SECS).
+    Supports If-None-Match: an unchanged list is answered with 304.
+    """
+    if not os.getenv("ELEVENLABS_API_KEY"):
         raise HTTPException(status_code=500, detail="ElevenLabs API Key not configured")
-        
-    url = "https://api.elevenlabs.io/v1/convai/agents"
-    headers = {"xi-api-key": ELEVENLABS_API_KEY}
     
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('agents', [])
-        else:
-            logger.error(f"ElevenLabs Error: {response.text}")
-            raise HTTPException(status_code=response.status_code, detail="Failed to fetch agents")
-    except Exception as e:
-        logger.error(f"Error fetching agents: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        agents, etag = await agent_catalogue.get()
+    except AgentCatalogueUnavailable as e:
+        logger.error("❌ Error fetching agents: %s", e)
+        raise HTTPException(status_code=502, detail="Failed to fetch agents")
+    
+    # Browsers revalidate on every load and get a 304 while the list is unchanged
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        agent_catalogue.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return agents
+
 
+@router.get("/api/agents/stats")
+async def agent_catalogue_stats():
+    """Agent catalogue age, hit/stale/304 counts, refreshes and upstream latency."""
+    return agent_catalogue.stats()
 
-@app.post("/api/call", response_model=InitiateCallResponse)
+
+@router.get("/api/latency/stats")
+async def latency_stats():
+    """
+    Per-route p50/p95/p99, p95 Supabase/ElevenLabs time per request and, for
+    tool webhooks, how much of the ElevenLabs response timeout the p99 uses.
+    """
+    return {"tool_response_timeout_secs": TOOL_RESPONSE_TIMEOUT_SECS, "routes": latency_summary()}
+
+
+def _collect_app_stats():
+    """Expose the counters kept by the caches, log queue and ElevenLabs client on /metrics."""
+    cache = customer_repo.cache.stats()
+    log_queue = logging_stats()
+    client = get_elevenlabs_client().stats()
+    lines = []
+    for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        lines += gauge_lines(f"customer_cache_{key}_total", f"Customer cache {key}", cache[key], "counter")
+    lines += gauge_lines("customer_cache_size", "Customer rows cached", cache["size"])
+    lines += gauge_lines("log_queue_size", "Log records waiting to be written", log_queue["queue_size"])
+    lines += gauge_lines("log_records_dropped_total", "Log records dropped on queue overflow",
+                         log_queue["dropped"], "counter")
+    lines += gauge_lines("elevenlabs_requests_in_flight", "ElevenLabs requests in flight", client["in_flight"])
+    lines += gauge_lines("elevenlabs_retries_total", "ElevenLabs requests retried", client["retries"], "counter")
+    lines += histogram_lines(conversations.time_to_first_tool)
+    attempts = call_log.stats()
+    lines += gauge_lines("call_log_pending", "Call attempts waiting to be written", attempts["pending"])
+    lines += gauge_lines("call_log_inserted_total", "Call attempts written", attempts["inserted"], "counter")
+    lines += gauge_lines("call_log_dropped_total", "Call attempts dropped after repeated insert failures",
+                         attempts["dropped"], "counter")
+    lines += histogram_lines(call_log.flush_latency)
+    buffered = write_behind.stats()
+    lines += gauge_lines("write_behind_pending", "Phones with customer writes not yet flushed", buffered["pending"])
+    lines += gauge_lines("write_behind_oldest_pending_seconds", "Age of the oldest unflushed customer write",
+                         buffered["oldest_pending_secs"])
+    lines += gauge_lines("write_behind_journal_bytes", "Size of the write-behind journal file",
+                         buffered["journal_bytes"])
+    for key in ("submitted", "coalesced", "flushed", "failed_flushes", "unmatched", "superseded"):
+        lines += gauge_lines(f"write_behind_{key}_total", f"Write-behind {key.replace('_', ' ')}",
+                             buffered[key], "counter")
+    lines += histogram_lines(write_behind.flush_latency)
+    phones = phone_index.stats()
+    lines += gauge_lines("phone_index_size", "Customer phones held in the phone index", phones["size"])
+    lines += gauge_lines("phone_index_missing_total", "Lookups of unknown phones answered without the database",
+                         phones["missing"], "counter")
+    lines += gauge_lines("phone_index_sync_errors_total", "Failed phone index syncs", phones["sync_errors"], "counter")
+    return lines
+
+
+REGISTRY.add_collector(_collect_app_stats)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format)."""
+    # The collectors are synchronous: count the customer cache (a SCAN with Redis) here
+    await customer_repo.cache.size()
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/api/elevenlabs/stats")
+async def elevenlabs_client_stats():
+    """Shared ElevenLabs client: requests in flight, retries, failures, latency per endpoint."""
+    return get_elevenlabs_client().stats()
+
+
+@router.post("/api/call", response_model=InitiateCallResponse)
 async def initiate_call(request: InitiateCallRequest):
     """
     Initiate an outbound call to a customer via ElevenLabs API.
     Uses specific agent_id if provided, otherwise defaults to env var.
     """
-    logger.info(f"📞 Initiating call to: {request.phone}")
+    logger.info("📞 Initiating call to: %s", request.phone)
     
     try:
-        # Get customer info from database
-        result = supabase.table('customers').select("*").eq('phone', request.phone).execute()
+        # Get customer info from database (fresh read: operators may have just edited it)
+        customer = await customer_repo.get_by_phone(request.phone, fresh=True)
         
-        if not result.data or len(result.data) == 0:
+        if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        customer = result.data[0]
         customer_name = customer['name']
         
         # ElevenLabs API configuration
@@ -644,98 +1076,347 @@ async def initiate_call(request: InitiateCallRequest):
         if not agent_id_to_use:
              raise HTTPException(status_code=500, detail="No Agent ID provided and default not set")
 
-        # Prepare API request to ElevenLabs
-        url = "https://api.elevenlabs.io/v1/convai/twilio/outbound-call"
-        
-        headers = {
-            "xi-api-key": ELEVENLABS_API_KEY,
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "agent_id": agent_id_to_use,
-            "to_number": request.phone,
-        }
-        
-        if AGENT_PHONE_NUMBER_ID:
-            payload["agent_phone_number_id"] = AGENT_PHONE_NUMBER_ID
+        logger.info("Calling ElevenLabs API for %s", customer_name)
         
-        # Add dynamic variables for the conversation
-        payload["conversation_config_override"] = {
-            "agent": {
-                "dynamic_variables": {
+        # Make API call to ElevenLabs (pooled keep-alive connection, retried only if the call cannot have been placed)
+        dispatched_at = time.monotonic()
+        try:
+            data = await get_elevenlabs_client().place_call(
+                agent_id_to_use,
+                request.phone,
+                AGENT_PHONE_NUMBER_ID,
+                dynamic_variables={
                     "phone_number": request.phone,
                     "customer_name": customer_name
-                }
-            }
-        }
-        
-        logger.info(f"Calling ElevenLabs API for {customer_name}")
-        
-        # Make API call to ElevenLabs
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
-        
-        if response.status_code == 200:
-            data = response.json()
-            conversation_id = data.get('conversation_id', 'N/A')
-            
-            # Try to update last_call_date in database (if column exists)
-            try:
-                supabase.table('customers').update({
-                    "updated_at": datetime.now().isoformat()
-                }).eq('phone', request.phone).execute()
-            except Exception as db_error:
-                logger.warning(f"Could not update database timestamp: {db_error}")
-            
-            logger.info(f"✅ Call initiated successfully to {customer_name}")
-            logger.info(f"   Conversation ID: {conversation_id}")
-            
-            return InitiateCallResponse(
-                success=True,
-                conversation_id=conversation_id,
-                message=f"Call initiated successfully to {customer_name}",
-                customer_name=customer_name
+                },
             )
-        else:
-            logger.error(f"ElevenLabs API error: {response.status_code} - {response.text}")
+        except ElevenLabsError as e:
+            if e.status_code is None:
+                raise
+            logger.error("ElevenLabs API error: %s - %s", e.status_code, e)
             return InitiateCallResponse(
                 success=False,
-                message=f"Failed to initiate call: {response.text}"
+                message=f"Failed to initiate call: {e}"
             )
+        
+        conversation_id = data.get('conversation_id', 'N/A')
+        await record_dispatched_call(customer, conversation_id, dispatched_at, agent_id_to_use)
+        
+        logger.info("✅ Call initiated successfully to %s", customer_name)
+        logger.info("   Conversation ID: %s", conversation_id)
+        
+        return InitiateCallResponse(
+            success=True,
+            conversation_id=conversation_id,
+            message=f"Call initiated successfully to {customer_name}",
+            customer_name=customer_name
+        )
             
     except HTTPException:
         raise
-    except requests.exceptions.RequestException as e:
-        logger.error(f"❌ API request failed: {e}")
+    except ElevenLabsError as e:
+        logger.error("❌ API request failed: %s", e)
         raise HTTPException(status_code=503, detail="ElevenLabs API unavailable")
     except Exception as e:
-        logger.error(f"❌ Error initiating call: {e}")
+        logger.error("❌ Error initiating call: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/api/call-queue/claim")
+async def claim_customers(request: ClaimCustomersRequest):
+    """
+    Return the next N customers to call, in priority order, leased to the
+    calling worker. Concurrent workers never receive the same customer while
+    its lease is live.
+    """
+    try:
+        customers = await customer_repo.claim_next(
+            request.worker_id,
+            limit=request.limit,
+            lease_secs=request.lease_secs,
+            statuses=request.status,
+            risk_levels=request.risk_level,
+            due_from=request.due_from,
+            due_to=request.due_to,
+        )
+        logger.info("📋 Worker %s claimed %s customers", request.worker_id, len(customers))
+        return customers
+    except Exception as e:
+        logger.error("❌ Error claiming customers: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/api/call-queue/release")
+async def release_customers(request: ReleaseClaimsRequest):
+    """Release leases a worker will not use (e.g. the dispatch failed)."""
+    try:
+        released = await customer_repo.release_claims(request.worker_id, request.ids)
+        return {"success": True, "released": released}
+    except Exception as e:
+        logger.error("❌ Error releasing claims: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+async def watch_campaign(campaign: Campaign):
+    """Publish a campaign's progress for other workers and honour cancels requested through them."""
+    while True:
+        await campaign_board.set(campaign.id, campaign.snapshot())
+        if await campaign_cancels.get(campaign.id):
+            logger.info("🛑 Cancelling campaign %s (requested through another worker)", campaign.id)
+            campaign.cancel()
+        await asyncio.sleep(CAMPAIGN_PUBLISH_INTERVAL_SECS)
+
+
+async def run_campaign(campaign: Campaign):
+    """Background task: dial the whole queue, then release the HTTP client."""
+    watcher = asyncio.create_task(watch_campaign(campaign))
+    try:
+        await campaign.run()
+        snapshot = campaign.snapshot()
+        logger.info(
+            "🏁 Campaign %s finished: %s/%s dispatched, %s failed, %s calls/s",
+            campaign.id, snapshot['dispatched'], snapshot['total'], snapshot['failed'],
+            snapshot['dispatch_rate_per_sec']
+        )
+    except asyncio.CancelledError:
+        logger.info("🛑 Campaign %s cancelled", campaign.id)
+    except Exception as e:
+        campaign.status = "failed"
+        logger.error("❌ Campaign %s failed: %s", campaign.id, e)
+    finally:
+        watcher.cancel()
+        await campaign_board.set(campaign.id, campaign.snapshot())
+        await campaign.client.aclose()
+
+
+@router.post("/api/campaigns")
+async def start_campaign(request: StartCampaignRequest):
+    """
+    Start an outbound campaign in the background.
+    Customers matching the filter are called in priority order (risk, then
+    oldest due date, then debt) within the concurrency and rate limits.
+    """
+    logger.info("📣 Starting campaign: status=%s risk=%s due=%s..%s",
+                request.status, request.risk_level, request.due_from, request.due_to)
+    
+    if not os.getenv("ELEVENLABS_API_KEY"):
+        raise HTTPException(status_code=500, detail="ElevenLabs credentials not configured")
+    if not (request.agent_id or os.getenv("ELEVENLABS_AGENT_ID")):
+        raise HTTPException(status_code=500, detail="No Agent ID provided and default not set")
+    
+    campaign_filter = CampaignFilter(
+        statuses=request.status,
+        risk_levels=request.risk_level,
+        due_from=request.due_from,
+        due_to=request.due_to,
+        limit=request.limit,
+    )
+    settings = CampaignSettings(
+        max_concurrent=request.max_concurrent,
+        calls_per_second=request.calls_per_second,
+        max_retries=request.max_retries,
+    )
+    
+    # Customers are leased from the database call queue a batch at a time,
+    # so concurrent campaigns and make_call.py never dial the same person
+    claims = CustomerClaims(customer_repo, campaign_filter)
+    try:
+        first_batch = await claims.claim(min(settings.max_concurrent * 2, request.limit or 1_000_000))
+    except Exception as e:
+        logger.error("❌ Error claiming campaign customers: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    if not first_batch:
+        raise HTTPException(status_code=404, detail="No unclaimed customers match this campaign filter")
+    
+    client = OutboundCallClient(agent_id=request.agent_id, client=get_elevenlabs_client())
+    
+    async def on_dispatched(customer: dict, conversation_id: Optional[str], dispatched_at: float):
+        await record_dispatched_call(customer, conversation_id, dispatched_at, client.agent_id)
+    
+    campaign = Campaign(first_batch, client, settings, campaign_filter,
+                        on_dispatched=on_dispatched, claims=claims)
+    campaigns[campaign.id] = campaign
+    campaign.task = create_background_task(run_campaign(campaign))
+    
+    logger.info("✅ Campaign %s started as worker %s", campaign.id, claims.worker_id)
+    return campaign.snapshot()
+
+
+@router.get("/api/campaigns")
+async def list_campaigns():
+    """Progress of every campaign started since the server came up (on any worker)."""
+    snapshots = dict(await campaign_board.items())
+    snapshots.update((campaign_id, c.snapshot()) for campaign_id, c in campaigns.items())
+    return list(snapshots.values())
+
+
+@router.get("/api/campaigns/{campaign_id}")
+async def get_campaign(campaign_id: str, results: bool = False):
+    """
+    Progress, throughput and (optionally) per-call results of a campaign.
+    Campaigns running on another worker are reported from their last published
+    snapshot (at most CAMPAIGN_PUBLISH_INTERVAL_SECS old, without results).
+    """
+    campaign = campaigns.get(campaign_id)
+    if campaign is not None:
+        # One entry per call with results=true
+        return FastJSONResponse(campaign.snapshot(include_results=results))
+    snapshot = await campaign_board.get(campaign_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return snapshot
+
+
+@router.post("/api/campaigns/{campaign_id}/cancel")
+async def cancel_campaign(campaign_id: str):
+    """Stop dispatching new calls; calls already placed keep going."""
+    campaign = campaigns.get(campaign_id)
+    if campaign is not None:
+        campaign.cancel()
+        logger.info("🛑 Cancelling campaign %s", campaign_id)
+        return campaign.snapshot()
+    snapshot = await campaign_board.get(campaign_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    # The worker running it picks this up within CAMPAIGN_PUBLISH_INTERVAL_SECS
+    await campaign_cancels.set(campaign_id, True)
+    logger.info("🛑 Cancel requested for campaign %s", campaign_id)
+    return {**snapshot, "cancel_requested": True}
 
 
 # ============================================================================
 # STARTUP
 # ============================================================================
 
-@app.on_event("startup")
-async def startup_event():
+def log_endpoints():
     """Log startup information."""
     logger.info("=" * 60)
     logger.info("🚀 Jess Voice Agent API Starting...")
     logger.info("=" * 60)
     logger.info("📡 Tool Endpoints:")
     logger.info("   GET  /health")
+    logger.info("   GET  /metrics")
     logger.info("   POST /tools/get-customer-name")
     logger.info("   POST /tools/get-case-details")
+    logger.info("   POST /tools/get-conversation-context")
     logger.info("   POST /tools/propose-payment-plan")
     logger.info("   POST /tools/update-status")
     logger.info("")
     logger.info("📊 Dashboard API Endpoints:")
     logger.info("   GET  /api/customers")
+    logger.info("   GET  /api/customers/changes")
+    logger.info("   POST /api/customers/import")
+    logger.info("   PATCH /api/customers/bulk")
+    logger.info("   GET  /api/stats")
+    logger.info("   GET  /api/portfolio/ranking")
+    logger.info("   GET  /api/portfolio/stats")
+    logger.info("   GET  /api/customers/{id}/offers")
+    logger.info("   GET  /api/customers/{id}/call-attempts")
+    logger.info("   GET  /api/call-log/stats")
+    logger.info("   GET  /api/write-behind/stats")
+    logger.info("   GET  /api/phone-index/stats")
+    logger.info("   GET  /api/compression/stats")
+    logger.info("   GET  /api/cache/stats")
+    logger.info("   GET  /api/offers/stats")
+    logger.info("   GET  /api/agents/stats")
+    logger.info("   GET  /api/elevenlabs/stats")
+    logger.info("   GET  /api/latency/stats")
+    logger.info("   GET  /api/logging/stats")
+    logger.info("   GET  /api/conversations/stats")
+    logger.info("   POST /api/conversations/prewarm")
     logger.info("   POST /api/call")
+    logger.info("   POST /api/call-queue/claim")
+    logger.info("   POST /api/campaigns")
+    logger.info("   GET  /api/campaigns/{id}")
     logger.info("=" * 60)
 
 
+async def warm_database():
+    """Create the Supabase client (and import supabase) on the repository thread pool."""
+    try:
+        await repository.run_query(get_supabase_client)
+    except Exception as e:
+        logger.error("❌ Supabase client unavailable: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup and shutdown in one place. Nothing here runs at import, so
+    importing main (or calling create_app()) needs no credentials and
+    touches neither the disk nor the network.
+    """
+    # Queued logging: handlers never write to disk on the request path
+    setup_logging()
+    log_endpoints()
+    
+    # Warm the agent catalogue so the first dashboard load doesn't wait on ElevenLabs
+    if os.getenv("ELEVENLABS_API_KEY"):
+        agent_catalogue.refresh_in_background()
+    
+    # The Supabase client is built in a thread meanwhile: not at import, but
+    # before the first tool call of a live conversation
+    warmup = asyncio.create_task(warm_database())
+    
+    # Background writers: customer writes (replaying the journal first) and call attempts
+    await write_behind.start()
+    call_log.start()
+    # Loads in the background; lookups use the database until it is ready
+    phone_index.start(customer_repo)
+    await warmup
+    logger.info("✅ Ready in %.0f ms (since main was imported)", (time.perf_counter() - IMPORT_STARTED) * 1000)
+    
+    yield
+    
+    # Stop running campaigns and release the database and ElevenLabs connection pools
+    for campaign in campaigns.values():
+        campaign.cancel()
+    await close_elevenlabs_client()
+    # Before the database pool goes away
+    await write_behind.stop()
+    await call_log.stop()
+    await phone_index.stop()
+    repository.shutdown()
+    await close_redis()
+    shutdown_logging()
+
+
+def create_app() -> FastAPI:
+    """Build the application: middleware, static files and every endpoint on `router`."""
+    app = FastAPI(
+        title="Jess Voice Agent API",
+        description="Backend tools for autonomous debt collection voice agent",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+    
+    # Configure CORS to allow ElevenLabs to call our endpoints
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, specify ElevenLabs domains
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    # gzip / br for large JSON responses (compression.py)
+    app.add_middleware(CompressionMiddleware)
+    
+    # Per-route latency, status codes and Supabase/ElevenLabs spans (GET /metrics)
+    app.add_middleware(MetricsMiddleware)
+    
+    # Static pages and assets: static_build/ if build_static.py has run, else static/
+    app.state.static_files = StaticAssets(directory=static_root())
+    app.mount("/static", app.state.static_files, name="static")
+    app.include_router(router)
+    return app
+
+
+# `main:app` for uvicorn / gunicorn
+app = create_app()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
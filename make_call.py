@@ -1,12 +1,19 @@
 """
 Simple script to make a single outbound call using ElevenLabs API.
 Usage: python make_call.py [customer_id_or_phone]
+
+For calling many customers at once see campaign.py.
 """
 
 import sys
 import os
+import socket
+from datetime import datetime
 import requests
 from database import get_supabase_client
+from dialer_settings import CLAIM_MIN_RECALL_SECS
+from elevenlabs_client import ElevenLabsError, run_sync
+from phones import normalize_phone, phone_key
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -15,6 +22,32 @@ load_dotenv()
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 ELEVENLABS_AGENT_ID = os.getenv("ELEVENLABS_AGENT_ID")
 AGENT_PHONE_NUMBER_ID = os.getenv("AGENT_PHONE_NUMBER_ID")  # Twilio phone number ID in ElevenLabs
+API_BASE_URL = os.getenv("API_BASE_URL")  # e.g. https://genuvoice.com - enables cache pre-warming
+
+# Lease owner for customers claimed from the call queue
+WORKER_ID = f"make_call:{socket.gethostname()}:{os.getpid()}"
+
+
+def prewarm_api_cache(phone_number: str, conversation_id: str):
+    """
+    Tell the API server about the call we just placed so the agent's first
+    tool webhooks are answered from memory. Best effort: never fails the call.
+    """
+    if not API_BASE_URL:
+        return
+    
+    try:
+        response = requests.post(
+            f"{API_BASE_URL.rstrip('/')}/api/conversations/prewarm",
+            json={"phone": phone_number, "conversation_id": conversation_id},
+            timeout=3,
+        )
+        if response.status_code == 200:
+            print("🔥 API cache pre-warmed for this conversation")
+        else:
+            print(f"⚠️  Cache pre-warm skipped: {response.status_code}")
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️  Cache pre-warm skipped: {e}")
 
 def make_call(phone_number: str, customer_name: str):
     """
@@ -37,62 +70,47 @@ def make_call(phone_number: str, customer_name: str):
         print("   The call might fail without this ID")
         print()
     
-    # ElevenLabs API endpoint for Twilio outbound calls
-    url = "https://api.elevenlabs.io/v1/convai/twilio/outbound-call"
-    
-    headers = {
-        "xi-api-key": ELEVENLABS_API_KEY,
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "agent_id": ELEVENLABS_AGENT_ID,
-        "to_number": phone_number,
-    }
-    
-    # Add agent_phone_number_id if configured
-    if AGENT_PHONE_NUMBER_ID:
-        payload["agent_phone_number_id"] = AGENT_PHONE_NUMBER_ID
-    
-    # Add custom variables for the conversation
+    # Custom variables for the conversation
     # These can be referenced in the ElevenLabs prompt and tools
-    payload["conversation_config_override"] = {
-        "agent": {
-            "prompt": {
-                "prompt": f"You are Jess, calling {customer_name}. Use their name in the greeting."
-            },
-            "first_message": f"Hi! <break time=\"0.3s\"/> I was hoping to catch {customer_name}? <break time=\"0.3s\"/> Is that you?",
-            "dynamic_variables": {
-                "phone_number": phone_number,
-                "customer_name": customer_name
-            }
-        }
+    agent_override = {
+        "prompt": {
+            "prompt": f"You are Jess, calling {customer_name}. Use their name in the greeting."
+        },
+        "first_message": f"Hi! <break time=\"0.3s\"/> I was hoping to catch {customer_name}? <break time=\"0.3s\"/> Is that you?",
+    }
+    dynamic_variables = {
+        "phone_number": phone_number,
+        "customer_name": customer_name
     }
     
     print("Initiating call...")
     print()
     
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        data = run_sync(lambda client: client.place_call(
+            ELEVENLABS_AGENT_ID,
+            phone_number,
+            AGENT_PHONE_NUMBER_ID,
+            dynamic_variables=dynamic_variables,
+            agent_override=agent_override,
+        ))
         
-        print(f"Status Code: {response.status_code}")
+        print("✅ Call initiated successfully!")
         print()
-        
-        if response.status_code == 200:
-            data = response.json()
-            print("✅ Call initiated successfully!")
-            print()
-            print("Response:")
-            print(f"  Conversation ID: {data.get('conversation_id', 'N/A')}")
-            if 'status' in data:
-                print(f"  Status: {data['status']}")
-            print()
-            print("Full response:")
-            print(data)
-        else:
-            print(f"❌ Error: {response.status_code}")
-            print(f"Response: {response.text}")
+        print("Response:")
+        print(f"  Conversation ID: {data.get('conversation_id', 'N/A')}")
+        if 'status' in data:
+            print(f"  Status: {data['status']}")
+        print()
+        record_call(phone_number)
+        prewarm_api_cache(phone_number, data.get('conversation_id'))
+        print()
+        print("Full response:")
+        print(data)
             
+    except ElevenLabsError as e:
+        print(f"❌ Error: {e.status_code or 'request failed'}")
+        print(f"Response: {e}")
     except Exception as e:
         print(f"❌ Exception: {e}")
     
@@ -100,12 +118,18 @@ def make_call(phone_number: str, customer_name: str):
 
 def get_next_customer_to_call():
     """
-    Get the next customer to call from Supabase based on priority.
+    Claim the next customer to call from Supabase based on priority.
     
-    Priority:
+    Priority (computed and indexed in the database, see claim_next_customers):
     1. Status = 'active'
     2. Risk level (high > medium > low)
     3. Days overdue (oldest first)
+    4. Debt amount (largest first), then least recently called
+    
+    Anyone called in the last CLAIM_MIN_RECALL_SECS is skipped.
+    
+    The customer is leased to this script so concurrent dialers skip it;
+    call release_customer() if you decide not to call.
     
     Returns:
         dict: Customer data or None if no customers found
@@ -113,29 +137,40 @@ def get_next_customer_to_call():
     supabase = get_supabase_client()
     
     try:
-        # Get all active customers, ordered by priority
-        result = supabase.table('customers') \
-            .select('*') \
-            .eq('status', 'active') \
-            .order('due_date', desc=False) \
-            .execute()
-        
-        if not result.data:
-            return None
-        
-        # Sort by risk level manually (high > medium > low)
-        risk_priority = {'high': 1, 'medium': 2, 'low': 3}
-        sorted_customers = sorted(
-            result.data, 
-            key=lambda x: (risk_priority.get(x['risk_level'], 999), x['due_date'])
-        )
+        result = supabase.rpc('claim_next_customers', {
+            'p_worker': WORKER_ID,
+            'p_limit': 1,
+            'p_min_recall_secs': CLAIM_MIN_RECALL_SECS,
+        }).execute()
         
-        return sorted_customers[0]
+        return result.data[0] if result.data else None
         
     except Exception as e:
         print(f"❌ Error getting customer: {e}")
         return None
 
+
+def release_customer(customer: dict):
+    """Give back a claimed customer we decided not to call."""
+    try:
+        get_supabase_client().rpc('release_customer_claims', {
+            'p_worker': WORKER_ID,
+            'p_ids': [customer['id']],
+        }).execute()
+    except Exception as e:
+        print(f"⚠️  Could not release claim: {e}")
+
+
+def record_call(phone_number: str):
+    """Remember when this customer was last called (used for call priority)."""
+    try:
+        get_supabase_client().table('customers') \
+            .update({'last_call_at': datetime.now().astimezone().isoformat()}) \
+            .eq('phone_e164', phone_key(phone_number)) \
+            .execute()
+    except Exception as e:
+        print(f"⚠️  Could not record last_call_at: {e}")
+
 if __name__ == "__main__":
     if not ELEVENLABS_API_KEY or not ELEVENLABS_AGENT_ID:
         print("❌ Error: Missing ElevenLabs credentials")
@@ -144,11 +179,15 @@ if __name__ == "__main__":
     
     # Check if specific phone number was provided
     if len(sys.argv) >= 2:
-        phone = sys.argv[1]
+        try:
+            phone = normalize_phone(sys.argv[1])
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
         
-        # Try to get customer from database
+        # Try to get customer from database (matched on E.164, however it was typed)
         supabase = get_supabase_client()
-        result = supabase.table('customers').select('*').eq('phone', phone).execute()
+        result = supabase.table('customers').select('*').eq('phone_e164', phone).execute()
         
         if result.data:
             customer = result.data[0]
@@ -176,6 +215,7 @@ if __name__ == "__main__":
             if confirm in ['yes', 'y']:
                 make_call(customer['phone'], customer['name'])
             else:
+                release_customer(customer)
                 print("❌ Call cancelled")
         else:
             print("❌ No active customers found in database")
@@ -185,4 +225,5 @@ if __name__ == "__main__":
             print("Examples:")
             print("  python make_call.py                    # Auto-select next customer")
             print("  python make_call.py +15551234567       # Call specific number")
+            print("  python campaign.py --risk high         # Call many customers concurrently")
 
@@ -0,0 +1,221 @@
+"""
+Lightweight in-process metrics.
+
+Histograms keep cumulative bucket counts (cheap, unbounded lifetime) plus a
+small window of recent samples for percentile estimates on the dashboard.
+
+Counters, gauges and labelled histogram families registered in REGISTRY are
+rendered in the Prometheus text format by render_prometheus() (GET /metrics).
+"""
+
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Seconds; tuned for webhook/tool latencies (ElevenLabs tool timeout is 20s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with percentile estimates over recent samples."""
+
+    def __init__(self, name: str, description: str = "",
+                 buckets: Iterable[float] = DEFAULT_BUCKETS, window: int = 1024):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self._recent.append(value)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.bucket_counts[i] += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self._recent)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": dict(zip((str(b) for b in self.buckets), self.bucket_counts)),
+        }
+
+    def exposition(self, name: Optional[str] = None, labels: Optional[Dict[str, str]] = None) -> List[str]:
+        """Prometheus sample lines: cumulative _bucket{le=...}, _sum and _count."""
+        name = name or self.name
+        labels = labels or {}
+        with self._lock:
+            counts, count, total = list(self.bucket_counts), self.count, self.sum
+        lines = [f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {n}"
+                 for bound, n in zip(self.buckets, counts)]
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+        lines.append(f"{name}_count{_labels(labels)} {count}")
+        return lines
+
+
+# ============================================================================
+# PROMETHEUS EXPOSITION
+# ============================================================================
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+class _Labelled:
+    """Base for metrics keyed by a fixed tuple of label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str = "", labelnames: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Labelled):
+    """Monotonic counter, optionally labelled."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str = "", labelnames: Iterable[str] = ()):
+        super().__init__(name, description, labelnames)
+        # An unlabelled metric reports 0 before its first update
+        self.values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def exposition(self) -> List[str]:
+        with self._lock:
+            values = list(self.values.items())
+        return self.header() + [f"{self.name}{_labels(dict(zip(self.labelnames, key)))} {_number(value)}"
+                                for key, value in values]
+
+
+class Gauge(Counter):
+    """Value that goes up and down (e.g. requests in flight)."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+
+class HistogramFamily(_Labelled):
+    """One Histogram per label combination, sharing buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str = "", labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS, window: int = 1024):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(buckets)
+        self.window = window
+        self.children: Dict[Tuple[str, ...], Histogram] = {}
+
+    def labels(self, **labels) -> Histogram:
+        key = self._key(labels)
+        child = self.children.get(key)
+        if child is None:
+            with self._lock:
+                child = self.children.setdefault(
+                    key, Histogram(self.name, self.description, self.buckets, self.window))
+        return child
+
+    def observe(self, value: float, **labels):
+        self.labels(**labels).observe(value)
+
+    def exposition(self) -> List[str]:
+        lines = self.header()
+        for key, child in list(self.children.items()):
+            lines.extend(child.exposition(self.name, dict(zip(self.labelnames, key))))
+        return lines
+
+
+class Registry:
+    """Metrics rendered by GET /metrics, plus collectors for stats kept elsewhere."""
+
+    def __init__(self):
+        self.metrics: List[_Labelled] = []
+        self.collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]):
+        """`collector` returns ready-made exposition lines, evaluated on each scrape."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.exposition())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def gauge_lines(name: str, description: str, value: float, kind: str = "gauge",
+                labels: Optional[Dict[str, str]] = None) -> List[str]:
+    """Exposition lines for a single value read from an existing stats() dict."""
+    return [f"# HELP {name} {description}", f"# TYPE {name} {kind}",
+            f"{name}{_labels(labels or {})} {_number(value)}"]
+
+
+def histogram_lines(histogram: Histogram, name: Optional[str] = None) -> List[str]:
+    """Exposition lines for an existing standalone Histogram."""
+    name = name or histogram.name
+    return [f"# HELP {name} {histogram.description}", f"# TYPE {name} histogram",
+            *histogram.exposition(name)]
+
+
+REGISTRY = Registry()
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,298 @@
+"""
+Pydantic request/response models for the API.
+
+Kept apart from main.py so scripts (e.g. importer.py) can validate data with
+the same models without importing the FastAPI app.
+"""
+
+from datetime import date
+from typing import Annotated, Dict, List, Optional
+
+from pydantic import AfterValidator, BaseModel, Field
+
+from dialer_settings import CLAIM_LEASE_SECS, CampaignSettings
+from phones import normalize_phone, phone_key
+
+
+# Caller IDs from ElevenLabs and phones typed by operators, in E.164: lookups
+# fall back to the raw text when it cannot be parsed (a 404, not a 422)...
+LookupPhone = Annotated[str, AfterValidator(phone_key)]
+# ...while stored phones must be valid numbers
+CustomerPhone = Annotated[str, AfterValidator(normalize_phone)]
+
+
+# ============================================================================
+# REQUEST/RESPONSE MODELS
+# ============================================================================
+
+class GetCustomerNameRequest(BaseModel):
+    phone: LookupPhone = Field(..., description="Customer phone number")
+    conversation_id: Optional[str] = Field(None, description="ElevenLabs conversation ID")
+
+
+class GetCustomerNameResponse(BaseModel):
+    customer_name: str = Field(..., description="Customer full name for identity confirmation")
+
+
+class GetCaseDetailsRequest(BaseModel):
+    phone: LookupPhone = Field(..., description="Customer phone number")
+    conversation_id: Optional[str] = Field(None, description="ElevenLabs conversation ID")
+
+
+class GetCaseDetailsResponse(BaseModel):
+    customer_name: str = Field(..., description="Customer full name")
+    debt_amount: float = Field(..., description="Total debt amount")
+    due_date: str = Field(..., description="Original due date")
+    risk_level: str = Field(..., description="Risk level: low, medium, high")
+    days_overdue: int = Field(..., description="Number of days past due date")
+
+
+class ProposePaymentPlanRequest(BaseModel):
+    phone: LookupPhone = Field(..., description="Customer phone number")
+    installments: Optional[int] = Field(None, description="Number of installments requested")
+    offer_amount: Optional[float] = Field(None, description="Settlement offer amount")
+    conversation_id: Optional[str] = Field(None, description="ElevenLabs conversation ID")
+
+
+class ProposePaymentPlanResponse(BaseModel):
+    plan_type: str = Field(..., description="Type of plan: installments or settlement")
+    installment_amount: Optional[float] = Field(None, description="Amount per installment")
+    payment_dates: Optional[List[str]] = Field(None, description="List of payment dates")
+    total_amount: float = Field(..., description="Total amount to be paid")
+    discount_applied: float = Field(..., description="Discount amount if applicable")
+    accepted: bool = Field(..., description="Whether the plan is acceptable")
+    message: str = Field(..., description="Explanation message")
+
+
+class GetConversationContextRequest(BaseModel):
+    phone: LookupPhone = Field(..., description="Customer phone number")
+    identity_confirmed: bool = Field(False, description="True once the callee confirmed they are the customer")
+    conversation_id: Optional[str] = Field(None, description="ElevenLabs conversation ID")
+
+
+class InstallmentOffer(BaseModel):
+    installments: int = Field(..., description="Number of monthly payments")
+    installment_amount: float = Field(..., description="Amount per installment")
+    payment_dates: List[str] = Field(..., description="List of payment dates")
+
+
+class SettlementOffer(BaseModel):
+    discount_pct: float = Field(..., description="Discount off the debt (0.10 = 10%)")
+    amount: float = Field(..., description="Lump sum that settles the debt at this discount")
+
+
+class PaymentOffers(BaseModel):
+    installment_plans: List[InstallmentOffer] = Field(..., description="Installment plans the agent may offer")
+    minimum_settlement_amount: float = Field(..., description="Lowest lump sum accepted to settle the debt")
+    settlement_offers: List[SettlementOffer] = Field(default_factory=list,
+                                                     description="Settlement amounts to offer, smallest discount first")
+
+
+class OfferMatrixResponse(BaseModel):
+    customer_id: Optional[str] = None
+    debt_amount: float
+    risk_level: Optional[str] = None
+    computed_for: str = Field(..., description="Day the matrix (and its payment dates) was computed")
+    min_installments: int
+    max_installments: int
+    settlement_floor: float = Field(..., description="Lowest share of the debt accepted as a settlement")
+    minimum_settlement_amount: float
+    installment_plans: List[InstallmentOffer]
+    settlement_offers: List[SettlementOffer]
+
+
+class GetConversationContextResponse(BaseModel):
+    customer_name: str = Field(..., description="Customer full name for identity confirmation")
+    identity_confirmed: bool = Field(..., description="Whether the debt details below are included")
+    debt_amount: Optional[float] = Field(None, description="Total debt amount")
+    due_date: Optional[str] = Field(None, description="Original due date")
+    risk_level: Optional[str] = Field(None, description="Risk level: low, medium, high")
+    days_overdue: Optional[int] = Field(None, description="Number of days past due date")
+    offers: Optional[PaymentOffers] = Field(None, description="Precomputed acceptable payment plans")
+    message: str = Field(..., description="Instruction for the agent")
+
+
+class UpdateStatusRequest(BaseModel):
+    phone: LookupPhone = Field(..., description="Customer phone number")
+    new_status: str = Field(..., description="New status: promised_to_pay, wrong_number, refused, etc.")
+    summary: Optional[str] = Field(None, description="Summary of the interaction")
+    conversation_id: Optional[str] = Field(None, description="ElevenLabs conversation ID")
+
+
+class UpdateStatusResponse(BaseModel):
+    success: bool = Field(..., description="Whether the update was successful")
+    message: str = Field(..., description="Status message")
+
+
+# ============================================================================
+# DASHBOARD/PANEL MODELS
+# ============================================================================
+
+class CustomerListItem(BaseModel):
+    """Customer item for dashboard list"""
+    id: str  # UUID in Supabase
+    name: str
+    phone: str
+    debt_amount: float
+    status: str
+    risk_level: str
+    due_date: str
+    days_overdue: int
+    last_call_date: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class CustomerPage(BaseModel):
+    """One page of the dashboard customer list"""
+    items: List[CustomerListItem]
+    next_cursor: Optional[str] = None
+
+
+class GroupStats(BaseModel):
+    count: int
+    debt: float
+
+
+class PortfolioStats(BaseModel):
+    """Aggregates for the dashboard header"""
+    total_customers: int
+    total_debt: float
+    total_recovered: float
+    success_rate: float = Field(..., description="promised_to_pay / customers no longer active")
+    by_status: Dict[str, GroupStats]
+    by_risk_level: Dict[str, GroupStats]
+    overdue_buckets: Dict[str, GroupStats]
+    generated_at: str
+
+
+class CustomerChanges(BaseModel):
+    """Delta since the last dashboard sync"""
+    upserts: List[CustomerListItem]
+    deletes: List[str]
+    cursor: str
+    has_more: bool = False
+
+
+class InitiateCallRequest(BaseModel):
+    """Request to initiate a call to a customer"""
+    phone: LookupPhone = Field(..., description="Customer phone number to call")
+    agent_id: Optional[str] = Field(None, description="Specific ElevenLabs Agent ID to use")
+
+
+class InitiateCallResponse(BaseModel):
+    """Response from call initiation"""
+    success: bool
+    conversation_id: Optional[str] = None
+    message: str
+    customer_name: Optional[str] = None
+
+
+class ClaimCustomersRequest(BaseModel):
+    """Lease the next customers to call to a dialer worker"""
+    worker_id: str = Field(..., description="Identifies the dialer holding the lease")
+    limit: int = Field(1, ge=1, le=100, description="How many customers to claim")
+    lease_secs: int = Field(CLAIM_LEASE_SECS, ge=10, le=86400, description="Lease length")
+    status: List[str] = Field(default_factory=lambda: ["active"], description="Customer statuses to call")
+    risk_level: Optional[List[str]] = Field(None, description="Risk levels to call (default: all)")
+    due_from: Optional[date] = Field(None, description="Earliest due date")
+    due_to: Optional[date] = Field(None, description="Latest due date")
+
+
+class ReleaseClaimsRequest(BaseModel):
+    """Give back leased customers that will not be called"""
+    worker_id: str
+    ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+
+class StartCampaignRequest(BaseModel):
+    """Filter and dialing limits for an outbound campaign"""
+    status: List[str] = Field(default_factory=lambda: ["active"], description="Customer statuses to call")
+    risk_level: Optional[List[str]] = Field(None, description="Risk levels to call (default: all)")
+    due_from: Optional[date] = Field(None, description="Earliest due date")
+    due_to: Optional[date] = Field(None, description="Latest due date")
+    limit: Optional[int] = Field(None, ge=1, description="Call at most this many customers")
+    max_concurrent: int = Field(CampaignSettings.max_concurrent, ge=1, le=100)
+    calls_per_second: float = Field(CampaignSettings.calls_per_second, ge=0, description="0 = unlimited")
+    max_retries: int = Field(CampaignSettings.max_retries, ge=0, le=10)
+    agent_id: Optional[str] = Field(None, description="Specific ElevenLabs Agent ID to use")
+
+
+class PrewarmConversationRequest(BaseModel):
+    """Stash a customer for a call dispatched outside the API (e.g. make_call.py)"""
+    phone: LookupPhone = Field(..., description="Customer phone number that was called")
+    conversation_id: Optional[str] = Field(None, description="ElevenLabs conversation ID")
+
+
+# ============================================================================
+# CUSTOMER CRUD MODELS
+# ============================================================================
+
+class CreateCustomerRequest(BaseModel):
+    name: str = Field(..., description="Customer full name")
+    phone: CustomerPhone = Field(..., description="Customer phone number (normalised to E.164)")
+    debt_amount: float = Field(..., description="Debt amount")
+    due_date: Optional[str] = Field(None, description="Due date YYYY-MM-DD")
+    status: str = Field("active", description="Initial status")
+    risk_level: str = Field("medium", description="Risk level (low, medium, high)")
+
+class UpdateCustomerRequest(BaseModel):
+    name: Optional[str] = None
+    phone: Optional[CustomerPhone] = None
+    debt_amount: Optional[float] = None
+    due_date: Optional[str] = None
+    status: Optional[str] = None
+    risk_level: Optional[str] = None
+
+
+class BulkUpdateFilter(BaseModel):
+    """Rows a bulk update applies to (all given conditions must match)"""
+    status: Optional[List[str]] = Field(None, description="Current statuses, e.g. ['callback_requested']")
+    risk_level: Optional[List[str]] = Field(None, description="Risk levels")
+    due_from: Optional[date] = Field(None, description="Due on or after this date")
+    due_to: Optional[date] = Field(None, description="Due on or before this date")
+
+
+class BulkUpdateRequest(BaseModel):
+    """Same changes for many customers: give exactly one of ids, filter or all"""
+    ids: Optional[List[str]] = Field(None, max_length=10000, description="Customer IDs to update")
+    filter: Optional[BulkUpdateFilter] = Field(None, description="Update every customer matching this")
+    all: bool = Field(False, description="Update every customer")
+    changes: UpdateCustomerRequest
+
+
+class BulkUpdateResult(BaseModel):
+    id: str
+    success: bool
+    error: Optional[str] = None
+
+
+class BulkUpdateResponse(BaseModel):
+    success: bool = Field(..., description="True if every targeted row was updated")
+    updated: int
+    failed: int
+    results: List[BulkUpdateResult]
+
+
+# ============================================================================
+# IMPORT MODELS
+# ============================================================================
+
+class ImportRowError(BaseModel):
+    row: Optional[int] = Field(None, description="1-based line in the file (None for a failed batch)")
+    error: str
+
+
+class ImportReport(BaseModel):
+    """Outcome of a bulk customer import"""
+    dry_run: bool = False
+    rows_read: int = 0
+    valid: int = 0
+    imported: int = 0
+    rejected: int = 0
+    duplicates: int = Field(0, description="Rows superseded by a later row with the same phone")
+    batches: int = 0
+    failed_batches: int = 0
+    elapsed_secs: float = 0.0
+    rows_per_sec: Optional[float] = None
+    missing_columns: List[str] = Field(default_factory=list)
+    errors: List[ImportRowError] = Field(default_factory=list)
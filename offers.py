@@ -0,0 +1,177 @@
+"""
+Precomputed payment-plan offers.
+
+propose-payment-plan used to recompute installment amounts, payment dates and
+the 80% settlement floor on every negotiation turn. Everything it can answer
+for a customer is now built once per customer per day into an OfferMatrix:
+
+  - installment plans of OFFER_MIN_INSTALLMENTS..OFFER_MAX_INSTALLMENTS
+    payments (rounded amounts, monthly dates)
+  - the settlement floor (OFFER_SETTLEMENT_FLOOR, overridable per risk level)
+  - tiered settlement offers: the risk level's discount ladder
+    (OFFER_SETTLEMENT_DISCOUNTS_BY_RISK, else OFFER_SETTLEMENT_DISCOUNTS),
+    keeping the steps that stay above the floor
+
+Matrices are cached by customer, debt amount, risk level and day, so an
+edited row or a new day simply misses the cache. Each turn is then a
+dictionary lookup.
+"""
+
+import math
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cache import TTLCache
+
+
+def _parse_ratios(raw: str) -> Dict[str, float]:
+    """'high=0.70,medium=0.75' -> {'high': 0.7, 'medium': 0.75}"""
+    ratios = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        key, _, value = item.partition("=")
+        ratios[key.strip()] = float(value)
+    return ratios
+
+
+def _parse_floats(raw: str, sep: str = ",") -> Tuple[float, ...]:
+    return tuple(float(part) for part in raw.split(sep) if part.strip())
+
+
+def _parse_tiers(raw: str) -> Dict[str, Tuple[float, ...]]:
+    """'high=0.10/0.20,low=0.05' -> {'high': (0.1, 0.2), 'low': (0.05,)}"""
+    tiers = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        key, _, value = item.partition("=")
+        tiers[key.strip()] = _parse_floats(value, "/")
+    return tiers
+
+
+OFFER_MIN_INSTALLMENTS = int(os.getenv("OFFER_MIN_INSTALLMENTS", "1"))
+OFFER_MAX_INSTALLMENTS = int(os.getenv("OFFER_MAX_INSTALLMENTS", "12"))
+OFFER_INSTALLMENT_INTERVAL_DAYS = int(os.getenv("OFFER_INSTALLMENT_INTERVAL_DAYS", "30"))
+# Lowest share of the debt accepted as a settlement, optionally by risk level
+OFFER_SETTLEMENT_FLOOR = float(os.getenv("OFFER_SETTLEMENT_FLOOR", "0.80"))
+OFFER_SETTLEMENT_FLOOR_BY_RISK = _parse_ratios(os.getenv("OFFER_SETTLEMENT_FLOOR_BY_RISK", ""))
+# Settlement discounts the agent can step through (only those above the floor are offered)
+OFFER_SETTLEMENT_DISCOUNTS = _parse_floats(os.getenv("OFFER_SETTLEMENT_DISCOUNTS", "0.05,0.10,0.15,0.20"))
+# Per risk level ladders: riskier debts open with a deeper discount, low-risk ones stay shallow
+OFFER_SETTLEMENT_DISCOUNTS_BY_RISK = _parse_tiers(os.getenv(
+    "OFFER_SETTLEMENT_DISCOUNTS_BY_RISK", "high=0.10/0.15/0.20,medium=0.05/0.10/0.15,low=0.05/0.10"
+))
+# Installment counts get-conversation-context puts in front of the agent
+OFFER_HEADLINE_INSTALLMENTS = tuple(int(n) for n in _parse_floats(os.getenv("OFFER_HEADLINE_INSTALLMENTS", "2,3,4")))
+OFFER_CACHE_MAX_ENTRIES = int(os.getenv("OFFER_CACHE_MAX_ENTRIES", "5000"))
+
+
+@dataclass
+class OfferPolicy:
+    """Rules for which payment plans and settlements are acceptable."""
+    min_installments: int = OFFER_MIN_INSTALLMENTS
+    max_installments: int = OFFER_MAX_INSTALLMENTS
+    installment_interval_days: int = OFFER_INSTALLMENT_INTERVAL_DAYS
+    settlement_floor: float = OFFER_SETTLEMENT_FLOOR
+    settlement_floor_by_risk: Dict[str, float] = field(default_factory=lambda: dict(OFFER_SETTLEMENT_FLOOR_BY_RISK))
+    settlement_discounts: Tuple[float, ...] = OFFER_SETTLEMENT_DISCOUNTS
+    settlement_discounts_by_risk: Dict[str, Tuple[float, ...]] = field(
+        default_factory=lambda: dict(OFFER_SETTLEMENT_DISCOUNTS_BY_RISK))
+
+    def floor_for(self, risk_level: Optional[str]) -> float:
+        return self.settlement_floor_by_risk.get(risk_level or "", self.settlement_floor)
+
+    def discounts_for(self, risk_level: Optional[str]) -> Tuple[float, ...]:
+        return self.settlement_discounts_by_risk.get(risk_level or "", self.settlement_discounts)
+
+    def build(self, customer: Dict[str, Any], today: Optional[date] = None) -> "OfferMatrix":
+        """The full offer matrix for one customer row."""
+        today = today or date.today()
+        debt = float(customer["debt_amount"])
+        floor = self.floor_for(customer.get("risk_level"))
+        discounts = self.discounts_for(customer.get("risk_level"))
+        dates = [(today + timedelta(days=self.installment_interval_days * (i + 1))).isoformat()
+                 for i in range(self.max_installments)]
+        plans = {
+            n: {"installments": n, "installment_amount": round(debt / n, 2), "payment_dates": dates[:n]}
+            for n in range(max(1, self.min_installments), self.max_installments + 1)
+        }
+        settlements = [
+            {"discount_pct": discount, "amount": round(debt * (1 - discount), 2)}
+            for discount in sorted(discounts)
+            if 1 - discount >= floor
+        ]
+        return OfferMatrix(
+            customer_id=customer.get("id"),
+            debt_amount=debt,
+            risk_level=customer.get("risk_level"),
+            computed_for=today.isoformat(),
+            min_installments=self.min_installments,
+            max_installments=self.max_installments,
+            settlement_floor=floor,
+            # Rounded up to the cent so the amount we quote is always accepted
+            minimum_settlement_amount=math.ceil(round(debt * floor * 100, 6)) / 100,
+            installment_plans=plans,
+            settlement_offers=settlements,
+        )
+
+
+@dataclass
+class OfferMatrix:
+    """Everything propose-payment-plan can answer for one customer on one day."""
+    customer_id: Optional[str]
+    debt_amount: float
+    risk_level: Optional[str]
+    computed_for: str
+    min_installments: int
+    max_installments: int
+    settlement_floor: float
+    minimum_settlement_amount: float
+    installment_plans: Dict[int, Dict[str, Any]]
+    settlement_offers: List[Dict[str, float]]
+
+    def installment_plan(self, installments: int) -> Optional[Dict[str, Any]]:
+        """The plan for this many installments, or None if the policy doesn't allow it."""
+        return self.installment_plans.get(installments)
+
+    def accepts_settlement(self, offer_amount: float) -> bool:
+        return offer_amount >= self.minimum_settlement_amount
+
+    def headline(self, installments: Iterable[int] = OFFER_HEADLINE_INSTALLMENTS) -> Dict[str, Any]:
+        """A few plans plus the settlement terms, for the agent's first look."""
+        return {
+            "installment_plans": [self.installment_plans[n] for n in installments if n in self.installment_plans],
+            "minimum_settlement_amount": self.minimum_settlement_amount,
+            "settlement_offers": self.settlement_offers,
+        }
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["installment_plans"] = list(self.installment_plans.values())
+        return data
+
+
+class OfferBook:
+    """OfferMatrix cache keyed by customer, debt, risk level and day."""
+
+    def __init__(self, policy: Optional[OfferPolicy] = None,
+                 max_entries: int = OFFER_CACHE_MAX_ENTRIES):
+        self.policy = policy or OfferPolicy()
+        # Keys carry the day, so a day's TTL is only a backstop
+        self.cache = TTLCache(ttl_seconds=86400, max_entries=max_entries, name="offers")
+
+    def get(self, customer: Dict[str, Any], today: Optional[date] = None) -> OfferMatrix:
+        today = today or date.today()
+        key = (customer.get("id") or customer["phone"], str(customer["debt_amount"]),
+               customer.get("risk_level"), today)
+        matrix = self.cache.get(key)
+        if matrix is None:
+            matrix = self.policy.build(customer, today)
+            self.cache.set(key, matrix)
+        return matrix
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.cache.stats(), "policy": asdict(self.policy)}
+
+
+# Shared by the API process
+offer_book = OfferBook()
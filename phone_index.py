@@ -0,0 +1,274 @@
+"""
+In-memory index of every customer's phone (E.164) -> customer id.
+
+A tool webhook for a number that is not a customer (a wrong number, a
+test call, the agent retrying after a 404) used to cost a database round
+trip each time. PhoneIndex holds the phone_e164 of every customer so those
+lookups can be answered from memory:
+
+  - load(): the whole table (id, phone_e164), a page at a time
+  - sync(): every PHONE_INDEX_SYNC_SECS, the rows changed or deleted since
+    the last sync, from the same change feed the dashboard polls
+    (CustomerRepository.changes_since)
+  - writes made through this process (create, update, import, delete) are
+    applied at once
+
+contains() answers True/False only while the index is loaded and synced
+within PHONE_INDEX_MAX_STALENESS_SECS; otherwise None, and the caller asks
+the database. Rows written through another worker or outside the API are
+seen after the next sync, so a customer created in the last few seconds can
+be missing from this worker's index until then. That is why a miss is only
+taken as "no such customer" with PHONE_INDEX_TRUST_MISSES (one worker, all
+writes through this API); by default rules_out() is False and misses go to
+the database. Creating a customer always checks the database.
+
+Memory is roughly 250 bytes per customer per process.
+
+    python phone_index.py --backfill [--dry-run]   # fill phone_e164 for older rows
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from phones import phone_key
+
+
+PHONE_INDEX_ENABLED = os.getenv("PHONE_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+PHONE_INDEX_SYNC_SECS = float(os.getenv("PHONE_INDEX_SYNC_SECS", "5"))
+# Past this without a successful sync, answers come from the database again
+PHONE_INDEX_MAX_STALENESS_SECS = float(os.getenv("PHONE_INDEX_MAX_STALENESS_SECS", "30"))
+# Answer "no such customer" from the index alone (only safe with one writer)
+PHONE_INDEX_TRUST_MISSES = os.getenv("PHONE_INDEX_TRUST_MISSES", "false").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger(__name__)
+
+
+def customer_phone_key(customer: Dict[str, Any]) -> str:
+    """The phone a customer row is looked up (and cached) by."""
+    return customer.get("phone_e164") or phone_key(customer.get("phone"))
+
+
+class PhoneIndex:
+    """phone_e164 -> customer id for the whole customers table, kept in step by polling."""
+
+    def __init__(self, sync_interval: float = PHONE_INDEX_SYNC_SECS,
+                 max_staleness: float = PHONE_INDEX_MAX_STALENESS_SECS,
+                 trust_misses: bool = PHONE_INDEX_TRUST_MISSES):
+        self.sync_interval = sync_interval
+        self.max_staleness = max_staleness
+        self.trust_misses = trust_misses
+        self.ids: Dict[str, Optional[str]] = {}
+        # customer id -> phone key, to drop the old key on phone changes and deletes
+        self.phones: Dict[str, str] = {}
+        self.cursor: Optional[str] = None
+        self.loaded = False
+        self.synced_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.found = 0
+        self.missing = 0
+        self.unknown = 0
+        self.syncs = 0
+        self.sync_errors = 0
+        self.last_error: Optional[str] = None
+        self.load_secs: Optional[float] = None
+
+    # ------------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------------
+
+    def fresh(self) -> bool:
+        return (self.loaded and self.synced_at is not None
+                and time.monotonic() - self.synced_at <= self.max_staleness)
+
+    def contains(self, key: str) -> Optional[bool]:
+        """Whether a customer has this (normalised) phone; None if the index cannot say."""
+        if not self.fresh():
+            self.unknown += 1
+            return None
+        if key in self.ids:
+            self.found += 1
+            return True
+        self.missing += 1
+        return False
+
+    def rules_out(self, key: str) -> bool:
+        """Whether a lookup of this phone may be answered "no such customer" without the database."""
+        return self.trust_misses and self.contains(key) is False
+
+    def customer_id(self, key: str) -> Optional[str]:
+        return self.ids.get(key)
+
+    # ------------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------------
+
+    def add(self, customer: Dict[str, Any]):
+        """Record a customer row (new, or with a possibly changed phone)."""
+        # Lookups match phone_e164, so that (not a re-normalised phone) is the key
+        key = customer.get("phone_e164")
+        customer_id = customer.get("id")
+        if customer_id is not None:
+            old = self.phones.get(customer_id)
+            if old is not None and old != key:
+                self.ids.pop(old, None)
+            if key:
+                self.phones[customer_id] = key
+            else:
+                self.phones.pop(customer_id, None)
+        if key:
+            self.ids[key] = customer_id
+
+    def discard(self, customer_id: str):
+        key = self.phones.pop(customer_id, None)
+        if key is not None:
+            self.ids.pop(key, None)
+
+    def apply(self, upserts: Iterable[Dict[str, Any]], deletes: Iterable[str] = ()):
+        for row in upserts:
+            self.add(row)
+        for customer_id in deletes:
+            self.discard(customer_id)
+
+    # ------------------------------------------------------------------------
+    # Loading and syncing
+    # ------------------------------------------------------------------------
+
+    async def load(self, repo):
+        """Read every customer's phone; changes from here on come from sync()."""
+        started = time.perf_counter()
+        # Cursor first, so rows written during the scan are replayed, not lost
+        cursor = (await repo.changes_since(None))["cursor"]
+        rows = await repo.scan(["id", "phone_e164"])
+        self.ids, self.phones = {}, {}
+        self.apply(rows)
+        self.cursor = cursor
+        self.loaded = True
+        self.synced_at = time.monotonic()
+        self.load_secs = round(time.perf_counter() - started, 3)
+        logger.info("📇 Phone index loaded: %s customers in %ss", len(self.ids), self.load_secs)
+
+    async def sync(self, repo) -> int:
+        """Apply changes since the last sync; returns how many rows changed."""
+        changed = 0
+        while True:
+            delta = await repo.changes_since(self.cursor)
+            self.apply(delta["upserts"], delta["deletes"])
+            self.cursor = delta["cursor"]
+            changed += len(delta["upserts"]) + len(delta["deletes"])
+            if not delta["has_more"]:
+                break
+        self.syncs += 1
+        self.synced_at = time.monotonic()
+        return changed
+
+    async def _run(self, repo):
+        while True:
+            try:
+                if self.loaded:
+                    await self.sync(repo)
+                else:
+                    await self.load(repo)
+            except Exception as e:
+                self.sync_errors += 1
+                self.last_error = str(e)
+                logger.warning("⚠️  Phone index sync failed: %s", e)
+            await asyncio.sleep(self.sync_interval)
+
+    def start(self, repo):
+        """Load the index and keep it synced in the background (idempotent)."""
+        if PHONE_INDEX_ENABLED and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(repo))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": PHONE_INDEX_ENABLED,
+            "loaded": self.loaded,
+            "fresh": self.fresh(),
+            "size": len(self.ids),
+            "found": self.found,
+            "trust_misses": self.trust_misses,
+            # Lookups answered "no such customer" without a database round trip
+            "missing": self.missing,
+            "unknown": self.unknown,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+            "last_error": self.last_error,
+            "last_sync_age_secs": round(time.monotonic() - self.synced_at, 3) if self.synced_at else None,
+            "load_secs": self.load_secs,
+            "sync_interval_secs": self.sync_interval,
+        }
+
+
+# Shared by the API process
+phone_index = PhoneIndex()
+
+
+# ============================================================================
+# CLI: backfill phone_e164
+# ============================================================================
+
+async def backfill(dry_run: bool = False, concurrency: int = 20) -> Dict[str, Any]:
+    """Set phone_e164 on rows that lack it; returns counts and unparseable phones."""
+    from phones import normalize_phone
+    from repository import CustomerRepository
+
+    repo = CustomerRepository()
+    rows = [r for r in await repo.scan(["id", "phone", "phone_e164"]) if not r.get("phone_e164")]
+    updates: List[Dict[str, Any]] = []
+    invalid: List[str] = []
+    for row in rows:
+        try:
+            updates.append({"id": row["id"], "phone_e164": normalize_phone(row["phone"])})
+        except ValueError:
+            invalid.append(row["phone"])
+
+    failed: List[str] = []
+    if not dry_run:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def update(item):
+            async with semaphore:
+                try:
+                    await repo.update_by_id(item["id"], {"phone_e164": item["phone_e164"]})
+                except Exception as e:
+                    # Usually the unique index: the same number stored twice
+                    failed.append(f"{item['phone_e164']}: {e}")
+
+        await asyncio.gather(*(update(item) for item in updates))
+    return {"missing": len(rows), "normalised": len(updates) - len(failed), "invalid": invalid, "failed": failed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phone index maintenance")
+    parser.add_argument("--backfill", action="store_true", help="Fill phone_e164 for rows that lack it")
+    parser.add_argument("--dry-run", action="store_true", help="Report without writing")
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.error("nothing to do (use --backfill)")
+
+    report = asyncio.run(backfill(dry_run=args.dry_run))
+    print("=" * 60)
+    print(f"📇 phone_e164 backfill {'(dry run) ' if args.dry_run else ''}complete")
+    print("=" * 60)
+    print(f"Rows without phone_e164: {report['missing']}  Normalised: {report['normalised']}")
+    for phone in report["invalid"]:
+        print(f"❌ Not a valid phone number: {phone!r}")
+    for error in report["failed"]:
+        print(f"❌ {error}")
+
+
+if __name__ == "__main__":
+    main()
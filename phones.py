@@ -0,0 +1,73 @@
+"""
+Phone number normalisation to E.164 (+<country code><number>).
+
+Portfolio exports and operators type numbers every which way:
+"(555) 123-4567", "555.123.4567", "1-555-123-4567", "0057 312 419 9685".
+Customers are keyed by phone, so every number is stored in one canonical form.
+National numbers without a country code get PHONE_DEFAULT_COUNTRY_CODE.
+"""
+
+import os
+import re
+from typing import Any
+
+
+PHONE_DEFAULT_COUNTRY_CODE = os.getenv("PHONE_DEFAULT_COUNTRY_CODE", "1")
+
+# E.164 allows at most 15 digits; the shortest real national numbers have 7
+_MIN_DIGITS = 8
+_MAX_DIGITS = 15
+
+_NON_DIGITS = re.compile(r"\D")
+# Trailing extensions such as "x123", "ext. 12" or "#9"
+_EXTENSION = re.compile(r"(?:\s*(?:ext\.?|x|#)\s*\d+)$", re.IGNORECASE)
+
+
+def normalize_phone(raw: Any, default_country_code: str = PHONE_DEFAULT_COUNTRY_CODE) -> str:
+    """
+    Return `raw` as an E.164 string, or raise ValueError if it can't be one.
+
+    Spreadsheet cells holding numbers (e.g. 5551234567.0) are accepted too.
+    """
+    if raw is None:
+        raise ValueError("Phone number is missing")
+    if isinstance(raw, float) and raw.is_integer():
+        raw = int(raw)
+    text = _EXTENSION.sub("", str(raw).strip())
+    if not text:
+        raise ValueError("Phone number is missing")
+
+    digits = _NON_DIGITS.sub("", text)
+    if text.startswith("+"):
+        pass
+    elif text.startswith("00"):
+        # International dialing prefix
+        digits = digits[2:]
+    elif default_country_code == "1" and len(digits) == 11 and digits.startswith("1"):
+        # NANP number written with its trunk prefix
+        pass
+    else:
+        digits = default_country_code + digits.lstrip("0")
+
+    if not _MIN_DIGITS <= len(digits) <= _MAX_DIGITS or digits.startswith("0"):
+        raise ValueError(f"Not a valid phone number: {raw!r}")
+    return "+" + digits
+
+
+def is_e164(phone: str) -> bool:
+    """True if `phone` is already in canonical form."""
+    return bool(re.fullmatch(r"\+[1-9]\d{7,14}", phone or ""))
+
+
+def phone_key(raw: Any, default_country_code: str = PHONE_DEFAULT_COUNTRY_CODE) -> str:
+    """
+    The form customers are looked up by (the phone_e164 column): E.164 when
+    `raw` can be normalised, else `raw` with surrounding whitespace removed.
+
+    Never raises: a caller ID we cannot parse still gets an honest "not found"
+    rather than a validation error mid-call.
+    """
+    try:
+        return normalize_phone(raw, default_country_code)
+    except ValueError:
+        return str(raw or "").strip()
@@ -0,0 +1,214 @@
+"""
+Vectorised portfolio analytics.
+
+Customer rows are loaded into columnar NumPy arrays once (Portfolio.from_rows);
+days overdue, overdue buckets, recovery-based risk scores, expected recovery,
+dialing order and the dashboard aggregates are then computed for every row in
+a single pass of array operations, instead of a strptime/datetime.now() and
+dict lookups per row.
+
+Used by the dashboard list and delta sync (days overdue), the call queue
+(dialing order), and GET /api/portfolio/ranking (expected-recovery ranking
+over a snapshot of the whole table). bench_portfolio.py compares it with the
+per-row code at 100k and 1M rows.
+"""
+
+import os
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+# Lower rank is called first (mirrors the risk_rank column in schema.sql)
+RISK_PRIORITY = {"high": 0, "medium": 1, "low": 2}
+
+# Days-overdue buckets -> (min_days, max_days), inclusive; None = unbounded
+OVERDUE_BUCKETS = {
+    "current": (None, 0),
+    "1-30": (1, 30),
+    "31-60": (31, 60),
+    "61-90": (61, 90),
+    "90+": (91, None),
+}
+BUCKET_LABELS = tuple(OVERDUE_BUCKETS)
+# Upper bounds of every bounded bucket, for np.searchsorted
+_BUCKET_EDGES = np.array([high for _, high in OVERDUE_BUCKETS.values() if high is not None])
+
+# Share of the debt expected back from a customer who is current, by risk
+# level; it halves every PORTFOLIO_RECOVERY_HALF_LIFE_DAYS overdue
+RECOVERY_BASE_RATE = {"low": 0.85, "medium": 0.65, "high": 0.45}
+PORTFOLIO_RECOVERY_HALF_LIFE_DAYS = float(os.getenv("PORTFOLIO_RECOVERY_HALF_LIFE_DAYS", "120"))
+
+# Columns a portfolio snapshot needs
+PORTFOLIO_COLUMNS = ("id", "name", "phone", "debt_amount", "due_date", "risk_level", "status", "last_call_at")
+
+_UNKNOWN = "unknown"
+_NO_DATE = np.iinfo(np.int64).max
+
+
+def _categorical(values: List[Optional[str]]):
+    """(codes, categories) for a string column; None becomes 'unknown'."""
+    index: Dict[str, int] = {}
+    codes = np.fromiter((index.setdefault(v or _UNKNOWN, len(index)) for v in values),
+                        dtype=np.int32, count=len(values))
+    return codes, list(index)
+
+
+@dataclass
+class PortfolioAnalysis:
+    """Per-row results of Portfolio.analyze(), aligned with the portfolio's rows."""
+    days_overdue: np.ndarray       # int64, 0 when current or no due date
+    overdue_bucket: np.ndarray     # int64 index into BUCKET_LABELS
+    risk_score: np.ndarray         # float64 in [0, 1]: expected share of the debt NOT recovered
+    expected_recovery: np.ndarray  # float64, currency
+    call_order: np.ndarray         # row indices in dialing order
+
+
+class Portfolio:
+    """Customer rows as columns."""
+
+    def __init__(self, rows: Sequence[Dict[str, Any]]):
+        self.rows = rows
+        n = len(rows)
+        self.debt = np.fromiter((float(r.get("debt_amount") or 0) for r in rows), dtype=np.float64, count=n)
+        # ISO dates parse in C; missing dates become NaT
+        self.due = np.array([(r.get("due_date") or "NaT")[:10] for r in rows], dtype="datetime64[D]")
+        self.status_codes, self.statuses = _categorical([r.get("status") for r in rows])
+        self.risk_codes, self.risk_levels = _categorical([r.get("risk_level") for r in rows])
+        self.last_call = np.array([r.get("last_call_at") or "" for r in rows], dtype=str)
+
+        # Per-category lookups, applied to the codes with one fancy-index each
+        self.risk_rank = np.array([RISK_PRIORITY.get(level, len(RISK_PRIORITY)) for level in self.risk_levels],
+                                  dtype=np.int64)[self.risk_codes]
+        self.base_rate = np.array([RECOVERY_BASE_RATE.get(level, min(RECOVERY_BASE_RATE.values()))
+                                   for level in self.risk_levels], dtype=np.float64)[self.risk_codes]
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict[str, Any]]) -> "Portfolio":
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    # ------------------------------------------------------------------------
+    # Columns
+    # ------------------------------------------------------------------------
+
+    def days_overdue(self, today: Optional[date] = None) -> np.ndarray:
+        today64 = np.datetime64(today or date.today(), "D")
+        days = (today64 - self.due).astype(np.int64)
+        days[np.isnat(self.due)] = 0
+        return np.maximum(days, 0)
+
+    @staticmethod
+    def overdue_buckets(days_overdue: np.ndarray) -> np.ndarray:
+        return np.searchsorted(_BUCKET_EDGES, days_overdue, side="left")
+
+    def recovery_probability(self, days_overdue: np.ndarray) -> np.ndarray:
+        return self.base_rate * np.exp2(-days_overdue / PORTFOLIO_RECOVERY_HALF_LIFE_DAYS)
+
+    def call_order(self) -> np.ndarray:
+        """
+        Dialing order: risk (high first), oldest due date, largest debt, least
+        recently called (same ORDER BY as claim_next_customers()).
+        """
+        due = self.due.astype(np.int64)
+        due[np.isnat(self.due)] = _NO_DATE
+        # np.lexsort sorts by the last key first
+        return np.lexsort((self.last_call, -self.debt, due, self.risk_rank))
+
+    def analyze(self, today: Optional[date] = None) -> PortfolioAnalysis:
+        """Every derived column in one vectorised pass."""
+        days = self.days_overdue(today)
+        probability = self.recovery_probability(days)
+        return PortfolioAnalysis(
+            days_overdue=days,
+            overdue_bucket=self.overdue_buckets(days),
+            risk_score=1.0 - probability,
+            expected_recovery=self.debt * probability,
+            call_order=self.call_order(),
+        )
+
+    # ------------------------------------------------------------------------
+    # Aggregates
+    # ------------------------------------------------------------------------
+
+    def stats(self, analysis: Optional[PortfolioAnalysis] = None) -> Dict[str, Any]:
+        """Same shape as the customer_stats() SQL function (plus expected recovery)."""
+        analysis = analysis or self.analyze()
+
+        def grouped(codes: np.ndarray, labels: Sequence[str]) -> Dict[str, Dict[str, float]]:
+            counts = np.bincount(codes, minlength=len(labels))
+            debt = np.bincount(codes, weights=self.debt, minlength=len(labels))
+            return {label: {"count": int(counts[i]), "debt": round(float(debt[i]), 2)}
+                    for i, label in enumerate(labels) if counts[i]}
+
+        recovered = self.status_codes == self.statuses.index("promised_to_pay") \
+            if "promised_to_pay" in self.statuses else np.zeros(len(self), dtype=bool)
+        return {
+            "total_customers": len(self),
+            "total_debt": round(float(self.debt.sum()), 2),
+            "total_recovered": round(float(self.debt[recovered].sum()), 2),
+            "expected_recovery": round(float(analysis.expected_recovery.sum()), 2),
+            "by_status": grouped(self.status_codes, self.statuses),
+            "by_risk_level": grouped(self.risk_codes, self.risk_levels),
+            "overdue_buckets": grouped(analysis.overdue_bucket, BUCKET_LABELS),
+        }
+
+    def ranking(self, analysis: Optional[PortfolioAnalysis] = None, limit: int = 50,
+                statuses: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Rows with the highest expected recovery first, with their derived columns."""
+        analysis = analysis or self.analyze()
+        candidates = np.arange(len(self))
+        if statuses:
+            wanted = [self.statuses.index(s) for s in statuses if s in self.statuses]
+            candidates = candidates[np.isin(self.status_codes, wanted)]
+        if limit < len(candidates):
+            # Partial selection, then sort only the winners
+            top = np.argpartition(-analysis.expected_recovery[candidates], limit)[:limit]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-analysis.expected_recovery[candidates], kind="stable")]
+        return [
+            {
+                **self.rows[i],
+                "days_overdue": int(analysis.days_overdue[i]),
+                "overdue_bucket": BUCKET_LABELS[analysis.overdue_bucket[i]],
+                "risk_score": round(float(analysis.risk_score[i]), 4),
+                "expected_recovery": round(float(analysis.expected_recovery[i]), 2),
+            }
+            for i in candidates
+        ]
+
+
+# ============================================================================
+# ROW HELPERS
+# ============================================================================
+
+def days_overdue_for(rows: Sequence[Dict[str, Any]], today: Optional[date] = None) -> List[int]:
+    """Days overdue for a list of rows (e.g. one dashboard page)."""
+    if not rows:
+        return []
+    today64 = np.datetime64(today or date.today(), "D")
+    due = np.array([(r.get("due_date") or "NaT")[:10] for r in rows], dtype="datetime64[D]")
+    days = (today64 - due).astype(np.int64)
+    days[np.isnat(due)] = 0
+    return np.maximum(days, 0).tolist()
+
+
+def call_priority(customer: Dict[str, Any]):
+    """Sort key for one row in dialing order (for heaps; lists use sort_by_call_priority)."""
+    return (
+        RISK_PRIORITY.get(customer.get("risk_level"), len(RISK_PRIORITY)),
+        customer.get("due_date") or "9999-12-31",
+        -float(customer.get("debt_amount") or 0),
+        customer.get("last_call_at") or "",
+    )
+
+
+def sort_by_call_priority(rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows in dialing order (see Portfolio.call_order)."""
+    if len(rows) < 2:
+        return list(rows)
+    return [rows[i] for i in Portfolio(rows).call_order()]
@@ -0,0 +1,613 @@
+"""
+Async data access layer for the customers table.
+
+supabase-py's client is synchronous, so calling it from an `async def` handler
+blocks the uvicorn event loop for the whole PostgREST round trip. Every query
+here runs on a bounded thread pool instead, sharing the pooled keep-alive
+HTTP connections configured in database.py, so concurrent tool webhooks are
+served in parallel rather than one after another.
+
+Customers are looked up by their E.164 phone (the phone_e164 column, see
+phones.py), however the caller ID was formatted. Rows are kept in a TTL/LRU
+cache under that key so a whole conversation (name -> details -> plan ->
+status) costs one round trip. Every write through this module invalidates
+the affected rows and updates the phone index (phone_index.py).
+"""
+
+import asyncio
+import base64
+import functools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from database import DB_POOL_SIZE, close_supabase_client, get_supabase_client
+from dialer_settings import CLAIM_LEASE_SECS, CLAIM_MIN_RECALL_SECS
+from instrumentation import span
+from phone_index import PhoneIndex, customer_phone_key, phone_index
+from phones import phone_key
+from portfolio import OVERDUE_BUCKETS, sort_by_call_priority
+from state_backend import make_cache
+
+
+# Bounded pool: never more in-flight queries than pooled connections.
+# Created on first query (and again after shutdown(), e.g. a second app in tests)
+_executor: Optional[ThreadPoolExecutor] = None
+
+# Phone-keyed customer rows; long enough to span a call, short enough that
+# edits made outside the API are picked up quickly. Shared by every worker
+# when STATE_BACKEND=redis, so an edit through one worker invalidates them all.
+CUSTOMER_CACHE_TTL_SECS = float(os.getenv("CUSTOMER_CACHE_TTL_SECS", "300"))
+CUSTOMER_CACHE_MAX_ENTRIES = int(os.getenv("CUSTOMER_CACHE_MAX_ENTRIES", "5000"))
+
+customer_cache = make_cache(
+    ttl_seconds=CUSTOMER_CACHE_TTL_SECS,
+    max_entries=CUSTOMER_CACHE_MAX_ENTRIES,
+    name="customers",
+    # Rows are invalidated by id too (an update may change the phone)
+    index_field="id",
+)
+
+
+# Columns the dashboard list actually renders (no `select *`)
+LIST_COLUMNS = "id,name,phone,debt_amount,status,risk_level,due_date,updated_at"
+# The change feed also carries the lookup key, for the phone index
+SYNC_COLUMNS = LIST_COLUMNS + ",phone_e164"
+
+# Postgres error code for a unique index violation (e.g. phone_e164)
+UNIQUE_VIOLATION = "23505"
+
+# Filled by a trigger on DELETE so clients can sync removals
+TOMBSTONE_TABLE = "customer_tombstones"
+
+# Keyset-paginable sort keys; `id` is always the tie-breaker
+SORTABLE_COLUMNS = ("updated_at", "due_date", "debt_amount", "name")
+
+# Ids per `id=in.(...)` statement in bulk updates (keeps URLs well under limits)
+BULK_UPDATE_BATCH_SIZE = int(os.getenv("BULK_UPDATE_BATCH_SIZE", "200"))
+
+
+def encode_cursor(sort: str, descending: bool, value: Any, row_id: str) -> str:
+    """Opaque keyset cursor pointing just after (value, id)."""
+    raw = json.dumps([sort, descending, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, bool, Any, str]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort, descending, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return sort, bool(descending), value, str(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def encode_sync_cursor(position: Dict[str, Any]) -> str:
+    """Opaque delta-sync cursor: last seen (timestamp, id) per table."""
+    raw = json.dumps(position, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_sync_cursor(cursor: str) -> Dict[str, Any]:
+    """Inverse of encode_sync_cursor; raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded))
+        return {"u": position.get("u"), "d": position.get("d")}
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _quote(value: Any) -> str:
+    """Quote a value for use inside a PostgREST logic expression."""
+    return '"' + str(value).replace('"', '\\"') + '"'
+
+
+def overdue_bucket_expression(bucket: str, today: Optional[date] = None) -> str:
+    """PostgREST expression selecting rows whose days overdue fall in a bucket."""
+    if bucket not in OVERDUE_BUCKETS:
+        raise ValueError(f"Unknown overdue bucket: {bucket}")
+    today = today or date.today()
+    min_days, max_days = OVERDUE_BUCKETS[bucket]
+    clauses = []
+    if min_days is not None:
+        clauses.append(f"due_date.lte.{(today - timedelta(days=min_days)).isoformat()}")
+    if max_days is not None:
+        clauses.append(f"due_date.gte.{(today - timedelta(days=max_days)).isoformat()}")
+    expression = clauses[0] if len(clauses) == 1 else f"and({','.join(clauses)})"
+    if bucket == "current":
+        # No due date means nothing is overdue yet
+        expression = f"or({expression},due_date.is.null)"
+    return expression
+
+
+def keyset_expression(sort: str, descending: bool, value: Any, row_id: str,
+                      include_nulls: bool = True) -> str:
+    """
+    PostgREST expression for rows strictly after (value, id) in
+    `ORDER BY sort [DESC] NULLS LAST, id [DESC]`.
+    """
+    op = "lt" if descending else "gt"
+    after_id = f"id.{op}.{_quote(row_id)}"
+    if value is None:
+        return f"and({sort}.is.null,{after_id})"
+    nulls = f",{sort}.is.null" if include_nulls else ""
+    return (
+        f"or({sort}.{op}.{_quote(value)},"
+        f"and({sort}.eq.{_quote(value)},{after_id}){nulls})"
+    )
+
+
+async def run_query(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking Supabase call on the repository thread pool (timed as a "supabase" span)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="supabase")
+    loop = asyncio.get_running_loop()
+    with span("supabase"):
+        return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+def shutdown():
+    """Release the worker threads and database connections (called on application shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+    close_supabase_client()
+
+
+def filter_customers(q, statuses: Optional[Sequence[str]] = None, risk_levels: Optional[Sequence[str]] = None,
+                     due_from: Optional[date] = None, due_to: Optional[date] = None):
+    """Apply the list/campaign filters to a customers query."""
+    if statuses:
+        q = q.in_("status", list(statuses))
+    if risk_levels:
+        q = q.in_("risk_level", list(risk_levels))
+    if due_from:
+        q = q.gte("due_date", due_from.isoformat())
+    if due_to:
+        q = q.lte("due_date", due_to.isoformat())
+    return q
+
+
+def with_phone_key(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Row data with phone_e164 set from phone, when the phone is being written."""
+    if data.get("phone"):
+        return {**data, "phone_e164": phone_key(data["phone"])}
+    return data
+
+
+class CustomerRepository:
+    """Async access to the `customers` table."""
+
+    table_name = "customers"
+
+    def __init__(self, cache=customer_cache, index: PhoneIndex = phone_index):
+        self.cache = cache
+        self.index = index
+        # The API's WriteBehindQueue: direct updates must land after what it holds
+        self.pending_writes = None
+
+    def _table(self):
+        return get_supabase_client().table(self.table_name)
+
+    async def get_by_phone(self, phone: str, fresh: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Return the full customer row for a phone number, or None.
+
+        `phone` is normalised to E.164 first. Served from the cache when
+        possible; a phone missing from the phone index is still looked up in
+        the database unless the index may rule it out (PhoneIndex.rules_out).
+        `fresh=True` bypasses both and re-populates the entry from the
+        database.
+        """
+        key = phone_key(phone)
+        if not fresh:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached
+            if self.index.rules_out(key):
+                return None
+
+        result = await run_query(
+            lambda: self._table().select("*").eq("phone_e164", key).limit(1).execute()
+        )
+        if not result.data:
+            await self.cache.pop(key)
+            return None
+
+        customer = result.data[0]
+        await self.cache.set(key, customer)
+        # Written through another worker since the last sync
+        self.index.add(customer)
+        return customer
+
+    async def get_by_id(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        """Return the customer row with this id, or None (uncached)."""
+        result = await run_query(
+            lambda: self._table().select("*").eq("id", customer_id).limit(1).execute()
+        )
+        return result.data[0] if result.data else None
+
+    async def phone_exists(self, phone: str) -> bool:
+        """Check whether a customer with this phone (in any format) already exists."""
+        key = phone_key(phone)
+        # Always the database: another worker may have created it since the index last synced
+        result = await run_query(
+            lambda: self._table().select("id").eq("phone_e164", key).limit(1).execute()
+        )
+        return bool(result.data)
+
+    async def prime(self, customer: Dict[str, Any]):
+        """Store a row we already hold so the next lookup skips the database."""
+        await self.cache.set(customer_phone_key(customer), customer)
+
+    async def patch_cached(self, phone: str, updates: Dict[str, Any]):
+        """Apply not-yet-written changes to a cached row (see write_behind.py)."""
+        await self.cache.modify(phone_key(phone), lambda row: {**row, **updates})
+
+    async def invalidate(self, phone: Optional[str] = None, customer_ids: Sequence[str] = ()):
+        """Drop cached rows for a phone and/or customer ids."""
+        if phone:
+            await self.cache.pop(phone_key(phone))
+        if customer_ids:
+            await self.cache.discard_ids(customer_ids)
+
+    async def changes_since(self, cursor: Optional[str] = None,
+                            limit: int = 500) -> Dict[str, Any]:
+        """
+        Rows inserted/updated and ids deleted since a sync cursor.
+
+        Walks customers by (updated_at, id) and customer_tombstones by
+        (deleted_at, id), so bulk writes sharing one timestamp still page
+        correctly. Without a cursor, returns an empty delta plus a cursor at
+        the current head of both tables (the starting point for a client
+        that has just loaded its first page).
+        """
+        if cursor is None:
+            def heads():
+                latest = self._table().select("id,updated_at").order(
+                    "updated_at", desc=True, nullsfirst=False).order("id", desc=True).limit(1).execute()
+                deleted = get_supabase_client().table(TOMBSTONE_TABLE).select("id,deleted_at").order(
+                    "deleted_at", desc=True).order("id", desc=True).limit(1).execute()
+                return latest.data, deleted.data
+
+            latest, deleted = await run_query(heads)
+            position = {
+                "u": [latest[0]["updated_at"], latest[0]["id"]] if latest else None,
+                "d": [deleted[0]["deleted_at"], deleted[0]["id"]] if deleted else None,
+            }
+            return {"upserts": [], "deletes": [], "cursor": encode_sync_cursor(position), "has_more": False}
+
+        position = decode_sync_cursor(cursor)
+
+        def fetch():
+            upserts = self._table().select(SYNC_COLUMNS).not_.is_("updated_at", "null")
+            if position["u"]:
+                upserts = upserts.or_(keyset_expression("updated_at", False, *position["u"], include_nulls=False))
+            upserts = upserts.order("updated_at").order("id").limit(limit).execute()
+
+            deletes = get_supabase_client().table(TOMBSTONE_TABLE).select("id,deleted_at")
+            if position["d"]:
+                deletes = deletes.or_(keyset_expression("deleted_at", False, *position["d"], include_nulls=False))
+            deletes = deletes.order("deleted_at").order("id").limit(limit).execute()
+            return upserts.data or [], deletes.data or []
+
+        upserts, deletes = await run_query(fetch)
+        if upserts:
+            position["u"] = [upserts[-1]["updated_at"], upserts[-1]["id"]]
+        if deletes:
+            position["d"] = [deletes[-1]["deleted_at"], deletes[-1]["id"]]
+
+        # A row deleted after it was updated must not be resurrected by the client
+        deleted_ids = [d["id"] for d in deletes]
+        gone = set(deleted_ids)
+        return {
+            "upserts": [r for r in upserts if r["id"] not in gone],
+            "deletes": deleted_ids,
+            "cursor": encode_sync_cursor(position),
+            "has_more": len(upserts) == limit or len(deletes) == limit,
+        }
+
+    async def portfolio_stats(self) -> Dict[str, Any]:
+        """Totals, counts by status/risk and overdue histogram, computed in the database."""
+        result = await run_query(lambda: get_supabase_client().rpc("customer_stats", {}).execute())
+        return result.data or {}
+
+    async def claim_next(
+        self,
+        worker_id: str,
+        limit: int = 1,
+        lease_secs: int = CLAIM_LEASE_SECS,
+        statuses: Sequence[str] = ("active",),
+        risk_levels: Optional[Sequence[str]] = None,
+        due_from: Optional[date] = None,
+        due_to: Optional[date] = None,
+        min_recall_secs: int = CLAIM_MIN_RECALL_SECS,
+    ) -> List[Dict[str, Any]]:
+        """
+        Lease the next `limit` customers to call to `worker_id`, in priority order.
+
+        Claiming happens in one statement in the database (FOR UPDATE SKIP
+        LOCKED), so concurrent dialers never receive the same customer while
+        its lease is live, and nobody called in the last `min_recall_secs`
+        is claimed again once it has expired.
+        """
+        params = {
+            "p_worker": worker_id,
+            "p_limit": limit,
+            "p_lease_secs": lease_secs,
+            "p_statuses": list(statuses),
+            "p_risk_levels": list(risk_levels) if risk_levels else None,
+            "p_due_from": due_from.isoformat() if due_from else None,
+            "p_due_to": due_to.isoformat() if due_to else None,
+            "p_min_recall_secs": min_recall_secs,
+        }
+        result = await run_query(
+            lambda: get_supabase_client().rpc("claim_next_customers", params).execute()
+        )
+        # UPDATE ... RETURNING does not preserve the ORDER BY
+        rows = sort_by_call_priority(result.data or [])
+        await asyncio.gather(*(self.prime(row) for row in rows))
+        return rows
+
+    async def release_claims(self, worker_id: str, customer_ids: Sequence[str]) -> int:
+        """Give back leases that won't be used; returns how many were released."""
+        if not customer_ids:
+            return 0
+        params = {"p_worker": worker_id, "p_ids": list(customer_ids)}
+        result = await run_query(
+            lambda: get_supabase_client().rpc("release_customer_claims", params).execute()
+        )
+        await self.invalidate(customer_ids=customer_ids)
+        return result.data or 0
+
+    async def list_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        sort: str = "updated_at",
+        descending: bool = True,
+        statuses: Optional[Sequence[str]] = None,
+        risk_levels: Optional[Sequence[str]] = None,
+        overdue_buckets: Optional[Sequence[str]] = None,
+        due_from: Optional[date] = None,
+        due_to: Optional[date] = None,
+        columns: str = LIST_COLUMNS,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One keyset-paginated page of customers.
+
+        Returns (rows, next_cursor); next_cursor is None on the last page.
+        Raises ValueError for unknown sort keys, buckets or bad cursors.
+        """
+        if sort not in SORTABLE_COLUMNS:
+            raise ValueError(f"Cannot sort by '{sort}'")
+
+        # Every OR-group must hold; PostgREST gets them as a single `or` param
+        groups = []
+        if overdue_buckets:
+            groups.append([overdue_bucket_expression(b) for b in overdue_buckets])
+        if cursor:
+            cursor_sort, cursor_desc, value, row_id = decode_cursor(cursor)
+            if (cursor_sort, cursor_desc) != (sort, descending):
+                raise ValueError("Cursor does not match the requested sort order")
+            groups.append([keyset_expression(sort, descending, value, row_id)])
+
+        def query():
+            q = filter_customers(self._table().select(columns), statuses, risk_levels, due_from, due_to)
+            if len(groups) == 1:
+                q = q.or_(",".join(groups[0]))
+            elif groups:
+                q = q.or_("and(" + ",".join(f"or({','.join(g)})" for g in groups) + ")")
+            return (
+                q.order(sort, desc=descending, nullsfirst=False)
+                .order("id", desc=descending)
+                .limit(limit + 1)
+                .execute()
+            )
+
+        result = await run_query(query)
+        rows = result.data or []
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(sort, descending, last.get(sort), last["id"])
+        return rows, next_cursor
+
+    async def count_matching(
+        self,
+        statuses: Optional[Sequence[str]] = None,
+        risk_levels: Optional[Sequence[str]] = None,
+        due_from: Optional[date] = None,
+        due_to: Optional[date] = None,
+    ) -> int:
+        """How many customers match the filters (an exact count; only one row is fetched)."""
+        from postgrest.types import CountMethod
+
+        def query():
+            q = self._table().select("id", count=CountMethod.exact)
+            return filter_customers(q, statuses, risk_levels, due_from, due_to).limit(1).execute()
+
+        result = await run_query(query)
+        return result.count or 0
+
+    async def scan(self, columns: Sequence[str], page_size: int = 1000) -> List[Dict[str, Any]]:
+        """Every row (just `columns`, which must include id), fetched in id order a page at a time."""
+        rows: List[Dict[str, Any]] = []
+        last_id = None
+        while True:
+            def page(after=last_id):
+                query = self._table().select(",".join(columns)).order("id").limit(page_size)
+                if after is not None:
+                    query = query.gt("id", after)
+                return query.execute()
+
+            batch = (await run_query(page)).data or []
+            rows.extend(batch)
+            if len(batch) < page_size:
+                return rows
+            last_id = batch[-1]["id"]
+
+    async def create(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Insert a customer and return the stored row; ValueError if the phone is taken."""
+        data = with_phone_key(data)
+        try:
+            result = await run_query(lambda: self._table().insert(data).execute())
+        except Exception as e:
+            if getattr(e, "code", None) == UNIQUE_VIOLATION:
+                raise ValueError("Customer with this phone already exists") from e
+            raise
+        if not result.data:
+            return None
+        self.index.add(result.data[0])
+        return result.data[0]
+
+    async def upsert_many(self, rows: List[Dict[str, Any]], on_conflict: str = "phone_e164") -> int:
+        """
+        Insert-or-update a batch of rows in one round trip; returns how many
+        were written. Every row must carry the same columns.
+        """
+        if not rows:
+            return 0
+        rows = [with_phone_key(row) for row in rows]
+        # Loaded with the Supabase client, not at import (see database.py)
+        from postgrest.types import ReturnMethod
+        await run_query(
+            lambda: self._table()
+            .upsert(rows, on_conflict=on_conflict, returning=ReturnMethod.minimal)
+            .execute()
+        )
+        await self.cache.discard(row["phone_e164"] for row in rows if row.get("phone_e164"))
+        for row in rows:
+            if row.get("phone_e164"):
+                # The id arrives with the next sync
+                self.index.add(row)
+        return len(rows)
+
+    async def bulk_update(
+        self,
+        updates: Dict[str, Any],
+        ids: Optional[Sequence[str]] = None,
+        statuses: Optional[Sequence[str]] = None,
+        risk_levels: Optional[Sequence[str]] = None,
+        due_from: Optional[date] = None,
+        due_to: Optional[date] = None,
+        match_all: bool = False,
+        batch_size: int = BULK_UPDATE_BATCH_SIZE,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """
+        Apply the same changes to many customers.
+
+        With `ids`, runs one `id IN (...)` statement per `batch_size` ids
+        (batches in parallel); otherwise one statement for every row matching
+        the filter (`match_all=True` to touch the whole table).
+
+        Returns (updated_rows, errors) where errors maps the ids of failed
+        batches to the error message. Raises ValueError when nothing selects
+        rows, and propagates database errors for filter updates.
+        """
+        updates = with_phone_key(updates)
+        await self._supersede_pending(updates)
+        if ids is not None:
+            ids = list(dict.fromkeys(ids))
+            chunks = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+
+            def update_chunk(chunk):
+                return self._table().update(updates).in_("id", chunk).execute()
+
+            results = await asyncio.gather(
+                *(run_query(update_chunk, chunk) for chunk in chunks), return_exceptions=True
+            )
+            rows: List[Dict[str, Any]] = []
+            errors: Dict[str, str] = {}
+            for chunk, result in zip(chunks, results):
+                if isinstance(result, Exception):
+                    errors.update((customer_id, str(result)) for customer_id in chunk)
+                else:
+                    rows.extend(result.data or [])
+            await self._invalidate_rows(rows, ids)
+            return rows, errors
+
+        if not (statuses or risk_levels or due_from or due_to or match_all):
+            raise ValueError("Bulk update needs ids, a filter, or match_all")
+
+        def update_matching():
+            q = filter_customers(self._table().update(updates), statuses, risk_levels, due_from, due_to)
+            if match_all:
+                # UPDATE without WHERE is refused by PostgREST/safeupdate
+                q = q.not_.is_("id", "null")
+            return q.execute()
+
+        result = await run_query(update_matching)
+        rows = result.data or []
+        await self._invalidate_rows(rows, [row["id"] for row in rows])
+        return rows, {}
+
+    async def _supersede_pending(self, updates: Dict[str, Any], phone: Optional[str] = None):
+        """Keep buffered writes (write_behind.py) from overwriting a direct update."""
+        if self.pending_writes is not None:
+            await self.pending_writes.supersede(updates, phone)
+
+    async def _invalidate_rows(self, rows: Sequence[Dict[str, Any]], ids: Sequence[str]):
+        """Drop cached entries for updated rows, including ones cached under an old phone."""
+        await self.cache.discard(customer_phone_key(row) for row in rows)
+        for row in rows:
+            self.index.add(row)
+        await self.cache.discard_ids(ids)
+
+    async def update_by_id(self, customer_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update a customer by id; returns the updated row or None if missing."""
+        updates = with_phone_key(updates)
+        await self._supersede_pending(updates)
+        result = await run_query(
+            lambda: self._table().update(updates).eq("id", customer_id).execute()
+        )
+        # Covers phone changes too: the old phone's entry is found by id
+        await self.invalidate(customer_ids=[customer_id])
+        if not result.data:
+            return None
+        self.index.add(result.data[0])
+        return result.data[0]
+
+    async def update_by_phone(self, phone: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update a customer by phone (in any format); returns the updated row or None if missing."""
+        key = phone_key(phone)
+        updates = with_phone_key(updates)
+        await self._supersede_pending(updates, key)
+        result = await run_query(
+            lambda: self._table().update(updates).eq("phone_e164", key).execute()
+        )
+        await self.invalidate(phone=phone)
+        return result.data[0] if result.data else None
+
+    async def apply_updates(self, updates_by_phone: Dict[str, Dict[str, Any]]) -> List[str]:
+        """
+        Apply per-phone changes (status, last_call_at) in one statement via
+        apply_customer_updates(); returns the phones that matched a customer.
+        Phones must already be E.164 (phone_key()).
+
+        Cached rows are left as they are: write_behind.py patched them when
+        the changes were queued.
+        """
+        if not updates_by_phone:
+            return []
+        params = {"p_updates": [{"phone": phone, **updates} for phone, updates in updates_by_phone.items()]}
+        result = await run_query(
+            lambda: get_supabase_client().rpc("apply_customer_updates", params).execute()
+        )
+        return [row["phone"] if isinstance(row, dict) else row for row in result.data or []]
+
+    async def delete_by_id(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        """Delete a customer by id; returns the deleted row or None if missing."""
+        result = await run_query(
+            lambda: self._table().delete().eq("id", customer_id).execute()
+        )
+        await self.invalidate(customer_ids=[customer_id])
+        self.index.discard(customer_id)
+        return result.data[0] if result.data else None
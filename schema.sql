@@ -17,6 +17,12 @@ CREATE TABLE IF NOT EXISTS customers (
 CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers(phone);
 CREATE INDEX IF NOT EXISTS idx_customers_status ON customers(status);
 
+-- Keyset pagination for the dashboard list (ORDER BY updated_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_customers_updated_at_id ON customers(updated_at DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS idx_customers_status_updated_at ON customers(status, updated_at DESC NULLS LAST, id DESC);
+-- Overdue-bucket filters are ranges on due_date
+CREATE INDEX IF NOT EXISTS idx_customers_due_date ON customers(due_date);
+
 -- Create updated_at trigger function
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -32,3 +38,209 @@ CREATE TRIGGER update_customers_updated_at
     BEFORE UPDATE ON customers
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
+
+-- Tombstones for deleted customers, so dashboards can delta-sync removals
+CREATE TABLE IF NOT EXISTS customer_tombstones (
+    id UUID PRIMARY KEY,
+    deleted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_customer_tombstones_deleted_at ON customer_tombstones(deleted_at, id);
+
+CREATE OR REPLACE FUNCTION record_customer_tombstone()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO customer_tombstones (id, deleted_at)
+    VALUES (OLD.id, NOW())
+    ON CONFLICT (id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS record_customers_tombstone ON customers;
+CREATE TRIGGER record_customers_tombstone
+    AFTER DELETE ON customers
+    FOR EACH ROW
+    EXECUTE FUNCTION record_customer_tombstone();
+
+-- Portfolio aggregates for the dashboard header (GET /api/stats).
+-- Bucket boundaries match OVERDUE_BUCKETS in portfolio.py.
+CREATE OR REPLACE FUNCTION customer_stats()
+RETURNS JSON AS $$
+    WITH base AS (
+        SELECT
+            COALESCE(status, 'unknown') AS status,
+            COALESCE(risk_level, 'unknown') AS risk_level,
+            debt_amount,
+            CASE
+                WHEN due_date IS NULL OR due_date >= CURRENT_DATE THEN 'current'
+                WHEN CURRENT_DATE - due_date <= 30 THEN '1-30'
+                WHEN CURRENT_DATE - due_date <= 60 THEN '31-60'
+                WHEN CURRENT_DATE - due_date <= 90 THEN '61-90'
+                ELSE '90+'
+            END AS overdue_bucket
+        FROM customers
+    )
+    SELECT json_build_object(
+        'total_customers', (SELECT COUNT(*) FROM base),
+        'total_debt', (SELECT COALESCE(SUM(debt_amount), 0) FROM base),
+        'total_recovered', (SELECT COALESCE(SUM(debt_amount), 0) FROM base WHERE status = 'promised_to_pay'),
+        'by_status', (
+            SELECT COALESCE(json_object_agg(status, json_build_object('count', n, 'debt', debt)), '{}'::json)
+            FROM (SELECT status, COUNT(*) AS n, SUM(debt_amount) AS debt FROM base GROUP BY status) s
+        ),
+        'by_risk_level', (
+            SELECT COALESCE(json_object_agg(risk_level, json_build_object('count', n, 'debt', debt)), '{}'::json)
+            FROM (SELECT risk_level, COUNT(*) AS n, SUM(debt_amount) AS debt FROM base GROUP BY risk_level) r
+        ),
+        'overdue_buckets', (
+            SELECT COALESCE(json_object_agg(overdue_bucket, json_build_object('count', n, 'debt', debt)), '{}'::json)
+            FROM (SELECT overdue_bucket, COUNT(*) AS n, SUM(debt_amount) AS debt FROM base GROUP BY overdue_bucket) b
+        )
+    );
+$$ LANGUAGE sql STABLE;
+
+-- Call prioritisation: rank and claim the next customers to dial in the
+-- database instead of sorting the whole active set client-side.
+-- Priority: risk (high first), most days overdue (oldest due_date), largest
+-- debt, least recently called. Matches call_priority() in portfolio.py.
+ALTER TABLE customers ADD COLUMN IF NOT EXISTS risk_rank SMALLINT GENERATED ALWAYS AS (
+    CASE risk_level WHEN 'high' THEN 0 WHEN 'medium' THEN 1 WHEN 'low' THEN 2 ELSE 3 END
+) STORED;
+ALTER TABLE customers ADD COLUMN IF NOT EXISTS last_call_at TIMESTAMP WITH TIME ZONE;
+-- Lease held by a dialer worker between claiming a customer and the call ending
+ALTER TABLE customers ADD COLUMN IF NOT EXISTS claimed_by TEXT;
+ALTER TABLE customers ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMP WITH TIME ZONE;
+
+CREATE INDEX IF NOT EXISTS idx_customers_call_priority ON customers
+    (status, risk_rank, due_date ASC NULLS LAST, debt_amount DESC, last_call_at ASC NULLS FIRST, id);
+
+-- Unclaimed customers in dialing order (for inspection; dialers use claim_next_customers)
+CREATE OR REPLACE VIEW call_queue AS
+    SELECT id, name, phone, debt_amount, due_date, status, risk_level, risk_rank, last_call_at,
+           GREATEST(CURRENT_DATE - due_date, 0) AS days_overdue
+    FROM customers
+    WHERE status = 'active' AND (claimed_until IS NULL OR claimed_until < NOW())
+    ORDER BY risk_rank, due_date ASC NULLS LAST, debt_amount DESC, last_call_at ASC NULLS FIRST, id;
+
+-- Atomically lease the top N matching customers to a worker. SKIP LOCKED lets
+-- concurrent workers each take different rows without waiting or double-calling.
+-- Customers called within the last p_min_recall_secs are skipped, so a lease
+-- that expires (or is released) after the call went out never re-dials them.
+DROP FUNCTION IF EXISTS claim_next_customers(TEXT, INTEGER, INTEGER, TEXT[], TEXT[], DATE, DATE);
+CREATE OR REPLACE FUNCTION claim_next_customers(
+    p_worker TEXT,
+    p_limit INTEGER DEFAULT 1,
+    p_lease_secs INTEGER DEFAULT 900,
+    p_statuses TEXT[] DEFAULT ARRAY['active'],
+    p_risk_levels TEXT[] DEFAULT NULL,
+    p_due_from DATE DEFAULT NULL,
+    p_due_to DATE DEFAULT NULL,
+    p_min_recall_secs INTEGER DEFAULT 86400
+)
+RETURNS SETOF customers AS $$
+    WITH picked AS (
+        SELECT id FROM customers
+        WHERE status = ANY(p_statuses)
+          AND (p_risk_levels IS NULL OR risk_level = ANY(p_risk_levels))
+          AND (p_due_from IS NULL OR due_date >= p_due_from)
+          AND (p_due_to IS NULL OR due_date <= p_due_to)
+          AND (claimed_until IS NULL OR claimed_until < NOW())
+          AND (last_call_at IS NULL OR last_call_at < NOW() - make_interval(secs => p_min_recall_secs))
+        ORDER BY risk_rank, due_date ASC NULLS LAST, debt_amount DESC, last_call_at ASC NULLS FIRST, id
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE customers c
+    SET claimed_by = p_worker,
+        claimed_until = NOW() + make_interval(secs => p_lease_secs)
+    FROM picked
+    WHERE c.id = picked.id
+    RETURNING c.*;
+$$ LANGUAGE sql VOLATILE;
+
+-- Give back leases a worker did not use (dispatch failed, campaign cancelled)
+CREATE OR REPLACE FUNCTION release_customer_claims(p_worker TEXT, p_ids UUID[])
+RETURNS INTEGER AS $$
+    WITH released AS (
+        UPDATE customers
+        SET claimed_by = NULL, claimed_until = NULL
+        WHERE claimed_by = p_worker AND id = ANY(p_ids)
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM released;
+$$ LANGUAGE sql VOLATILE;
+
+-- One row per finished call (written in batches by call_log.py from
+-- update-status): outcome, the agent's summary and the last plan offered.
+-- customer_id is not a foreign key so history outlives deleted customers and
+-- a late insert never fails on a row deleted mid-call.
+CREATE TABLE IF NOT EXISTS call_attempts (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    conversation_id TEXT,
+    agent_id TEXT,
+    customer_id UUID,
+    phone TEXT NOT NULL,
+    started_at TIMESTAMP WITH TIME ZONE,
+    ended_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    outcome TEXT NOT NULL,
+    summary TEXT,
+    plan_offered JSONB,
+    plan_accepted BOOLEAN,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_call_attempts_customer ON call_attempts(customer_id, ended_at DESC);
+CREATE INDEX IF NOT EXISTS idx_call_attempts_phone ON call_attempts(phone, ended_at DESC);
+CREATE INDEX IF NOT EXISTS idx_call_attempts_outcome ON call_attempts(outcome, ended_at DESC);
+CREATE INDEX IF NOT EXISTS idx_call_attempts_conversation ON call_attempts(conversation_id);
+
+-- Canonical (E.164) phone every lookup goes through. ElevenLabs passes the
+-- called number as it sees it ("+1 555...", "15551234567", ...); tool
+-- endpoints normalise it with phones.normalize_phone() and match on this
+-- column. The API writes it on create/update/import; the trigger fills it
+-- for rows written elsewhere whose phone is already international (+...).
+-- Older national-format rows: python phone_index.py --backfill
+ALTER TABLE customers ADD COLUMN IF NOT EXISTS phone_e164 TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_customers_phone_e164 ON customers(phone_e164);
+
+CREATE OR REPLACE FUNCTION set_phone_e164()
+RETURNS TRIGGER AS $$
+DECLARE
+    candidate TEXT := '+' || regexp_replace(NEW.phone, '\D', '', 'g');
+BEGIN
+    IF NEW.phone_e164 IS NULL
+       OR (TG_OP = 'UPDATE' AND NEW.phone IS DISTINCT FROM OLD.phone
+           AND NEW.phone_e164 IS NOT DISTINCT FROM OLD.phone_e164) THEN
+        NEW.phone_e164 := CASE
+            WHEN NEW.phone ~ '^\s*\+' AND candidate ~ '^\+[1-9][0-9]{7,14}$' THEN candidate
+        END;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS set_customers_phone_e164 ON customers;
+CREATE TRIGGER set_customers_phone_e164
+    BEFORE INSERT OR UPDATE OF phone, phone_e164 ON customers
+    FOR EACH ROW
+    EXECUTE FUNCTION set_phone_e164();
+
+-- Existing international-format rows (the trigger fills phone_e164). Fails
+-- on the unique index if two rows are the same number written differently:
+-- merge those customers first.
+UPDATE customers SET phone = phone WHERE phone_e164 IS NULL AND phone ~ '^\s*\+';
+
+-- Batched per-phone updates from the write-behind buffer (write_behind.py):
+-- one statement for a whole flush. Columns missing from an element keep
+-- their current value. Phones are matched on phone_e164; returns the ones
+-- that matched a customer.
+CREATE OR REPLACE FUNCTION apply_customer_updates(p_updates JSONB)
+RETURNS TABLE (phone TEXT) AS $$
+    UPDATE customers c
+    SET status = COALESCE(u.status, c.status),
+        last_call_at = COALESCE(u.last_call_at, c.last_call_at)
+    FROM jsonb_to_recordset(p_updates) AS u(phone TEXT, status TEXT, last_call_at TIMESTAMP WITH TIME ZONE)
+    WHERE c.phone_e164 = u.phone
+    RETURNING c.phone_e164;
+$$ LANGUAGE sql VOLATILE;
@@ -102,19 +102,12 @@ customers = [
 
 print(f"🚀 Seeding {len(customers)} real customer records from 30-Day Forecast...")
 
-for customer in customers:
-    try:
-        # Check if exists
-        existing = supabase.table("customers").select("id").eq("phone", customer["phone"]).execute()
-        
-        if existing.data:
-            print(f"🔄 Updating {customer['name']}...")
-            supabase.table("customers").update(customer).eq("id", existing.data[0]['id']).execute()
-        else:
-            print(f"✨ Creating {customer['name']}...")
-            supabase.table("customers").insert(customer).execute()
-            
-    except Exception as e:
-        print(f"❌ Error processing {customer['name']}: {e}")
+try:
+    # One round trip: insert new phones, update existing ones
+    supabase.table("customers").upsert(customers, on_conflict="phone").execute()
+    for customer in customers:
+        print(f"✨ Upserted {customer['name']}")
+except Exception as e:
+    print(f"❌ Error seeding customers: {e}")
 
 print("✅ Seeding complete!")
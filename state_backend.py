@@ -0,0 +1,382 @@
+"""
+Where shared in-memory state lives: this process, or Redis.
+
+With one uvicorn process, the customer cache, the dispatched-conversation
+registry and the campaign list can simply be dicts. Under gunicorn with
+several workers they cannot: a call dispatched by worker A has its tool
+webhooks answered by worker B, an edit made through worker B must invalidate
+the row cached by worker A, and a campaign started on one worker must be
+visible (and cancellable) from all of them.
+
+make_cache() returns an async cache (get / set / modify / pop / discard /
+discard_ids / items / size / stats) backed by:
+
+  - STATE_BACKEND=memory (default): LocalCache, a TTLCache in this process
+  - STATE_BACKEND=redis: RedisCache, keys under STATE_KEY_PREFIX in the Redis
+    at REDIS_URL, shared by every worker. Calls go through redis.asyncio, so
+    waiting on Redis never blocks the event loop. Expiry is Redis' own TTL,
+    and max_entries is left to Redis' maxmemory policy.
+
+Values are stored as JSON, never pickled: whoever can write to a shared
+Redis must not be able to run code in the API. Values of other types are
+converted by the cache's encode / decode functions. modify() is a WATCH/MULTI
+transaction, so two workers patching the same row both keep their change.
+
+A cache made with index_field="id" also keeps, per id, the keys whose value
+carried that id, so discard_ids() drops a customer's rows (under whichever
+phone they were cached) without scanning every entry.
+
+Redis errors are treated as cache misses (and counted), so a Redis outage
+costs database round trips rather than failed tool calls. Caches of purely
+derived data (offer matrices, the portfolio snapshot) stay per process.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from cache import TTLCache
+from fast_json import dumps, loads
+
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()  # memory | redis
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+STATE_KEY_PREFIX = os.getenv("STATE_KEY_PREFIX", "jess")
+# Redis sits next to the API; fall back to the database rather than wait on it
+REDIS_SOCKET_TIMEOUT_SECS = float(os.getenv("REDIS_SOCKET_TIMEOUT_SECS", "0.25"))
+# WATCH/MULTI retries when other workers keep changing the watched keys
+REDIS_TRANSACTION_ATTEMPTS = 10
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+_redis_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_redis():
+    """Shared asyncio Redis client (connection pool), created on first use in the running loop."""
+    global _redis_client, _redis_loop
+    loop = asyncio.get_running_loop()
+    if _redis_client is None or _redis_loop is not loop:
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("STATE_BACKEND=redis needs the redis package (pip install redis)")
+        # Connections belong to the loop that opened them (CLI scripts may run several)
+        _redis_client = redis.Redis.from_url(
+            REDIS_URL,
+            socket_timeout=REDIS_SOCKET_TIMEOUT_SECS,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT_SECS,
+            health_check_interval=30,
+        )
+        _redis_loop = loop
+    return _redis_client
+
+
+async def close_redis():
+    """Close the Redis connection pool (called on application shutdown)."""
+    global _redis_client, _redis_loop
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client, _redis_loop = None, None
+
+
+def _indexed_value(value: Any, field: Optional[str]) -> Optional[Any]:
+    if field is None or not isinstance(value, dict):
+        return None
+    return value.get(field)
+
+
+class LocalCache:
+    """The make_cache() interface over an in-process TTLCache."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int, name: str = "cache",
+                 index_field: Optional[str] = None):
+        self.cache = TTLCache(ttl_seconds, max_entries, name=name)
+        self.name = name
+        self.index_field = index_field
+        # Indexed value -> keys set with it (may still list keys evicted or re-set since)
+        self._index: Dict[Any, Set[Hashable]] = {}
+
+    def _add_to_index(self, key: Hashable, value: Any):
+        indexed = _indexed_value(value, self.index_field)
+        if indexed is None:
+            return
+        self._index.setdefault(indexed, set()).add(key)
+        if len(self._index) > 2 * max(self.cache.max_entries, 1):
+            # Drop what eviction and expiry left behind
+            live: Dict[Any, Set[Hashable]] = {}
+            for live_key, live_value in self.cache.items():
+                live_indexed = _indexed_value(live_value, self.index_field)
+                if live_indexed is not None:
+                    live.setdefault(live_indexed, set()).add(live_key)
+            self._index = live
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        return self.cache.get(key)
+
+    async def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        self.cache.set(key, value, ttl_seconds)
+        self._add_to_index(key, value)
+
+    async def modify(self, key: Hashable, fn: Callable[[Any], Any]) -> bool:
+        """Replace a live entry's value with fn(value), keeping its expiry; False if absent."""
+        return self.cache.modify(key, fn)
+
+    async def pop(self, key: Hashable) -> Optional[Any]:
+        return self.cache.pop(key)
+
+    async def discard(self, keys: Iterable[Hashable]) -> int:
+        """Invalidate several keys; returns how many were cached."""
+        return sum(1 for key in keys if self.cache.pop(key) is not None)
+
+    async def discard_ids(self, values: Iterable[Any]) -> int:
+        """Invalidate every entry set with one of these index_field values."""
+        keys: Set[Hashable] = set()
+        for value in values:
+            keys |= self._index.pop(value, set())
+        return await self.discard(keys)
+
+    async def items(self) -> List[Tuple[Hashable, Any]]:
+        return self.cache.items()
+
+    async def size(self) -> int:
+        return len(self.cache)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+class RedisCache:
+    """Cache whose entries live in Redis as JSON, shared across processes."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int, name: str = "cache",
+                 prefix: str = STATE_KEY_PREFIX, index_field: Optional[str] = None,
+                 encode: Optional[Callable[[Any], Any]] = None,
+                 decode: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.namespace = f"{prefix}:{name}:"
+        # Sets of entry keys by indexed value, outside the entries' namespace
+        self.index_namespace = f"{prefix}:{name}.by_{index_field}:"
+        self.index_field = index_field
+        self.encode = encode
+        self.decode = decode
+        # Per-process counters (each worker reports its own)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.errors = 0
+        # Entries counted by the last size() (a SCAN, so not on every stats())
+        self.last_size = 0
+
+    @property
+    def client(self):
+        return get_redis()
+
+    def _key(self, key: Hashable) -> str:
+        return self.namespace + (key if isinstance(key, str) else repr(key))
+
+    def _index_key(self, value: Any) -> str:
+        return self.index_namespace + str(value)
+
+    def _dumps(self, key: Hashable, value: Any) -> bytes:
+        # The key is stored with the value so items() can hand it back
+        return dumps([key, self.encode(value) if self.encode else value])
+
+    def _loads(self, raw: bytes) -> Tuple[Hashable, Any]:
+        key, value = loads(raw)
+        return key, self.decode(value) if self.decode else value
+
+    def _error(self, operation: str, error: Exception):
+        self.errors += 1
+        logger.warning("⚠️  Redis %s failed for cache '%s': %s", operation, self.name, error)
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        try:
+            raw = await self.client.get(self._key(key))
+        except Exception as e:
+            self._error("get", e)
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._loads(raw)[1]
+
+    async def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        if self.max_entries <= 0:
+            return
+        ttl_ms = max(1, int((self.ttl_seconds if ttl_seconds is None else ttl_seconds) * 1000))
+        redis_key = self._key(key)
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.set(redis_key, self._dumps(key, value), px=ttl_ms)
+            indexed = _indexed_value(value, self.index_field)
+            if indexed is not None:
+                # Outlives every key it lists: each add pushes it to a full TTL
+                pipe.sadd(self._index_key(indexed), redis_key)
+                pipe.pexpire(self._index_key(indexed), ttl_ms)
+            await pipe.execute()
+        except Exception as e:
+            self._error("set", e)
+
+    async def modify(self, key: Hashable, fn: Callable[[Any], Any]) -> bool:
+        """Replace a live entry's value with fn(value), keeping its expiry; False if absent."""
+        redis_key = self._key(key)
+
+        async def apply(pipe) -> bool:
+            raw = await pipe.get(redis_key)
+            if raw is None:
+                return False
+            value = fn(self._loads(raw)[1])
+            pipe.multi()
+            pipe.set(redis_key, self._dumps(key, value), keepttl=True, xx=True)
+            return True
+
+        try:
+            return await self._transaction(apply, redis_key)
+        except Exception as e:
+            self._error("modify", e)
+            return False
+
+    async def _transaction(self, fn: Callable[[Any], Any], *watches: str) -> Any:
+        """fn(pipe) under WATCH, retried while another client changes a watched key."""
+        from redis.exceptions import WatchError
+
+        for _ in range(REDIS_TRANSACTION_ATTEMPTS):
+            async with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(*watches)
+                    result = await fn(pipe)
+                    await pipe.execute()
+                    return result
+                except WatchError:
+                    continue
+        raise RuntimeError(f"{', '.join(watches)} kept changing ({REDIS_TRANSACTION_ATTEMPTS} attempts)")
+
+    async def pop(self, key: Hashable) -> Optional[Any]:
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.get(self._key(key))
+            pipe.delete(self._key(key))
+            raw, _ = await pipe.execute()
+        except Exception as e:
+            # Another worker may keep serving the stale row until its TTL
+            self._error("pop", e)
+            return None
+        if raw is None:
+            return None
+        self.invalidations += 1
+        return self._loads(raw)[1]
+
+    async def discard(self, keys: Iterable[Hashable]) -> int:
+        """Invalidate several keys in one round trip; returns how many were cached."""
+        redis_keys = [self._key(key) for key in keys]
+        if not redis_keys:
+            return 0
+        try:
+            removed = await self.client.delete(*redis_keys)
+        except Exception as e:
+            self._error("discard", e)
+            return 0
+        self.invalidations += removed
+        return removed
+
+    async def discard_ids(self, values: Iterable[Any]) -> int:
+        """Invalidate every entry set with one of these index_field values (no SCAN)."""
+        index_keys = list(dict.fromkeys(self._index_key(value) for value in values))
+        if not index_keys:
+            return 0
+
+        async def drop(pipe) -> int:
+            # Watched, so a row cached meanwhile is not lost from its index set
+            members = set()
+            for index_key in index_keys:
+                members |= await pipe.smembers(index_key)
+            pipe.multi()
+            if members:
+                pipe.delete(*members)
+            pipe.delete(*index_keys)
+            return len(members)
+
+        try:
+            doomed = await self._transaction(drop, *index_keys)
+        except Exception as e:
+            self._error("discard_ids", e)
+            return 0
+        self.invalidations += doomed
+        return doomed
+
+    async def _scan(self) -> List[bytes]:
+        return [key async for key in self.client.scan_iter(match=self.namespace + "*", count=500)]
+
+    async def items(self) -> List[Tuple[Hashable, Any]]:
+        """Every live (key, value); a SCAN of the namespace, so keep it off hot paths."""
+        try:
+            keys = await self._scan()
+            entries = []
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                entries += [self._loads(raw) for raw in await self.client.mget(chunk) if raw is not None]
+            return entries
+        except Exception as e:
+            self._error("scan", e)
+            return []
+
+    async def size(self) -> int:
+        """Live entries (a SCAN of the namespace); also kept for stats()."""
+        try:
+            self.last_size = len(await self._scan())
+        except Exception as e:
+            self._error("scan", e)
+        return self.last_size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "backend": "redis",
+            "size": self.last_size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+def make_cache(ttl_seconds: float, max_entries: int, name: str, index_field: Optional[str] = None,
+               encode: Optional[Callable[[Any], Any]] = None, decode: Optional[Callable[[Any], Any]] = None):
+    """
+    A cache shared by every worker when STATE_BACKEND=redis, else in-process.
+
+    encode / decode convert values to and from JSON types for Redis (the
+    in-process cache keeps the objects themselves).
+    """
+    if STATE_BACKEND == "redis":
+        return RedisCache(ttl_seconds, max_entries, name=name, index_field=index_field,
+                          encode=encode, decode=decode)
+    if STATE_BACKEND != "memory":
+        raise ValueError(f"Unknown STATE_BACKEND '{STATE_BACKEND}' (expected memory or redis)")
+    return LocalCache(ttl_seconds, max_entries, name=name, index_field=index_field)
+
+
+async def backend_info() -> Dict[str, Any]:
+    info: Dict[str, Any] = {"backend": STATE_BACKEND, "pid": os.getpid()}
+    if STATE_BACKEND == "redis":
+        info["redis_url"] = REDIS_URL.split("@")[-1]  # no credentials
+        try:
+            info["redis_ping"] = bool(await get_redis().ping())
+        except Exception as e:
+            info["redis_ping"] = False
+            info["redis_error"] = str(e)
+    return info
@@ -8,6 +8,27 @@ let callModal;
 // Available Agents Cache
 let availableAgents = [];
 
+// Customer list paging (keyset cursors from /api/customers)
+const PAGE_SIZE = 50;
+let customerFilter = {};
+let nextCursor = null;
+const loadedCustomers = new Map(); // id -> customer currently rendered
+const selectedCustomers = new Set(); // ids ticked for bulk actions
+
+// Delta sync (/api/customers/changes) replaces periodic full reloads
+const SYNC_INTERVAL_MS = 10000;
+let syncCursor = null;
+let syncInProgress = false;
+
+// Days-overdue buckets, mirroring the server's OVERDUE_BUCKETS
+const OVERDUE_BUCKETS = {
+    'current': [null, 0],
+    '1-30': [1, 30],
+    '31-60': [31, 60],
+    '61-90': [61, 90],
+    '90+': [91, null]
+};
+
 // Initialize when DOM is loaded
 document.addEventListener('DOMContentLoaded', async function () {
     console.log('GenuVoice Control Panel Initialized');
@@ -21,11 +42,14 @@ document.addEventListener('DOMContentLoaded', async function () {
     // Load available agents first
     await loadAgents();
 
+    // Take a sync cursor before the first page so no change is missed
+    await syncCustomers();
+
     // Then load customers
     loadCustomers();
 
-    // Auto-refresh every 30 seconds
-    setInterval(loadCustomers, 30000);
+    // Patch rows in place with whatever changed since the last sync
+    setInterval(syncCustomers, SYNC_INTERVAL_MS);
 });
 
 /**
@@ -46,23 +70,39 @@ async function loadAgents() {
 }
 
 /**
- * Load all customers from API
+ * Build the /api/customers URL for the current filter and cursor
+ */
+function buildCustomersUrl(cursor) {
+    const params = new URLSearchParams({ limit: PAGE_SIZE, ...customerFilter });
+    if (cursor) params.set('cursor', cursor);
+    return `${API_BASE_URL}/api/customers?${params.toString()}`;
+}
+
+/**
+ * Load customers from API.
+ * With append=false the first page is (re)loaded; with append=true the next
+ * page is fetched using the cursor returned by the previous one.
  */
-async function loadCustomers() {
-    console.log('Loading customers...');
+async function loadCustomers(append = false) {
+    console.log(append ? 'Loading more customers...' : 'Loading customers...');
 
     try {
-        const response = await fetch(`${API_BASE_URL}/api/customers`);
+        const response = await fetch(buildCustomersUrl(append ? nextCursor : null));
 
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        const customers = await response.json();
-        console.log(`Loaded ${customers.length} customers`);
+        const page = await response.json();
+        console.log(`Loaded ${page.items.length} customers`);
 
-        updateStats(customers);
-        populateCustomersTable(customers);
+        nextCursor = page.next_cursor;
+        if (!append) loadedCustomers.clear();
+        page.items.forEach(c => loadedCustomers.set(c.id, c));
+
+        if (!append) updateStats();
+        populateCustomersTable(page.items, append);
+        updatePagination();
 
     } catch (error) {
         console.error('Error loading customers:', error);
@@ -70,12 +110,142 @@ async function loadCustomers() {
 }
 
 /**
- * Update dashboard statistics
+ * Fetch the next page on demand
+ */
+function loadMoreCustomers() {
+    if (nextCursor) loadCustomers(true);
+}
+
+/**
+ * Apply a server-side filter (status / risk_level / overdue) and reload
+ */
+function setCustomerFilter(filter, label) {
+    customerFilter = filter;
+    const elLabel = document.getElementById('customer-filter-label');
+    if (elLabel) elLabel.textContent = `Filter: ${label}`;
+    loadCustomers();
+}
+
+/**
+ * Show the "Load more" footer only while there are more pages
+ */
+function updatePagination() {
+    const footer = document.getElementById('customers-pagination');
+    if (footer) footer.classList.toggle('d-none', !nextCursor);
+}
+
+/**
+ * Fetch rows changed since the last sync and patch the table in place.
+ * The first call (no cursor yet) only records the starting cursor.
  */
-function updateStats(customers) {
-    const totalCustomers = customers.length;
-    const totalRecovered = customers.reduce((sum, c) => c.status === 'promised_to_pay' ? sum + c.debt_amount : sum, 0);
-    const totalDebt = customers.reduce((sum, c) => sum + c.debt_amount, 0);
+async function syncCustomers() {
+    if (syncInProgress) return;
+    syncInProgress = true;
+
+    try {
+        let hasMore = true;
+        let changed = false;
+        while (hasMore) {
+            const params = new URLSearchParams();
+            if (syncCursor) params.set('since', syncCursor);
+
+            const response = await fetch(`${API_BASE_URL}/api/customers/changes?${params.toString()}`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            const changes = await response.json();
+            changes.upserts.forEach(applyCustomerUpsert);
+            changes.deletes.forEach(removeCustomerRow);
+            changed = changed || changes.upserts.length > 0 || changes.deletes.length > 0;
+
+            syncCursor = changes.cursor;
+            hasMore = changes.has_more;
+        }
+
+        // Totals only move when some row did
+        if (changed) updateStats();
+    } catch (error) {
+        console.error('Error syncing customers:', error);
+    } finally {
+        syncInProgress = false;
+    }
+}
+
+/**
+ * Whether a customer belongs in the list under the active filter
+ */
+function matchesFilter(customer) {
+    const inList = (value, csv) => !csv || csv.split(',').includes(value);
+    if (!inList(customer.status, customerFilter.status)) return false;
+    if (!inList(customer.risk_level, customerFilter.risk_level)) return false;
+    if (customerFilter.overdue) {
+        return customerFilter.overdue.split(',').some(bucket => {
+            const [min, max] = OVERDUE_BUCKETS[bucket] || [null, null];
+            const days = customer.days_overdue;
+            return (min === null || days >= min) && (max === null || days <= max);
+        });
+    }
+    return true;
+}
+
+/**
+ * Insert or replace a single customer row
+ */
+function applyCustomerUpsert(customer) {
+    const tbody = document.getElementById('customers-tbody');
+    if (!tbody) return;
+
+    const existing = tbody.querySelector(`tr[data-customer-id="${customer.id}"]`);
+
+    if (!matchesFilter(customer)) {
+        if (existing) removeCustomerRow(customer.id);
+        return;
+    }
+
+    const row = createCustomerRow(customer, availableAgents);
+    loadedCustomers.set(customer.id, customer);
+
+    if (existing) {
+        // Keep the operator's agent choice across the patch
+        const previousAgent = document.getElementById(`agent-select-${customer.id}`)?.value;
+        existing.replaceWith(row);
+        if (previousAgent) document.getElementById(`agent-select-${customer.id}`).value = previousAgent;
+    } else {
+        const placeholder = tbody.querySelector('tr:not([data-customer-id])');
+        if (placeholder) placeholder.remove();
+        tbody.insertBefore(row, tbody.firstChild);
+    }
+}
+
+/**
+ * Remove a customer row (deleted, or no longer matching the filter)
+ */
+function removeCustomerRow(customerId) {
+    loadedCustomers.delete(customerId);
+    if (selectedCustomers.delete(customerId)) updateBulkActions();
+    const row = document.querySelector(`#customers-tbody tr[data-customer-id="${customerId}"]`);
+    if (row) row.remove();
+}
+
+/**
+ * Update dashboard statistics from the server-side aggregate (/api/stats)
+ */
+async function updateStats() {
+    let stats;
+    try {
+        const response = await fetch(`${API_BASE_URL}/api/stats`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        stats = await response.json();
+    } catch (error) {
+        console.error('Error loading stats:', error);
+        return;
+    }
+
+    const totalDebt = stats.total_debt;
+    const totalRecovered = stats.total_recovered;
 
     const elTotal = document.getElementById('total-debt');
     if (elTotal) elTotal.textContent = totalDebt.toLocaleString('en-US', { minimumFractionDigits: 0, maximumFractionDigits: 0 });
@@ -83,15 +253,18 @@ function updateStats(customers) {
     const elRecovered = document.getElementById('total-recovered');
     if (elRecovered) elRecovered.textContent = totalRecovered.toLocaleString('en-US', { minimumFractionDigits: 0, maximumFractionDigits: 0 });
 
+    const elRate = document.getElementById('success-rate');
+    if (elRate) elRate.textContent = Math.round(stats.success_rate * 100);
+
     // Active Calls (mock)
     const elCalls = document.getElementById('active-calls');
     if (elCalls) elCalls.textContent = "0";
 }
 
 /**
- * Populate customers table
+ * Populate customers table (append=true adds a page below the current rows)
  */
-function populateCustomersTable(customers) {
+function populateCustomersTable(customers, append = false) {
     const tbody = document.getElementById('customers-tbody');
     if (!tbody) return;
 
@@ -99,12 +272,16 @@ function populateCustomersTable(customers) {
     // For simplicity, we just rebuild. Ideally we'd map customerId -> selectedAgent.
     // Given the requirement, resetting to default (first agent) is acceptable for now per "default selected".
 
-    tbody.innerHTML = '';
+    if (!append) {
+        tbody.innerHTML = '';
+        selectedCustomers.clear();
+        updateBulkActions();
+    }
 
-    if (customers.length === 0) {
+    if (!append && customers.length === 0) {
         tbody.innerHTML = `
             <tr>
-                <td colspan="9" class="text-center text-muted py-5">
+                <td colspan="10" class="text-center text-muted py-5">
                     <p class="mb-0">No active accounts found.</p>
                 </td>
             </tr>
@@ -173,7 +350,7 @@ async function saveCustomer() {
 
         if (response.ok) {
             customerModal.hide();
-            loadCustomers(); // Refresh list
+            syncCustomers(); // Patch the changed row in place
         } else {
             const error = await response.json();
             alert(`Error: ${error.detail || 'Unknown error occurred'}`);
@@ -189,6 +366,67 @@ function confirmDelete(id) {
     deleteModal.show();
 }
 
+// --- Bulk Actions ---
+
+/**
+ * Show the bulk-action menu (with the selection count) while rows are ticked
+ */
+function updateBulkActions() {
+    const menu = document.getElementById('bulk-actions');
+    if (menu) menu.classList.toggle('d-none', selectedCustomers.size === 0);
+    const label = document.getElementById('bulk-actions-label');
+    if (label) label.textContent = `Set status (${selectedCustomers.size} selected)`;
+    const selectAll = document.getElementById('select-all-customers');
+    if (selectAll) selectAll.checked = selectedCustomers.size > 0 && selectedCustomers.size === loadedCustomers.size;
+}
+
+function toggleCustomerSelection(customerId, selected) {
+    if (selected) selectedCustomers.add(customerId);
+    else selectedCustomers.delete(customerId);
+    updateBulkActions();
+}
+
+function toggleSelectAll(selected) {
+    document.querySelectorAll('#customers-tbody tr[data-customer-id]').forEach(row => {
+        const checkbox = row.querySelector('input[type="checkbox"]');
+        if (checkbox) checkbox.checked = selected;
+        if (selected) selectedCustomers.add(row.dataset.customerId);
+    });
+    if (!selected) selectedCustomers.clear();
+    updateBulkActions();
+}
+
+/**
+ * Set the status of every selected customer in a single request
+ */
+async function bulkSetStatus(status) {
+    if (selectedCustomers.size === 0) return;
+
+    try {
+        const response = await fetch(`${API_BASE_URL}/api/customers/bulk`, {
+            method: 'PATCH',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ids: [...selectedCustomers], changes: { status } })
+        });
+        const result = await response.json();
+
+        if (!response.ok) {
+            alert(`Error: ${result.detail || 'Unknown error occurred'}`);
+            return;
+        }
+        if (result.failed) {
+            alert(`${result.updated} updated, ${result.failed} failed.`);
+        }
+
+        selectedCustomers.clear();
+        toggleSelectAll(false);
+        syncCustomers(); // Patch the changed rows in place
+    } catch (e) {
+        console.error('Error updating customers:', e);
+        alert('Failed to update customers due to network error.');
+    }
+}
+
 // --- Row Creation Update ---
 
 /**
@@ -197,10 +435,21 @@ function confirmDelete(id) {
 function createCustomerRow(customer, availableAgents) {
     const row = document.createElement('tr');
     row.className = "align-middle"; // Vertically center content
+    row.dataset.customerId = customer.id;
+
+    // Bulk-selection checkbox (kept across in-place row patches)
+    const selectCell = document.createElement('td');
+    selectCell.className = "ps-4"; // Left padding to match header
+    const selectBox = document.createElement('input');
+    selectBox.type = 'checkbox';
+    selectBox.className = 'form-check-input';
+    selectBox.checked = selectedCustomers.has(customer.id);
+    selectBox.onchange = () => toggleCustomerSelection(customer.id, selectBox.checked);
+    selectCell.appendChild(selectBox);
+    row.appendChild(selectCell);
 
     // Customer Name & Phone
     const nameCell = document.createElement('td');
-    nameCell.className = "ps-4"; // Left padding to match header
     nameCell.innerHTML = `
         <div class="fw-medium text-dark">${escapeHtml(customer.name)}</div>
         <div class="text-secondary small">${formatPhoneNumber(customer.phone)}</div>
@@ -510,9 +759,9 @@ async function initiateCall(customer, agentId) {
                 }, 1000);
             }
 
-            // Reload customers
+            // Pick up the customer's new timestamp
             setTimeout(() => {
-                loadCustomers();
+                syncCustomers();
             }, 2000);
 
         } else {
@@ -0,0 +1,101 @@
+"""
+Serving the static pages and assets from the app (no nginx in front).
+
+Behind nginx, /, /dashboard and /static/ are served from static_build/ on
+disk (nginx.conf) and never reach the app. Run on its own (local uvicorn,
+the container without the nginx service), the app serves the same files:
+
+  - from STATIC_BUILD_DIR when build_static.py has been run (manifest.json
+    present), otherwise straight from static/
+  - with the pre-compressed .br / .gz copy the client accepts, when there
+    is one (Content-Encoding + Vary: Accept-Encoding)
+  - with the same Cache-Control nginx sends: immutable for fingerprinted
+    names, no-cache (revalidate by ETag) for HTML pages, STATIC_MAX_AGE_SECS
+    for everything else
+"""
+
+import json
+import logging
+import mimetypes
+import os
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from build_static import MANIFEST_NAME, STATIC_BUILD_DIR, STATIC_SOURCE_DIR
+from compression import accepted_encodings
+
+
+# Unfingerprinted assets (original names, or static/ without a build)
+STATIC_MAX_AGE_SECS = int(os.getenv("STATIC_MAX_AGE_SECS", "3600"))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PAGE_CACHE_CONTROL = "no-cache"
+
+# Preferred first when the client accepts both
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+logger = logging.getLogger(__name__)
+
+
+def load_manifest(directory: str) -> Optional[Dict[str, str]]:
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)["assets"]
+    except FileNotFoundError:
+        return None
+
+
+def static_root() -> str:
+    """The built directory if build_static.py has produced one, else the sources."""
+    if load_manifest(STATIC_BUILD_DIR) is not None:
+        return STATIC_BUILD_DIR
+    return STATIC_SOURCE_DIR
+
+
+class StaticAssets(StaticFiles):
+    """StaticFiles with cache headers and pre-compressed variants."""
+
+    def __init__(self, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        manifest = load_manifest(directory) or {}
+        # Paths as lookup_path() resolves them
+        self.immutable = {os.path.realpath(os.path.join(directory, path)) for path in manifest.values()}
+        if not manifest:
+            logger.info("📦 Serving %s without a build (run build_static.py for cached, compressed assets)",
+                        directory)
+
+    def cache_control(self, full_path: str) -> str:
+        if full_path in self.immutable:
+            return IMMUTABLE_CACHE_CONTROL
+        if full_path.endswith(".html"):
+            return PAGE_CACHE_CONTROL
+        return f"public, max-age={STATIC_MAX_AGE_SECS}"
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope,
+                      status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        headers = {"Cache-Control": self.cache_control(full_path)}
+        path, encoding = full_path, None
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        for coding, suffix in PRECOMPRESSED:
+            try:
+                variant_stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            # The response differs by Accept-Encoding once any variant exists
+            headers["Vary"] = "Accept-Encoding"
+            if encoding is None and coding in accepted:
+                path, encoding, stat_result = full_path + suffix, coding, variant_stat
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+
+        # Media type of the original: styles.css.gz is still text/css
+        response = FileResponse(path, status_code=status_code, stat_result=stat_result, headers=headers,
+                                media_type=mimetypes.guess_type(full_path)[0] or "text/plain")
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -38,10 +38,11 @@ def test_main_structure():
     print("🧪 Testing main.py structure...")
     
     try:
-        # We can't import main.py directly without Supabase credentials
-        # So we'll just check the file exists and has the right content
-        with open('main.py', 'r') as f:
-            content = f.read()
+        # main.py builds its Supabase client on first use, so it imports
+        # (and create_app() runs) without credentials
+        from main import create_app
+        app = create_app()
+        paths = set(app.openapi()["paths"])
         
         # Check for required endpoints
         required_endpoints = [
@@ -52,13 +53,14 @@ def test_main_structure():
         ]
         
         for endpoint in required_endpoints:
-            if endpoint in content:
+            if endpoint in paths:
                 print(f"  ✅ Endpoint '{endpoint}' found")
             else:
                 print(f"  ❌ Endpoint '{endpoint}' NOT found")
                 return False
         
         # Check for required models
+        import models
         required_models = [
             'GetCaseDetailsRequest',
             'GetCaseDetailsResponse',
@@ -69,7 +71,7 @@ def test_main_structure():
         ]
         
         for model in required_models:
-            if model in content:
+            if hasattr(models, model):
                 print(f"  ✅ Model '{model}' found")
             else:
                 print(f"  ❌ Model '{model}' NOT found")
@@ -78,11 +80,8 @@ def test_main_structure():
         print("\n✅ main.py structure looks good!\n")
         return True
         
-    except FileNotFoundError:
-        print("  ❌ main.py not found\n")
-        return False
     except Exception as e:
-        print(f"  ❌ Error reading main.py: {e}\n")
+        print(f"  ❌ Error importing main.py: {e}\n")
         return False
 
 
@@ -1,37 +1,25 @@
 """
 Update all customer phone numbers to a single test number.
+
+One bulk UPDATE for the whole table; the updated rows come back from it, so
+there is no per-row round trip and no re-select afterwards.
 """
-from database import get_supabase_client
+import asyncio
+
+from repository import CustomerRepository
 
 def update_all_phones(new_phone: str):
-    supabase = get_supabase_client()
-    
-    # Get all customers first
-    result = supabase.table('customers').select('*').execute()
-    
     print(f'🔄 Updating all customer phone numbers to {new_phone}')
     print('=' * 60)
     print()
-    
-    for customer in result.data:
-        # Update phone number
-        update_result = supabase.table('customers').update({
-            'phone': new_phone
-        }).eq('id', customer['id']).execute()
-        
-        print(f'✅ Updated: {customer["name"]}')
-        print(f'   Old phone: {customer["phone"]}')
-        print(f'   New phone: {new_phone}')
-        print()
-    
-    print('=' * 60)
-    print('✅ All customers updated successfully!')
+
+    updated, _ = asyncio.run(CustomerRepository().bulk_update({'phone': new_phone}, match_all=True))
+
+    print(f'✅ Updated {len(updated)} customers')
     print()
     print('📋 Final customer list:')
-    final = supabase.table('customers').select('*').execute()
-    for c in final.data:
+    for c in updated:
         print(f'  • {c["name"]} - {c["phone"]} - ${c["debt_amount"]} ({c["status"]})')
 
 if __name__ == "__main__":
     update_all_phones("+573124199685")
-
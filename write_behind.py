@@ -0,0 +1,385 @@
+"""
+Write-behind buffer for customer writes made during calls.
+
+update-status and the post-dispatch last_call_at write used to wait on a
+Supabase round trip before answering, so a database hiccup became a failed
+tool call mid-conversation. They now go through WriteBehindQueue:
+
+  - submit() merges the change into the pending writes for that phone (a
+    later status replaces an earlier one), patches the cached customer row
+    and appends it to a local journal file, then returns. No network I/O.
+  - A background task flushes every WRITE_BEHIND_FLUSH_INTERVAL_SECS, sending
+    up to WRITE_BEHIND_BATCH_SIZE phones per apply_customer_updates() call
+    (one UPDATE statement, see schema.sql).
+  - The journal is append-only between flushes and rewritten with whatever is
+    still pending after each one. On startup it is replayed, so writes
+    acknowledged before a crash or restart are still applied.
+
+Failed flushes keep their writes pending (and journaled) and are retried on
+the next interval; newer writes for the same phone still win.
+
+A direct write through the repository (an operator's edit) calls supersede()
+first: pending writes are flushed so they land before it, and if that fails
+the fields it sets are dropped from the phone's pending write. A status the
+agent queued earlier therefore never overwrites a newer edit.
+
+Journal appends and rewrites (which fsync) run on one writer thread, never
+on the event loop, so a slow disk delays the submitter only. A single thread
+keeps them in submission order.
+
+Each process needs its own journal, so under gunicorn every worker locks a
+slot (write_behind.jsonl, write_behind.1.jsonl, ...) with flock() when it
+starts, and adopts the journals of slots nobody holds (workers that died or
+were scaled away).
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import Histogram
+from phones import phone_key
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process, one journal
+    fcntl = None
+
+
+WRITE_BEHIND_FLUSH_INTERVAL_SECS = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_SECS", "0.5"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_JOURNAL = os.getenv("WRITE_BEHIND_JOURNAL", "data/write_behind.jsonl")
+# fsync every journal append (survives power loss, not just a process restart)
+WRITE_BEHIND_FSYNC = os.getenv("WRITE_BEHIND_FSYNC", "false").lower() in ("1", "true", "yes")
+
+# Columns apply_customer_updates() knows how to write
+WRITE_BEHIND_COLUMNS = ("status", "last_call_at")
+# Journal slots tried per process (one per gunicorn worker)
+WRITE_BEHIND_MAX_SLOTS = 64
+
+logger = logging.getLogger(__name__)
+
+
+def _journal_line(phone: str, updates: Dict[str, Any]) -> str:
+    return json.dumps({"phone": phone, "updates": updates}, separators=(",", ":")) + "\n"
+
+
+class WriteBehindQueue:
+    """Coalesced, journaled customer updates keyed by phone, flushed in batches."""
+
+    def __init__(self, repo, journal_path: Optional[str] = WRITE_BEHIND_JOURNAL,
+                 flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL_SECS,
+                 batch_size: int = WRITE_BEHIND_BATCH_SIZE, fsync: bool = WRITE_BEHIND_FSYNC):
+        self.repo = repo
+        # Slot 0's path; journal_path becomes the slot this process locked
+        self.journal_base = journal_path
+        self.journal_path = journal_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fsync = fsync
+        # phone -> (merged updates, monotonic time first queued)
+        self.pending: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._journal = None
+        self._slot_lock = None
+        # Journal file I/O; created on first use (again after stop())
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.unmatched = 0
+        self.superseded = 0
+        self.replayed = 0
+        self.journal_errors = 0
+        self.last_error: Optional[str] = None
+        self.flush_latency = Histogram(
+            "write_behind_flush_duration_seconds", "Time to apply one batch of buffered customer updates",
+        )
+
+    # ------------------------------------------------------------------------
+    # Journal
+    # ------------------------------------------------------------------------
+
+    def _open_journal(self):
+        if self.journal_path and self._journal is None:
+            directory = os.path.dirname(self.journal_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _append(self, phone: str, updates: Dict[str, Any]):
+        if not self.journal_path:
+            return
+        self._open_journal()
+        self._journal.write(_journal_line(phone, updates))
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _pending_lines(self) -> List[str]:
+        """The journal contents for what is pending now (taken on the event loop)."""
+        return [_journal_line(phone, updates) for phone, (updates, _) in self.pending.items()]
+
+    def _rewrite_journal(self, lines: List[str]):
+        """Replace the journal with just the writes still pending."""
+        if not self.journal_path:
+            return
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+        self._open_journal()
+
+    async def _write(self, fn: Callable[..., Any], *args) -> Any:
+        """Run journal file I/O on the writer thread, after anything queued before it."""
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="write-behind")
+        return await asyncio.get_running_loop().run_in_executor(self._writer, fn, *args)
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    @staticmethod
+    def _lock(path: str):
+        """An exclusive flock on path.lock, or None if another process holds it."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handle = open(f"{path}.lock", "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+        return handle
+
+    def _claim_slot(self) -> List[str]:
+        """Lock this process' journal slot; returns orphaned journals to adopt."""
+        if fcntl is None or self._slot_lock is not None:
+            return []
+        base, ext = os.path.splitext(self.journal_base)
+        for n in range(WRITE_BEHIND_MAX_SLOTS):
+            path = self.journal_base if n == 0 else f"{base}.{n}{ext}"
+            handle = self._lock(path)
+            if handle is not None:
+                self.journal_path, self._slot_lock = path, handle
+                break
+        else:
+            raise RuntimeError(f"No free write-behind journal slot next to {self.journal_base}")
+        candidates = [self.journal_base] + glob.glob(f"{base}.*{ext}")
+        return [path for path in candidates if path != self.journal_path and os.path.exists(path)]
+
+    def _read_journal(self, path: str) -> int:
+        replayed = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append
+                    continue
+                self._merge(entry["phone"], entry["updates"])
+                replayed += 1
+        return replayed
+
+    def replay(self) -> int:
+        """Load writes journaled by a previous run (and unclaimed slots) into the buffer; returns how many."""
+        if not self.journal_path:
+            return 0
+        orphans = self._claim_slot()
+        replayed = self._read_journal(self.journal_path) if os.path.exists(self.journal_path) else 0
+        adopted = []
+        for path in orphans:
+            handle = self._lock(path)
+            if handle is None:
+                continue  # a live worker's journal
+            replayed += self._read_journal(path)
+            adopted.append((path, handle))
+        self.replayed += replayed
+        # Ours now holds everything before the orphans are removed
+        self._rewrite_journal(self._pending_lines())
+        for path, handle in adopted:
+            os.remove(path)
+            handle.close()
+        return replayed
+
+    # ------------------------------------------------------------------------
+    # Buffer
+    # ------------------------------------------------------------------------
+
+    def _merge(self, phone: str, updates: Dict[str, Any]):
+        current = self.pending.get(phone)
+        if current is None:
+            self.pending[phone] = (dict(updates), time.monotonic())
+        else:
+            self.coalesced += 1
+            self.pending[phone] = ({**current[0], **updates}, current[1])
+
+    async def submit(self, phone: str, updates: Dict[str, Any]):
+        """Queue an update for a customer; returns once it is journaled (no database round trip)."""
+        unknown = set(updates) - set(WRITE_BEHIND_COLUMNS)
+        if unknown:
+            raise ValueError(f"Write-behind cannot update {sorted(unknown)}")
+        # apply_customer_updates() matches phone_e164
+        phone = phone_key(phone)
+        # Buffered before the append is queued, so a journal rewrite queued
+        # ahead of it (by a flush) already includes this write
+        self._merge(phone, updates)
+        self.submitted += 1
+        # Reads during the call see the new values before they reach the database
+        await self.repo.patch_cached(phone, updates)
+        try:
+            await self._write(self._append, phone, updates)
+        except OSError as e:
+            # Still applied from memory; only a restart before the flush would lose it
+            self.journal_errors += 1
+            logger.warning("⚠️  Could not journal write for %s: %s", phone, e)
+
+    async def supersede(self, fields: Iterable[str], phone: Optional[str] = None):
+        """Make way for a direct write of `fields` (to `phone`, if known): nothing pending may land after it."""
+        overlapping = set(fields) & set(WRITE_BEHIND_COLUMNS)
+        if not overlapping or not self.pending:
+            return
+        # Waits for a flush in flight, so its UPDATE lands first too
+        await self.flush()
+        key = phone_key(phone) if phone else None
+        if key is None or key not in self.pending:
+            return
+        # The flush failed: the direct write is newer, so drop what it replaces
+        async with self._flush_lock:
+            current = self.pending.get(key)
+            if current is None:
+                return
+            kept = {column: value for column, value in current[0].items() if column not in overlapping}
+            if kept:
+                self.pending[key] = (kept, current[1])
+            else:
+                del self.pending[key]
+            self.superseded += 1
+            await self._write(self._rewrite_journal, self._pending_lines())
+
+    async def flush(self) -> int:
+        """Apply everything pending, a batch at a time; returns how many phones were written."""
+        written = 0
+        async with self._flush_lock:
+            while self.pending:
+                phones = list(self.pending)[:self.batch_size]
+                batch = {phone: self.pending.pop(phone) for phone in phones}
+                started = time.perf_counter()
+                try:
+                    matched = await self.repo.apply_updates({phone: u for phone, (u, _) in batch.items()})
+                except Exception as e:
+                    self.failed_flushes += 1
+                    self.last_error = str(e)
+                    # Back at the front of the buffer; anything queued meanwhile is newer and wins
+                    restored = OrderedDict()
+                    for phone, (updates, queued_at) in batch.items():
+                        newer = self.pending.pop(phone, None)
+                        restored[phone] = ({**updates, **newer[0]} if newer else updates, queued_at)
+                    restored.update(self.pending)
+                    self.pending = restored
+                    logger.warning("⚠️  Write-behind flush failed (%s phones pending): %s", len(self.pending), e)
+                    break
+                self.flush_latency.observe(time.perf_counter() - started)
+                self.flushes += 1
+                self.flushed += len(batch)
+                written += len(batch)
+                missing = set(batch) - set(matched)
+                if missing:
+                    self.unmatched += len(missing)
+                    logger.warning("⚠️  Write-behind: no customer for %s", ", ".join(sorted(missing)))
+            await self._write(self._rewrite_journal, self._pending_lines())
+        return written
+
+    # ------------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------------
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self.pending:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error("❌ Write-behind flush error: %s", e)
+
+    async def start(self):
+        """Replay the journal, then start the background flusher (idempotent)."""
+        if self._task is not None and not self._task.done():
+            return
+        # Bound to the running loop (a second app in the same process gets a new one)
+        self._flush_lock = asyncio.Lock()
+        replayed = await self._write(self.replay)
+        if replayed:
+            logger.info("📒 Replaying %s journaled customer writes", replayed)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and flush what is left (unflushed writes stay journaled)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.pending:
+            await self.flush()
+        if self.pending:
+            logger.warning("⚠️  %s customer writes left in the journal for the next start", len(self.pending))
+        if self._writer is not None:
+            await self._write(self._close_journal)
+            self._writer.shutdown()
+            self._writer = None
+        if self._slot_lock is not None:
+            self._slot_lock.close()
+            self._slot_lock = None
+
+    def oldest_pending_age(self) -> float:
+        if not self.pending:
+            return 0.0
+        return time.monotonic() - min(queued_at for _, queued_at in self.pending.values())
+
+    def journal_bytes(self) -> int:
+        try:
+            return os.path.getsize(self.journal_path) if self.journal_path else 0
+        except OSError:
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self.pending),
+            "oldest_pending_secs": round(self.oldest_pending_age(), 3),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "unmatched": self.unmatched,
+            "superseded": self.superseded,
+            "replayed": self.replayed,
+            "last_error": self.last_error,
+            "journal_path": self.journal_path,
+            "journal_bytes": self.journal_bytes(),
+            "journal_errors": self.journal_errors,
+            "flush_interval_secs": self.flush_interval,
+            "batch_size": self.batch_size,
+            "flush_latency": self.flush_latency.snapshot(),
+        }